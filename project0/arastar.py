@@ -0,0 +1,183 @@
+import time
+
+from pacman_module.game import Agent, Directions
+from pacman_module.util import PriorityQueue
+
+from maze import FoodHeuristic
+from searchstats import SearchStats
+
+
+class PacmanAgent(Agent):
+    """Pacman agent based on anytime repairing A* (ARA*).
+
+    A first plan is found quickly with a heavily weighted heuristic. The
+    weight is then lowered step by step, reusing the g-values and open
+    states of previous searches, until it reaches 1 (optimal plan) or the
+    time budget expires. Each plan improvement is reported in `stats`, as
+    a (weight, cost, time) triple.
+
+    Arguments:
+        budget: The wall-clock time budget, in seconds.
+        weight: The initial weight of the heuristic.
+        step: The weight decrement between two searches.
+    """
+
+    def __init__(self, budget=1.0, weight=3.0, step=0.5):
+        super().__init__()
+
+        self.moves = None
+        self.budget = float(budget)
+        self.weight = float(weight)
+        self.step = float(step)
+        self.improvements = []
+        self.stats = {}
+
+    def get_action(self, state):
+        """Given a Pacman game state, returns a legal move.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Return:
+            A legal move as defined in `game.Directions`.
+        """
+
+        if self.moves is None:
+            self.moves = self.arastar(state)
+
+        if self.moves:
+            return self.moves.pop(0)
+        else:
+            return Directions.STOP
+
+    def arastar(self, state):
+        """Given a Pacman game state, returns the best list of legal moves
+        found within the time budget. The search goes on past the budget
+        until a first plan is found.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Returns:
+            A list of legal moves.
+        """
+
+        start = time.time()
+        heuristic = FoodHeuristic(state)
+        stats = SearchStats()
+
+        if state.isWin():
+            return []
+
+        root = heuristic.key(state)
+        g = {root: 0}
+        h = {root: stats.heuristic(heuristic.estimate, *root)}
+        states = {root: state}
+        parents = {root: None}
+
+        open_keys = {root}
+        closed = set()
+        incons = set()
+        best_key = None
+        best_cost = float('inf')
+        weight = self.weight
+        stats.push()
+
+        while True:
+            fringe = PriorityQueue()
+            for k in open_keys:
+                fringe.push(k, (g[k] + weight * h[k], -g[k]))
+
+            # Improve the current plan with the current weight
+            expired = False
+            while not fringe.isEmpty():
+                (f, negative_g), current = fringe.pop()
+                if current not in open_keys or -negative_g != g[current]:
+                    continue
+
+                if f >= best_cost:
+                    break
+
+                if best_key is not None \
+                        and time.time() - start > self.budget:
+                    expired = True
+                    break
+
+                open_keys.discard(current)
+                stats.pop()
+                closed.add(current)
+
+                successors = stats.successors(states[current], g[current])
+                for successor, action in successors:
+                    successor_key = heuristic.key(successor)
+                    successor_g = g[current] + 1
+
+                    if successor_g >= g.get(successor_key, float('inf')):
+                        stats.prune(g[current])
+                        continue
+
+                    g[successor_key] = successor_g
+                    states[successor_key] = successor
+                    parents[successor_key] = (current, action)
+
+                    if successor.isWin():
+                        if successor_g < best_cost:
+                            best_cost = successor_g
+                            best_key = successor_key
+                        continue
+
+                    if successor_key not in h:
+                        h[successor_key] = stats.heuristic(
+                            heuristic.estimate, *successor_key)
+
+                    if successor_key in closed:
+                        incons.add(successor_key)
+                    else:
+                        if successor_key not in open_keys:
+                            stats.push()
+                        open_keys.add(successor_key)
+                        fringe.push(
+                            successor_key,
+                            (successor_g + weight * h[successor_key],
+                             -successor_g),
+                        )
+
+            if best_key is not None and (
+                    not self.improvements
+                    or best_cost < self.improvements[-1][1]):
+                elapsed = time.time() - start
+                self.improvements.append(
+                    (weight, best_cost, round(elapsed, 3)))
+
+            if expired or weight <= 1 or not open_keys | incons:
+                break
+
+            if time.time() - start > self.budget and best_key is not None:
+                break
+
+            # Reuse the search effort with a lower weight
+            weight = max(1.0, weight - self.step)
+            stats.push(len(incons - open_keys))
+            open_keys |= incons
+            incons = set()
+            closed = set()
+
+        stats.store(len(states))
+        self.stats.update(stats.report(closed))
+        self.stats.update({
+            "Final weight": weight,
+            "Plan improvements": self.improvements,
+        })
+
+        # No solution
+        if best_key is None:
+            return []
+
+        path = []
+        node = best_key
+        while parents[node] is not None:
+            node, action = parents[node]
+            path.append(action)
+        path.reverse()
+
+        return path
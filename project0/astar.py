@@ -1,6 +1,8 @@
 from pacman_module.game import *
 from pacman_module.util import *
 
+from searchstats import SearchStats
+
 
 def key(state):
     """Returns a key that uniquely identifies a Pacman game state.
@@ -18,11 +20,17 @@ def key(state):
 
 
 class PacmanAgent(Agent):
-    """Pacman agent optimized to maximize score through A* search."""
+    """Pacman agent optimized to maximize score through A* search.
+
+    The f-scores of the food clustering heuristic are fractional, so the
+    open list is a heap rather than a `BucketQueue`, which only accepts
+    integer priorities.
+    """
 
     def __init__(self):
         super().__init__()
         self.moves = None
+        self.stats = {}
 
     def get_action(self, state):
         """Given a Pacman game state, returns a legal move.
@@ -52,14 +60,18 @@ class PacmanAgent(Agent):
             A list of legal moves.
         """
         closed = set()
+        stats = SearchStats()
         open_queue = PriorityQueue()
         open_queue.push((state, []), 0)
+        stats.push()
         g_score = {state: 0}
 
         while not open_queue.isEmpty():
             _, (current, path) = open_queue.pop()
+            stats.pop()
 
             if current.isWin():
+                self.stats.update(stats.report(closed))
                 return path
 
             current_key = key(current)
@@ -67,9 +79,11 @@ class PacmanAgent(Agent):
                 continue
             closed.add(current_key)
 
-            for successor, action in current.generatePacmanSuccessors():
+            depth = len(path)
+            for successor, action in stats.successors(current, depth):
                 successor_key = key(successor)
                 if successor_key in closed:
+                    stats.prune(depth)
                     continue
 
                 tentative_g_score = g_score[current] + 1
@@ -81,7 +95,8 @@ class PacmanAgent(Agent):
                     # Calculate heuristic for the successor
                     pacmanPosition = successor.getPacmanPosition()
                     foodGrid = successor.getFood()
-                    heuristics = self.heuristic(pacmanPosition, foodGrid)
+                    heuristics = stats.heuristic(
+                        self.heuristic, pacmanPosition, foodGrid)
                     # f_score considers actual score to favor
                     # states with higher food count
                     score = successor.getScore()
@@ -89,8 +104,12 @@ class PacmanAgent(Agent):
 
                     new_path = path + [action]
                     open_queue.push((successor, new_path), f_score)
+                    stats.push()
+                else:
+                    stats.prune(depth)
 
         # No solution
+        self.stats.update(stats.report(closed))
         return []
 
     def heuristic(self, pacman_pos, food_grid):
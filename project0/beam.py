@@ -0,0 +1,199 @@
+import array
+import heapq
+
+from pacman_module.game import Agent, Directions
+
+from maze import CompactMaze, FoodHeuristic
+from searchstats import SearchStats
+
+
+def unwind(parents, actions, offsets, index, action):
+    """Returns the list of moves of a path stored as back-pointer arrays.
+
+    The back-pointers of the states of all the levels are stored one level
+    after the other, level d starting at `offsets[d]`. The back-pointer of
+    the i-th state of a level is the index of its parent in the previous
+    level and the index of the move leading to it (see
+    `maze.CompactMaze.ACTIONS`).
+
+    Arguments:
+        parents: The array of the parent indices.
+        actions: The array of the move indices.
+        offsets: The list of the offsets of the levels but the first.
+        index: The index of the parent of the last move in the last level.
+        action: The last move.
+
+    Returns:
+        The list of moves from the root.
+    """
+
+    path = [action]
+    for offset in reversed(offsets):
+        path.append(CompactMaze.ACTIONS[actions[offset + index]])
+        index = parents[offset + index]
+    path.reverse()
+
+    return path
+
+
+def compact(parents, actions, offsets, size):
+    """Drops the back-pointers of the states without descendant in the last
+    level, the states of each level keeping their order.
+
+    Arguments:
+        parents: The array of the parent indices.
+        actions: The array of the move indices.
+        offsets: The list of the offsets of the levels but the first.
+        size: The number of states of the last level.
+
+    Returns:
+        The compacted `(parents, actions, offsets)`.
+    """
+
+    levels = []
+    live = range(size)
+    for offset in reversed(offsets):
+        kept = sorted({parents[offset + index] for index in live})
+        rank = {index: i for i, index in enumerate(kept)}
+        levels.append((
+            [rank[parents[offset + index]] for index in live],
+            [actions[offset + index] for index in live],
+        ))
+        live = kept
+
+    compacted = (array.array(parents.typecode),
+                 array.array(actions.typecode), [])
+    for level_parents, level_actions in reversed(levels):
+        compacted[2].append(len(compacted[0]))
+        compacted[0].extend(level_parents)
+        compacted[1].extend(level_actions)
+
+    return compacted
+
+
+class PacmanAgent(Agent):
+    """Pacman agent based on beam search.
+
+    The search proceeds level by level and only keeps the `width` best
+    states of each level according to the greedy estimate of
+    `maze.FoodHeuristic`, without any closed set. The stored states are
+    thus bounded by `width` times the branching factor, whatever the size
+    of the layout. Paths are kept as one array of parent indices and one
+    array of move indices, i.e. 5 bytes per state, and rebuilt once the
+    goal is reached. Whenever the arrays double, the back-pointers of the
+    states without descendant in the beam are dropped, so that they hold
+    at most twice the states of the paths to the beam (or `2 * width`),
+    i.e. at most `2 * width` times the path length, and in practice little
+    more than the path length as the paths of the beam soon merge.
+
+    The best state of each level is always closer to the goal than the
+    best state of the previous level, so that the search cannot loop.
+    Admissible estimates do not have this property and make narrow beams
+    cycle forever, hence the greedy ranking.
+
+    Arguments:
+        width: The beam width.
+    """
+
+    def __init__(self, width=100):
+        super().__init__()
+
+        self.moves = None
+        self.width = int(width)
+        self.stats = {}
+
+    def get_action(self, state):
+        """Given a Pacman game state, returns a legal move.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Return:
+            A legal move as defined in `game.Directions`.
+        """
+
+        if self.moves is None:
+            self.moves = self.beam(state)
+
+        if self.moves:
+            return self.moves.pop(0)
+        else:
+            return Directions.STOP
+
+    def beam(self, state):
+        """Given a Pacman game state, returns a list of legal moves to solve
+        the search layout.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Returns:
+            A list of legal moves.
+
+        The stored nodes reported in `stats` are the states of the beam and
+        of the current level plus the back-pointers of all the levels.
+        """
+
+        if state.isWin():
+            return []
+
+        heuristic = FoodHeuristic(state)
+        stats = SearchStats()
+        moves = {action: i for i, action in enumerate(CompactMaze.ACTIONS)}
+        beam = [state]
+        parents = array.array('I')
+        actions = array.array('B')
+        offsets = []
+        limit = self.width
+        depth = 0
+        stats.store(1)
+        stats.push()
+
+        def report():
+            self.stats.update(stats.report())
+            self.stats["Back-pointer memory (bytes)"] = \
+                parents.itemsize * len(parents) \
+                + actions.itemsize * len(actions)
+
+        while beam:
+            # Successors of the current level, deduplicated by key
+            level = {}
+            for index, current in enumerate(beam):
+                for successor, action in stats.successors(current, depth):
+                    successor_key = heuristic.key(successor)
+                    if successor_key in level:
+                        stats.prune(depth)
+                        continue
+
+                    if successor.isWin():
+                        report()
+                        return unwind(
+                            parents, actions, offsets, index, action)
+
+                    level[successor_key] = (
+                        heuristic.greedy(*successor_key),
+                        successor,
+                        index,
+                        moves[action],
+                    )
+
+            stats.store(len(beam) + len(level) + len(parents))
+            best = heapq.nsmallest(
+                self.width, level.values(), key=lambda entry: entry[0])
+            del level
+
+            beam = [successor for _, successor, _, _ in best]
+            offsets.append(len(parents))
+            parents.extend(index for _, _, index, _ in best)
+            actions.extend(action for _, _, _, action in best)
+            if len(parents) >= 2 * limit:
+                parents, actions, offsets = compact(
+                    parents, actions, offsets, len(beam))
+                limit = max(len(parents), self.width)
+            stats.pop(stats.fringe)
+            stats.push(len(beam))
+            depth += 1
+
+        # No solution
+        report()
+        return []
@@ -0,0 +1,555 @@
+import argparse
+import importlib
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from pacman_module import layout as layouts
+from pacman_module import mazegen
+from pacman_module.pacman import GameState, runGame, parseAgentArgs
+from pacman_module.util import BucketQueue, PriorityQueue
+from plancache import CachedAgent, PlanCache, agent_identity
+
+
+QUEUES = {
+    'heap': PriorityQueue,
+    'bucket': BucketQueue,
+}
+
+
+def queue_workload(queue, operations, spread, updates, seed):
+    """Times an A*-like workload on a priority queue: priorities are small
+    integers which slowly increase, and every other insertion is followed
+    by a pop.
+
+    Arguments:
+        queue: The priority queue class.
+        operations: The number of insertions.
+        spread: The range of the priorities above the last popped one.
+        updates: Whether a third of the insertions are decrease-key updates.
+        seed: The seed of the random number generator.
+
+    Returns:
+        The elapsed time, in seconds.
+    """
+
+    rng = random.Random(seed)
+    fringe = queue()
+    current = 0
+
+    start = time.perf_counter()
+    for i in range(operations):
+        priority = current + rng.randrange(spread)
+        if updates and i % 3 == 0:
+            fringe.update(rng.randrange(operations), priority)
+        else:
+            fringe.push(i, priority)
+        if i % 2 == 1:
+            current, _ = fringe.pop()
+    while not fringe.isEmpty():
+        fringe.pop()
+
+    return time.perf_counter() - start
+
+
+def game(agent, agentargs, layout, cache=None):
+    """Runs a game without graphics and returns its measurements.
+
+    Arguments:
+        agent: The name of the module containing the `PacmanAgent` class.
+        agentargs: Comma separated agent options.
+        layout: The maze layout.
+        cache: An optional `PlanCache` instance.
+
+    Returns:
+        The score, computation time and number of expanded nodes.
+    """
+
+    module = importlib.import_module(agent)
+    agentargs = parseAgentArgs(agentargs)
+    pacman = module.PacmanAgent(**agentargs)
+
+    if cache is not None:
+        pacman = CachedAgent(
+            pacman, agent_identity(module, agentargs), cache)
+
+    return runGame(
+        layout_name=layout,
+        pacman=pacman,
+        ghosts=[],
+        beliefstateagent=None,
+        displayGraphics=False,
+        expout=0.0,
+        hiddenGhosts=False,
+    )
+
+
+def measured_game(agent, layout, limit):
+    """Runs a game in a fresh process (see `benchmark_memory`) and returns
+    its measurements with the peak resident memory of the process.
+
+    Arguments:
+        agent: The name of the module containing the `PacmanAgent` class,
+            or None to only measure the memory of the process.
+        layout: The maze layout.
+        limit: The maximum address space of the process, in bytes, or
+            None.
+
+    Returns:
+        The score, computation time and number of expanded nodes (None
+        without agent or when out of memory), and the peak resident memory
+        in kB.
+    """
+
+    if limit is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    result = (None, None, None)
+    if agent is not None:
+        try:
+            result = game(agent, None, layout)
+        except MemoryError:
+            pass
+
+    return (*result, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def initial_state(layout):
+    """Returns the initial game state of a maze layout, without ghosts."""
+
+    state = GameState()
+    state.initialize(layouts.getLayout(layout), 0)
+
+    return state
+
+
+def plan(planner, state):
+    """Runs a planner on a game state, once to measure its computation time
+    and once to measure its peak memory allocation.
+
+    Arguments:
+        planner: A function mapping a game state to a list of moves.
+        state: The initial game state.
+
+    Returns:
+        The plan length, computation time and peak allocated memory.
+    """
+
+    start = time.perf_counter()
+    moves = planner(state)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    planner(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return len(moves), elapsed, peak
+
+
+def tiled_state(layout, factor):
+    """Returns the initial game state of a layout tiled `factor` x `factor`
+    times. Adjacent tiles share their border walls, through which a door
+    is carved wherever free cells face each other. Pacman stays in the
+    first tile only.
+
+    Arguments:
+        layout: The maze layout.
+        factor: The number of tiles along each dimension.
+    """
+
+    text = layouts.getLayout(layout).layoutText
+    tile = [row.replace('P', ' ') for row in text]
+    height, width = len(text), len(text[0])
+
+    rows = [
+        list(''.join(
+            (text if i == 0 and j == 0 else tile)[y][1 if j else 0:]
+            for j in range(factor)
+        ))
+        for i in range(factor)
+        for y in range(1 if i else 0, height)
+    ]
+
+    def free(y, x):
+        return 0 <= y < len(rows) and 0 <= x < len(rows[0]) \
+            and rows[y][x] != '%'
+
+    for j in range(1, factor):
+        x = j * (width - 1)
+        for y in range(1, len(rows) - 1):
+            if free(y, x - 1) and free(y, x + 1):
+                rows[y][x] = ' '
+    for i in range(1, factor):
+        y = i * (height - 1)
+        for x in range(1, len(rows[0]) - 1):
+            if free(y - 1, x) and free(y + 1, x):
+                rows[y][x] = ' '
+
+    state = GameState()
+    state.initialize(layouts.Layout([''.join(row) for row in rows]), 0)
+
+    return state
+
+
+def benchmark_queue(args):
+    """Compares the heap and bucket priority queues."""
+
+    for updates in (False, True):
+        print(f"Queue workload {'with' if updates else 'without'} "
+              f"updates (seconds)")
+        for operations in args.operations:
+            times = {
+                name: queue_workload(
+                    queue, operations, args.spread, updates, args.seed)
+                for name, queue in QUEUES.items()
+            }
+            print(
+                f"  {operations:>8} ops: "
+                + ", ".join(f"{name} {t:.4f}" for name, t in times.items())
+            )
+
+
+def benchmark_plancache(args):
+    """Runs a layout corpus with a cold, warm (disk) and hot (memory)
+    plan cache."""
+
+    with tempfile.TemporaryDirectory() as directory:
+        runs = [
+            ('cold', PlanCache(directory)),
+            ('disk', PlanCache(directory)),
+        ]
+        runs.append(('memory', runs[-1][1]))
+
+        print(f"{args.agent} over {len(args.layouts)} layouts (seconds)")
+        for name, cache in runs:
+            start = time.perf_counter()
+            for layout in args.layouts:
+                game(args.agent, args.agentargs, layout, cache)
+            print(f"  {name:>6}: {time.perf_counter() - start:.4f}")
+
+
+def benchmark_portfolio(args):
+    """Compares the time to first move of the portfolio with its members."""
+
+    members = args.planners.split('+')
+    agentargs = f"planners={args.planners},quality={args.quality}"
+
+    print("Time to first move (seconds)")
+    for layout in args.layouts:
+        times = {
+            member: game(member, None, layout)[1] for member in members
+        }
+        score, elapsed, _ = game('portfolio', agentargs, layout)
+        print(
+            f"  {layout:>12}: "
+            + ", ".join(f"{name} {t:.4f}" for name, t in times.items())
+            + f", portfolio {elapsed:.4f} (score {score})"
+        )
+
+
+def benchmark_beam(args):
+    """Sweeps beam widths, reporting plan length vs time and memory."""
+
+    import beam
+    import greedy
+
+    print("Plan length, computation time (seconds), peak memory (kB)")
+    for layout in args.layouts:
+        print(f"  {layout}")
+
+        length, elapsed, peak = plan(
+            greedy.PacmanAgent().greedy, initial_state(layout))
+        print(f"    {'greedy':>12}: {length:>5} moves, "
+              f"{elapsed:8.3f}s, {peak / 1024:10.0f}kB")
+
+        for width in args.widths:
+            agent = beam.PacmanAgent(width=width)
+            length, elapsed, peak = plan(agent.beam, initial_state(layout))
+            print(f"    {f'beam {width}':>12}: {length:>5} moves, "
+                  f"{elapsed:8.3f}s, {peak / 1024:10.0f}kB")
+
+
+def benchmark_smastar(args):
+    """Sweeps the memory cap of SMA*, reporting the peak number of stored
+    nodes against the cap, and the plan length vs time and memory."""
+
+    import smastar
+
+    print("Plan length, peak stored nodes / cap, expanded nodes, "
+          "computation time (seconds), peak memory (kB)")
+    for layout in args.layouts:
+        print(f"  {layout}")
+
+        for cap in args.caps:
+            agent = smastar.PacmanAgent(max_nodes=cap)
+            length, elapsed, peak = plan(agent.smastar, initial_state(layout))
+            stored = agent.stats["Peak stored nodes"]
+            print(f"    {f'cap {cap}':>12}: {length:>5} moves, "
+                  f"{stored:>6} / {cap:<6} "
+                  f"{agent.stats['Expanded nodes (search)']:>8} nodes, "
+                  f"{elapsed:8.3f}s, {peak / 1024:10.0f}kB")
+
+
+def benchmark_hierarchical(args):
+    """Measures the growth of hierarchical planning time with the maze size,
+    on tilings of a layout."""
+
+    import greedy
+    import hierarchical
+
+    print(f"Tilings of {args.layout}: plan length, computation time "
+          f"(seconds), peak memory (kB)")
+    for factor in args.factors:
+        state = tiled_state(args.layout, factor)
+        walls = state.getWalls()
+        cells = len(walls.asList(False))
+        dots = state.getNumFood()
+        print(f"  {factor}x{factor}: {cells} cells, {dots} dots")
+
+        planners = [('hierarchical', hierarchical.PacmanAgent().hierarchical)]
+        if factor <= args.greedy:
+            planners.append(('greedy', greedy.PacmanAgent().greedy))
+
+        for name, planner in planners:
+            length, elapsed, peak = plan(planner, state)
+            print(f"    {name:>12}: {length:>5} moves, "
+                  f"{elapsed:8.3f}s, {peak / 1024:10.0f}kB")
+
+
+def benchmark_memory(args):
+    """Compares the peak resident memory of A* and of the memory-bounded
+    planners on generated mazes with many pellets. Each game is played in
+    a fresh process, possibly with a limited address space, the first
+    line being the memory of a process which plays no game."""
+
+    if resource is None:
+        raise RuntimeError('Memory benchmarks need the resource module')
+
+    context = multiprocessing.get_context('spawn')
+    limit = None if args.limit is None else args.limit * 2 ** 20
+
+    print("Score, computation time (seconds), expanded nodes, peak "
+          "resident memory (MB)")
+    with tempfile.TemporaryDirectory() as directory:
+        for width, height in args.sizes:
+            rows = mazegen.generate(
+                width, height, pellets=args.pellets, ghosts=0,
+                seed=args.seed)
+            path = os.path.join(directory, f'maze_{width}x{height}.lay')
+            with open(path, 'w') as f:
+                f.write('\n'.join(rows) + '\n')
+            print(f"  {width}x{height}, {args.pellets} pellets")
+
+            for agent in [None] + args.agents:
+                name = 'baseline' if agent is None else agent
+                with context.Pool(1) as pool:
+                    run = pool.apply_async(
+                        measured_game, (agent, path, limit))
+                    try:
+                        score, elapsed, nodes, peak = run.get(args.timeout)
+                    except multiprocessing.TimeoutError:
+                        print(f"    {name:>12}: timeout")
+                        continue
+
+                if agent is not None and score is None:
+                    print(f"    {name:>12}: out of memory")
+                    continue
+                print(
+                    f"    {name:>12}: "
+                    + ("" if agent is None else
+                       f"score {score:>5}, {elapsed:8.3f}s, "
+                       f"{nodes:>8} nodes, ")
+                    + f"{peak / 1024:6.0f}MB"
+                )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    queue = subparsers.add_parser(
+        'queue',
+        help='Heap vs bucket priority queue.',
+    )
+    queue.add_argument(
+        '--operations',
+        type=int,
+        nargs='+',
+        default=[1000, 10000, 30000],
+        help='Numbers of queue insertions.',
+    )
+    queue.add_argument(
+        '--spread',
+        type=int,
+        default=16,
+        help='Range of the priorities above the last popped one.',
+    )
+    queue.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed for random number generator.',
+    )
+    queue.set_defaults(run=benchmark_queue)
+
+    plancache = subparsers.add_parser(
+        'plancache',
+        help='Repeated runs with the plan cache.',
+    )
+    plancache.add_argument(
+        '--agent',
+        default='astar',
+        help='Python module containing a `PacmanAgent` class.',
+    )
+    plancache.add_argument(
+        '--agentargs',
+        default=None,
+        help='Comma separated agent options.',
+    )
+    plancache.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['small', 'medium', 'large', 'extra-large'],
+        help='Maze layouts of the corpus.',
+    )
+    plancache.set_defaults(run=benchmark_plancache)
+
+    portfolio = subparsers.add_parser(
+        'portfolio',
+        help='Portfolio vs its members.',
+    )
+    portfolio.add_argument(
+        '--planners',
+        default='bfs+dfs+astar',
+        help='Members of the portfolio separated by "+".',
+    )
+    portfolio.add_argument(
+        '--quality',
+        type=float,
+        default=float('inf'),
+        help='Quality bar of the portfolio.',
+    )
+    portfolio.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['small', 'medium', 'large', 'extra-large'],
+        help='Maze layouts of the corpus.',
+    )
+    portfolio.set_defaults(run=benchmark_portfolio)
+
+    sweep = subparsers.add_parser(
+        'beam',
+        help='Beam width sweep.',
+    )
+    sweep.add_argument(
+        '--widths',
+        type=int,
+        nargs='+',
+        default=[1, 4, 16, 64, 256],
+        help='Beam widths.',
+    )
+    sweep.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['large', 'extra-large', 'huge'],
+        help='Maze layouts.',
+    )
+    sweep.set_defaults(run=benchmark_beam)
+
+    caps = subparsers.add_parser(
+        'smastar',
+        help='SMA* memory cap sweep.',
+    )
+    caps.add_argument(
+        '--caps',
+        type=int,
+        nargs='+',
+        default=[50000, 2000, 500, 110],
+        help='Maximum numbers of nodes in memory.',
+    )
+    caps.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['large', 'extra-large', 'huge'],
+        help='Maze layouts.',
+    )
+    caps.set_defaults(run=benchmark_smastar)
+
+    hierarchy = subparsers.add_parser(
+        'hierarchical',
+        help='Hierarchical planning on growing mazes.',
+    )
+    hierarchy.add_argument(
+        '--layout',
+        default='large',
+        help='Maze layout to tile.',
+    )
+    hierarchy.add_argument(
+        '--factors',
+        type=int,
+        nargs='+',
+        default=[1, 2, 4, 8, 16],
+        help='Numbers of tiles along each dimension.',
+    )
+    hierarchy.add_argument(
+        '--greedy',
+        type=int,
+        default=8,
+        help='Largest factor on which greedy search is run for reference.',
+    )
+    hierarchy.set_defaults(run=benchmark_hierarchical)
+
+    memory = subparsers.add_parser(
+        'memory',
+        help='Peak memory of A* vs IDA* and SMA* on generated mazes.',
+    )
+    memory.add_argument(
+        '--agents',
+        nargs='+',
+        default=['astar', 'idastar', 'smastar'],
+        help='Python modules containing a `PacmanAgent` class.',
+    )
+    memory.add_argument(
+        '--sizes',
+        type=mazegen.size,
+        nargs='+',
+        default=[(15, 15), (20, 20)],
+        help='Maze sizes as WxH, walls included.',
+    )
+    memory.add_argument(
+        '--pellets',
+        type=int,
+        default=15,
+        help='Number of pellets.',
+    )
+    memory.add_argument(
+        '--limit',
+        type=int,
+        default=None,
+        help='Maximum address space of each game, in MB.',
+    )
+    memory.add_argument(
+        '--timeout',
+        type=float,
+        default=600,
+        help='Maximum duration of each game, in seconds.',
+    )
+    memory.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed of the maze generator.',
+    )
+    memory.set_defaults(run=benchmark_memory)
+
+    args = parser.parse_args()
+    args.run(args)
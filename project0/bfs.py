@@ -1,6 +1,15 @@
+import heapq
+import multiprocessing
+import os
+import shutil
+import tempfile
+
 from pacman_module.game import Agent, Directions
 from pacman_module.util import *
 
+from maze import CompactMaze
+from searchstats import SearchStats, count_expanded
+
 
 def key(state):
     """Returns a key that uniquely identifies a Pacman game state.
@@ -19,13 +28,194 @@ def key(state):
     )
 
 
+def owner(key, partitions):
+    """Returns the partition owning a compact state key.
+
+    Arguments:
+        key: A compact state key. See class `maze.CompactMaze`.
+        partitions: The number of partitions.
+
+    Returns:
+        A partition index in `[0, partitions)`.
+    """
+
+    return hash(key) % partitions
+
+
+def bfs_partition(index, partitions, maze, inboxes, connection):
+    """Worker process of the level-synchronous parallel BFS.
+
+    The worker owns the states `key` such that `owner(key) == index`. At
+    each level, it receives the candidate states of its partition from
+    every worker, keeps those it has never visited (recording their parent
+    pointers), reports to the coordinator and, when asked to, expands its
+    new frontier and sends each successor to the inbox of its owner.
+
+    Each report is a `(goal, frontier size, candidates, expanded)` tuple,
+    where `goal` is a goal state of the frontier, if any, `candidates` is
+    the number of candidate states received and `expanded` is the number
+    of states the worker expanded at the previous level.
+
+    Arguments:
+        index: The index of the partition.
+        partitions: The number of partitions.
+        maze: The compact maze model. See class `maze.CompactMaze`.
+        inboxes: The list of candidate queues, one per partition.
+        connection: The pipe to the coordinator.
+    """
+
+    visited = {}
+    frontier = []
+    expanded = 0
+    senders = 1  # The first level comes from the coordinator only
+
+    while True:
+        goal = None
+        frontier = []
+        candidates = 0
+
+        for _ in range(senders):
+            bucket = inboxes[index].get()
+            candidates += len(bucket)
+            for key, parent, action in bucket:
+                if key in visited:
+                    continue
+                visited[key] = (parent, action)
+                frontier.append(key)
+                if goal is None and maze.is_goal(key):
+                    goal = key
+
+        senders = partitions
+        connection.send((goal, len(frontier), candidates, expanded))
+
+        # Answer the coordinator until it asks for the next level
+        while True:
+            command, argument = connection.recv()
+
+            if command == 'parent':
+                connection.send(visited[argument])
+            elif command == 'expand':
+                break
+            else:
+                return
+
+        buckets = [[] for _ in range(partitions)]
+        expanded = len(frontier)
+        for key in frontier:
+            for action, successor in maze.successors(key):
+                buckets[owner(successor, partitions)].append(
+                    (successor, key, action))
+
+        for inbox, bucket in zip(inboxes, buckets):
+            inbox.put(bucket)
+
+
+def write_keys(path, keys, width):
+    """Writes compact state keys to a file as fixed-width big-endian
+    integers, so that the byte order of the file is the numeric order.
+
+    Arguments:
+        path: The path of the file.
+        keys: An iterable of non-negative integer keys.
+        width: The number of bytes per key.
+
+    Returns:
+        The number of keys written.
+    """
+
+    count = 0
+    with open(path, 'wb') as f:
+        for key in keys:
+            f.write(key.to_bytes(width, 'big'))
+            count += 1
+
+    return count
+
+
+def read_keys(path, width, block=4096):
+    """Reads the compact state keys of a file written by `write_keys`.
+
+    Arguments:
+        path: The path of the file.
+        width: The number of bytes per key.
+        block: The number of keys read at once.
+
+    Returns:
+        A generator over the keys of the file.
+    """
+
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(width * block)
+            if not data:
+                return
+            for i in range(0, len(data), width):
+                yield int.from_bytes(data[i:i + width], 'big')
+
+
+def unique(keys):
+    """Removes the consecutive duplicates of a sorted key stream."""
+
+    previous = None
+    for key in keys:
+        if key != previous:
+            yield key
+            previous = key
+
+
+def difference(keys, *others):
+    """Yields the keys of a sorted stream absent from other sorted streams.
+
+    Arguments:
+        keys: A sorted stream of unique keys.
+        others: Sorted streams of keys to subtract.
+
+    Returns:
+        A generator over the sorted keys of `keys` not in any of `others`.
+    """
+
+    removed = unique(heapq.merge(*others))
+    current = next(removed, None)
+
+    for key in keys:
+        while current is not None and current < key:
+            current = next(removed, None)
+        if current != key:
+            yield key
+
+
 class PacmanAgent(Agent):
-    """Pacman agent based on breadth-first search (BFS)."""
+    """Pacman agent based on breadth-first search (BFS).
+
+    The parallel and external-memory searches expand compact state keys
+    rather than game states, their expansions (those of the workers
+    included) being counted as expanded nodes of the game.
 
-    def __init__(self):
+    Arguments:
+        workers: The number of worker processes. With more than one worker,
+            the search runs level by level over compact state keys
+            partitioned across the workers.
+        external: Whether to run the external-memory search, which keeps
+            the BFS levels on disk.
+        scratch: The directory in which the external-memory search writes
+            its level files (a temporary directory by default).
+        buffer: The maximum number of keys held in memory by the
+            external-memory search.
+        fan_in: The maximum number of files merged at once by the
+            external-memory search.
+    """
+
+    def __init__(self, workers=1, external=False, scratch=None,
+                 buffer=100000, fan_in=64):
         super().__init__()
 
         self.moves = None
+        self.workers = int(workers)
+        self.external = bool(int(external)) or scratch is not None
+        self.scratch = scratch
+        self.buffer = int(buffer)
+        self.fan_in = int(fan_in)
+        self.stats = {}
 
     def get_action(self, state):
         """Given a Pacman game state, returns a legal move.
@@ -38,7 +228,12 @@ class PacmanAgent(Agent):
         """
 
         if self.moves is None:
-            self.moves = self.bfs(state)
+            if self.external:
+                self.moves = self.external_bfs(state)
+            elif self.workers > 1:
+                self.moves = self.parallel_bfs(state)
+            else:
+                self.moves = self.bfs(state)
 
         if self.moves:
             return self.moves.pop(0)
@@ -60,26 +255,264 @@ class PacmanAgent(Agent):
         fringe = Queue()
         fringe.push((state, path))
         closed = set()
+        stats = SearchStats()
+        stats.push()
 
         while True:
             if fringe.isEmpty():
+                self.stats.update(stats.report(closed))
                 return []
 
             current, path = fringe.pop()
+            stats.pop()
 
             if current.isWin():
+                self.stats.update(stats.report(closed))
                 return path
 
-            for successor, action in current.generatePacmanSuccessors():
+            depth = len(path)
+            for successor, action in stats.successors(current, depth):
 
                 # To avoid cycle
                 successor_key = key(successor)
 
                 if successor_key in closed:
+                    stats.prune(depth)
                     continue
 
                 else:
                     closed.add(successor_key)
                     fringe.push((successor, path + [action]))
+                    stats.push()
+
+        return path
+
+    def parallel_bfs(self, state):
+        """Given a Pacman game state, returns a list of legal moves to solve
+        the search layout, using a level-synchronous BFS spread over
+        `self.workers` processes.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Returns:
+            A list of legal moves.
+        """
+
+        maze = CompactMaze(state)
+        partitions = self.workers
+
+        context = multiprocessing.get_context()
+        inboxes = [context.Queue() for _ in range(partitions)]
+        connections = []
+        processes = []
+
+        for index in range(partitions):
+            connection, child = context.Pipe()
+            process = context.Process(
+                target=bfs_partition,
+                args=(index, partitions, maze, inboxes, child),
+                daemon=True,
+            )
+            process.start()
+            connections.append(connection)
+            processes.append(process)
+
+        for index, inbox in enumerate(inboxes):
+            if index == owner(maze.start, partitions):
+                inbox.put([(maze.start, None, None)])
+            else:
+                inbox.put([])
+
+        stats = SearchStats()
+        goal = None
+        depth = 0
+        visited = 0
+
+        try:
+            while True:
+                reports = [connection.recv() for connection in connections]
+                frontier = sum(size for _, size, _, _ in reports)
+                if depth > 0:
+                    # The candidates are the successors of the last level
+                    candidates = sum(count for _, _, count, _ in reports)
+                    expanded = sum(count for _, _, _, count in reports)
+                    count_expanded(expanded)
+                    stats.pop(stats.fringe)
+                    stats.expand(depth - 1, candidates, expanded)
+                    stats.prune(depth - 1, candidates - frontier)
+                visited += frontier
+                stats.push(frontier)
+                stats.store(visited)
+                goals = [key for key, _, _, _ in reports if key is not None]
+
+                if goals:
+                    goal = goals[0]
+                    break
+
+                # No solution
+                if frontier == 0:
+                    break
+
+                depth += 1
+                for connection in connections:
+                    connection.send(('expand', None))
+
+            # Walk the parent pointers back from the goal
+            path = []
+            key = goal
+            while key is not None:
+                connection = connections[owner(key, partitions)]
+                connection.send(('parent', key))
+                key, action = connection.recv()
+                if key is not None:
+                    path.append(CompactMaze.ACTIONS[action])
+            path.reverse()
+        finally:
+            for connection in connections:
+                connection.send(('stop', None))
+            for process in processes:
+                process.join()
+
+        self.stats["Workers"] = partitions
+        self.stats.update(stats.report(visited))
 
         return path
+
+    def external_bfs(self, state):
+        """Given a Pacman game state, returns a list of legal moves to solve
+        the search layout, using an external-memory BFS.
+
+        Each BFS level is stored on disk as a sorted file of compact keys.
+        The successors of a level are generated in sorted runs of at most
+        `self.buffer` keys, merged, and the keys of all the previous levels
+        are removed by a merge pass against a sorted file of the visited
+        keys, into which the new level is then merged. States eating food
+        lead to states never visited before, but the others may lead back
+        to states of any earlier level. The plan is rebuilt by scanning the
+        level files back from the goal.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Returns:
+            A list of legal moves.
+        """
+
+        maze = CompactMaze(state)
+        size = len(maze.cells) << len(maze.food)
+        width = max(1, (size.bit_length() + 7) // 8)
+        directory = tempfile.mkdtemp(prefix='bfs-', dir=self.scratch)
+
+        def level_path(depth):
+            return os.path.join(directory, f'level-{depth}.keys')
+
+        visited_path = os.path.join(directory, 'visited.keys')
+
+        def merge(runs, path):
+            # Merge sorted runs, at most `self.fan_in` files at once
+            while len(runs) > self.fan_in:
+                batch, runs = runs[:self.fan_in], runs[self.fan_in:]
+                merged = batch[0] + '.merged'
+                write_keys(merged, unique(heapq.merge(
+                    *(read_keys(run, width) for run in batch))), width)
+                for run in batch:
+                    os.remove(run)
+                runs.append(merged)
+
+            count = write_keys(path, difference(
+                unique(heapq.merge(*(read_keys(run, width) for run in runs))),
+                read_keys(visited_path, width),
+            ), width)
+            for run in runs:
+                os.remove(run)
+
+            # The new level is disjoint from the visited keys
+            write_keys(visited_path + '.merged', heapq.merge(
+                read_keys(visited_path, width), read_keys(path, width)),
+                width)
+            os.replace(visited_path + '.merged', visited_path)
+
+            return count
+
+        stats = SearchStats()
+
+        try:
+            depth = 0
+            write_keys(level_path(0), [maze.start], width)
+            write_keys(visited_path, [maze.start], width)
+            visited = 1
+            stats.push()
+            peak_disk = 0
+            goal = maze.start if maze.is_goal(maze.start) else None
+
+            while goal is None:
+                runs = []
+                buffer = []
+                expanded = 0
+                generated = 0
+
+                for key in read_keys(level_path(depth), width):
+                    count_expanded()
+                    successors = maze.successors(key)
+                    expanded += 1
+                    generated += len(successors)
+                    for _, successor in successors:
+                        buffer.append(successor)
+                    stats.store(len(buffer))
+                    if len(buffer) >= self.buffer:
+                        runs.append(os.path.join(
+                            directory, f'run-{depth + 1}-{len(runs)}.keys'))
+                        write_keys(runs[-1], unique(sorted(buffer)), width)
+                        buffer = []
+
+                if buffer:
+                    runs.append(os.path.join(
+                        directory, f'run-{depth + 1}-{len(runs)}.keys'))
+                    write_keys(runs[-1], unique(sorted(buffer)), width)
+                    buffer = []
+
+                peak_disk = max(peak_disk, sum(
+                    os.path.getsize(os.path.join(directory, name))
+                    for name in os.listdir(directory)
+                ))
+
+                count = merge(runs, level_path(depth + 1))
+                stats.pop(expanded)
+                stats.expand(depth, generated, expanded)
+                stats.prune(depth, generated - count)
+                stats.push(count)
+                depth += 1
+                visited += count
+
+                # No solution
+                if count == 0:
+                    self.stats.update(stats.report(visited))
+                    return []
+
+                for key in read_keys(level_path(depth), width):
+                    if maze.is_goal(key):
+                        goal = key
+                        break
+
+            # Walk back from the goal through the level files
+            path = []
+            key = goal
+            for d in range(depth - 1, -1, -1):
+                for parent in read_keys(level_path(d), width):
+                    moves = [
+                        action for action, successor in
+                        maze.successors(parent) if successor == key
+                    ]
+                    if moves:
+                        path.append(CompactMaze.ACTIONS[moves[0]])
+                        key = parent
+                        break
+            path.reverse()
+
+            self.stats.update(stats.report(visited))
+            self.stats["Peak scratch disk usage (bytes)"] = peak_disk
+
+            return path
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
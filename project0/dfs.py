@@ -1,6 +1,8 @@
 from pacman_module.game import Agent, Directions
 from pacman_module.util import Stack
 
+from searchstats import SearchStats
+
 
 def key(state):
     """Returns a key that uniquely identifies a Pacman game state.
@@ -26,6 +28,7 @@ class PacmanAgent(Agent):
         super().__init__()
 
         self.moves = None
+        self.stats = {}
 
     def get_action(self, state):
         """Given a Pacman game state, returns a legal move.
@@ -62,25 +65,34 @@ class PacmanAgent(Agent):
         fringe = Stack()
         fringe.push((state, path))
         closed = set()
+        stats = SearchStats()
+        stats.push()
 
         while True:
             if fringe.isEmpty():
+                self.stats.update(stats.report(closed))
                 return []
 
             current, path = fringe.pop()
+            stats.pop()
 
             if current.isWin():
+                self.stats.update(stats.report(closed))
                 return path
 
             #To avoid cycle
             current_key = key(current)
 
             if current_key in closed:
+                # Duplicates are only detected when popped
+                stats.prune(len(path) - 1)
                 continue
             else:
                 closed.add(current_key)
 
-            for successor, action in current.generatePacmanSuccessors():
+            depth = len(path)
+            for successor, action in stats.successors(current, depth):
                 fringe.push((successor, path + [action]))
+                stats.push()
 
         return path
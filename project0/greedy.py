@@ -0,0 +1,99 @@
+from pacman_module.game import Agent, Directions
+from pacman_module.util import PriorityQueue
+
+from maze import FoodHeuristic
+from searchstats import SearchStats
+
+
+def unwind(node):
+    """Returns the list of moves of a path stored as nested
+    `(action, parent)` pairs, the root being None."""
+
+    path = []
+    while node is not None:
+        action, node = node
+        path.append(action)
+    path.reverse()
+
+    return path
+
+
+class PacmanAgent(Agent):
+    """Pacman agent based on greedy best-first search.
+
+    States are expanded in the order of the greedy estimate of
+    `maze.FoodHeuristic` (remaining dots, then distance to the closest
+    one), ignoring path costs, so that plans are found quickly but are
+    usually not the shortest.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        self.moves = None
+        self.stats = {}
+
+    def get_action(self, state):
+        """Given a Pacman game state, returns a legal move.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Return:
+            A legal move as defined in `game.Directions`.
+        """
+
+        if self.moves is None:
+            self.moves = self.greedy(state)
+
+        if self.moves:
+            return self.moves.pop(0)
+        else:
+            return Directions.STOP
+
+    def greedy(self, state):
+        """Given a Pacman game state, returns a list of legal moves to solve
+        the search layout.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Returns:
+            A list of legal moves.
+        """
+
+        heuristic = FoodHeuristic(state)
+        stats = SearchStats()
+        closed = set()
+        fringe = PriorityQueue()
+        fringe.push((state, 0, None), (0, 0))
+        stats.push()
+
+        while not fringe.isEmpty():
+            _, (current, depth, node) = fringe.pop()
+            stats.pop()
+
+            if current.isWin():
+                self.stats.update(stats.report(closed))
+                return unwind(node)
+
+            current_key = heuristic.key(current)
+            if current_key in closed:
+                continue
+            closed.add(current_key)
+
+            for successor, action in stats.successors(current, depth):
+                successor_key = heuristic.key(successor)
+                if successor_key in closed:
+                    stats.prune(depth)
+                    continue
+
+                fringe.push(
+                    (successor, depth + 1, (action, node)),
+                    heuristic.greedy(*successor_key),
+                )
+                stats.push()
+
+        # No solution
+        self.stats.update(stats.report(closed))
+        return []
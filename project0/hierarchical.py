@@ -0,0 +1,439 @@
+import collections
+import heapq
+
+from pacman_module.game import Actions, Agent, Directions
+from pacman_module.util import manhattanDistance
+
+from searchstats import SearchStats, count_expanded
+
+
+def bfs_tree(source, cells, stats):
+    """Breadth-first search from a cell, restricted to a set of cells.
+
+    Arguments:
+        source: The source cell as a `(x, y)` pair.
+        cells: The set of cells the search may enter.
+        stats: The `SearchStats` of the agent.
+
+    Returns:
+        A dictionary mapping each reached cell to its `(distance, parent)`
+        pair, the parent of the source being None.
+    """
+
+    tree = {source: (0, None)}
+    fringe = collections.deque([source])
+    stats.push()
+
+    while fringe:
+        cell = fringe.popleft()
+        stats.pop()
+        distance = tree[cell][0] + 1
+        successors = [other for other in neighbors(cell) if other in cells]
+        count_expanded()
+        stats.expand(distance - 1, len(successors))
+        for neighbor in successors:
+            if neighbor not in tree:
+                tree[neighbor] = (distance, cell)
+                fringe.append(neighbor)
+                stats.push()
+            else:
+                stats.prune(distance - 1)
+
+    return tree
+
+
+def neighbors(cell):
+    """Returns the four cells adjacent to a cell."""
+
+    x, y = cell
+    return [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+
+
+def walk(tree, target):
+    """Returns the cells from the root of a BFS tree to `target`, both
+    included."""
+
+    path = []
+    while target is not None:
+        path.append(target)
+        target = tree[target][1]
+    path.reverse()
+
+    return path
+
+
+class Regions:
+    """Partition of the free cells of a maze into regions.
+
+    The maze is tiled into `block` x `block` squares and the free cells of
+    each square are split into connected components, which are the
+    regions. Two regions are adjacent if a move links them (a doorway).
+    Each region is represented by its cell closest to its centroid, and the
+    abstract graph weighs adjacent regions by the Manhattan distance
+    between their representatives.
+
+    Arguments:
+        walls: The W x H grid of walls.
+        block: The side of the squares.
+        stats: The `SearchStats` recording the abstract searches.
+    """
+
+    def __init__(self, walls, block, stats):
+        self.stats = stats
+        self.region = {}
+        self.cells = []
+
+        for x in range(walls.width):
+            for y in range(walls.height):
+                if walls[x][y] or (x, y) in self.region:
+                    continue
+
+                # Flood fill the free cells of the same square
+                square = (x // block, y // block)
+                index = len(self.cells)
+                component = {(x, y)}
+                fringe = [(x, y)]
+                self.region[(x, y)] = index
+                while fringe:
+                    cell = fringe.pop()
+                    for nx, ny in neighbors(cell):
+                        if (nx // block, ny // block) == square \
+                                and not walls[nx][ny] \
+                                and (nx, ny) not in self.region:
+                            self.region[(nx, ny)] = index
+                            component.add((nx, ny))
+                            fringe.append((nx, ny))
+                self.cells.append(component)
+
+        self.representative = []
+        for component in self.cells:
+            cx = sum(x for x, _ in component) / len(component)
+            cy = sum(y for _, y in component) / len(component)
+            self.representative.append(min(
+                component,
+                key=lambda cell: (abs(cell[0] - cx) + abs(cell[1] - cy),
+                                  cell),
+            ))
+
+        self.adjacent = [set() for _ in self.cells]
+        self.doorways = 0
+        for cell, index in self.region.items():
+            for neighbor in neighbors(cell):
+                other = self.region.get(neighbor)
+                if other is not None and other != index:
+                    self.adjacent[index].add(other)
+                    self.doorways += 1
+        self.doorways //= 2
+
+    def __len__(self):
+        return len(self.cells)
+
+    def search(self, source, targets, goal=None):
+        """Shortest path search on the abstract graph, from a region to the
+        closest of a set of regions. If `goal` is given, the search is an
+        A* towards it, guided by the Manhattan distance between
+        representatives (consistent with the edge weights).
+
+        Arguments:
+            source: The source region.
+            targets: The set of target regions.
+            goal: The single target region, if any.
+
+        Returns:
+            The list of the regions of the path, from `source` to the
+            target reached, or None if no target can be reached.
+        """
+
+        def h(index):
+            if goal is None:
+                return 0
+            return manhattanDistance(
+                self.representative[index], self.representative[goal])
+
+        distances = {source: 0}
+        predecessors = {source: None}
+        depths = {source: 0}
+        fringe = [(h(source), source)]
+        self.stats.push()
+
+        while fringe:
+            _, index = heapq.heappop(fringe)
+            self.stats.pop()
+            if index in targets:
+                self.stats.pop(len(fringe))
+                path = []
+                while index is not None:
+                    path.append(index)
+                    index = predecessors[index]
+                path.reverse()
+                return path
+
+            depth = depths[index]
+            count_expanded()
+            self.stats.expand(depth, len(self.adjacent[index]))
+            for other in self.adjacent[index]:
+                candidate = distances[index] + manhattanDistance(
+                    self.representative[index], self.representative[other])
+                if candidate < distances.get(other, float('inf')):
+                    distances[other] = candidate
+                    predecessors[other] = index
+                    depths[other] = depth + 1
+                    heapq.heappush(fringe, (candidate + h(other), other))
+                    self.stats.push()
+                else:
+                    self.stats.prune(depth)
+
+        return None
+
+
+class PacmanAgent(Agent):
+    """Pacman agent based on hierarchical planning over maze regions.
+
+    The free cells are partitioned into regions (see `Regions`). The order
+    in which the regions holding food are visited is planned on the
+    abstract region graph (nearest neighbor, then windowed 2-opt). Pacman
+    then travels to each region in turn, through the regions on the
+    abstract shortest path, and eats its food with a local tour, which is
+    exact (Held-Karp) for at most `exact` dots and nearest neighbor
+    otherwise.
+
+    Every search is restricted to a few regions, so that planning time
+    grows roughly linearly with the maze size. Plans are not optimal. The
+    searches run on cells and regions rather than game states, their
+    expansions being counted as expanded nodes of the game.
+
+    Arguments:
+        block: The side of the squares the regions are cut from.
+        exact: The maximum number of dots of an exact local tour.
+        window: The maximum distance between the regions of a 2-opt move,
+            in positions of the tour.
+    """
+
+    def __init__(self, block=6, exact=8, window=16):
+        super().__init__()
+
+        self.moves = None
+        self.block = int(block)
+        self.exact = int(exact)
+        self.window = int(window)
+        self.stats = {}
+
+    def get_action(self, state):
+        """Given a Pacman game state, returns a legal move.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Return:
+            A legal move as defined in `game.Directions`.
+        """
+
+        if self.moves is None:
+            self.moves = self.hierarchical(state)
+
+        if self.moves:
+            return self.moves.pop(0)
+        else:
+            return Directions.STOP
+
+    def hierarchical(self, state):
+        """Given a Pacman game state, returns a list of legal moves to solve
+        the search layout.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Returns:
+            A list of legal moves.
+        """
+
+        walls = state.getWalls()
+        stats = SearchStats()
+        regions = Regions(walls, self.block, stats)
+
+        food = collections.defaultdict(set)
+        for dot in state.getFood().asList():
+            food[regions.region[dot]].add(dot)
+
+        position = state.getPacmanPosition()
+        order = self.order(regions, regions.region[position], list(food))
+
+        self.stats.update({
+            "Regions": len(regions),
+            "Doorways": regions.doorways,
+            "Food regions": len(food),
+        })
+
+        path = [position]
+        for i, index in enumerate(order):
+            if not food[index]:
+                continue  # Eaten on the way
+
+            # Travel to the region through the abstract shortest path
+            if regions.region[path[-1]] != index:
+                segment = self.travel(regions, path[-1], index)
+                self.eat(food, regions, segment)
+                path += segment[1:]
+                if not food[index]:
+                    continue
+
+            # Aim the local tour at the next region
+            following = order[i + 1] if i + 1 < len(order) else None
+            target = None if following is None \
+                else regions.representative[following]
+            segment = self.tour(regions, path[-1], food[index], target)
+            self.eat(food, regions, segment)
+            path += segment[1:]
+
+        self.stats.update(stats.report())
+
+        return [
+            Actions.vectorToDirection((b[0] - a[0], b[1] - a[1]))
+            for a, b in zip(path, path[1:])
+        ]
+
+    def order(self, regions, start, targets):
+        """Plans the order of visit of the food regions.
+
+        The tour is built by nearest neighbor on the abstract graph, each
+        search stopping at the closest unvisited region, then improved by
+        2-opt moves between regions at most `window` positions apart.
+
+        Arguments:
+            regions: The `Regions` partition.
+            start: The region of Pacman.
+            targets: The regions holding food.
+
+        Returns:
+            The list of the regions to visit.
+        """
+
+        # Nearest neighbor
+        tour = [start]
+        remaining = set(targets) - {start}
+        while remaining:
+            path = regions.search(tour[-1], remaining)
+            if path is None:
+                break  # Unreachable food
+            tour.append(path[-1])
+            remaining.discard(path[-1])
+
+        costs = {}
+
+        def cost(a, b):
+            if (a, b) not in costs:
+                path = regions.search(a, {b}, b)
+                costs[(a, b)] = costs[(b, a)] = float('inf') \
+                    if path is None else sum(
+                        manhattanDistance(
+                            regions.representative[u],
+                            regions.representative[v])
+                        for u, v in zip(path, path[1:]))
+            return costs[(a, b)]
+
+        # 2-opt on the open tour, the start being fixed
+        improved = True
+        while improved:
+            improved = False
+            for i in range(1, len(tour)):
+                for j in range(i + 1, min(i + self.window, len(tour))):
+                    before = cost(tour[i - 1], tour[i])
+                    after = cost(tour[i - 1], tour[j])
+                    if j + 1 < len(tour):
+                        before += cost(tour[j], tour[j + 1])
+                        after += cost(tour[i], tour[j + 1])
+                    if after < before:
+                        tour[i:j + 1] = reversed(tour[i:j + 1])
+                        improved = True
+
+        if start not in targets:
+            tour.pop(0)
+
+        return tour
+
+    def travel(self, regions, source, index):
+        """Returns the cells of a shortest path from a cell to a region,
+        within the regions on the abstract shortest path between them."""
+
+        path = regions.search(regions.region[source], {index}, index)
+        allowed = set()
+        for other in path:
+            allowed |= regions.cells[other]
+
+        tree = bfs_tree(source, allowed, regions.stats)
+        regions.stats.store(len(tree))
+        entry = min(
+            (cell for cell in tree if regions.region[cell] == index),
+            key=lambda cell: (tree[cell][0], cell),
+        )
+
+        return walk(tree, entry)
+
+    def tour(self, regions, source, dots, target):
+        """Returns the cells of a path from a cell eating all the dots of
+        its region, ending close to `target` if given."""
+
+        cells = regions.cells[regions.region[source]]
+        dots = sorted(dots)
+        trees = [bfs_tree(dot, cells, regions.stats) for dot in dots]
+        regions.stats.store(sum(len(tree) for tree in trees))
+        start = [tree[source][0] for tree in trees]
+
+        def leave(i):
+            if target is None:
+                return 0
+            return manhattanDistance(dots[i], target)
+
+        n = len(dots)
+        if n <= self.exact:
+            # Held-Karp over the subsets of dots
+            best = {}
+            for i in range(n):
+                best[(1 << i, i)] = (start[i], None)
+            for mask in range(1, 1 << n):
+                for i in range(n):
+                    if (mask, i) not in best:
+                        continue
+                    length = best[(mask, i)][0]
+                    for j in range(n):
+                        if mask & (1 << j):
+                            continue
+                        key = (mask | 1 << j, j)
+                        candidate = length + trees[i][dots[j]][0]
+                        if key not in best or candidate < best[key][0]:
+                            best[key] = (candidate, i)
+
+            full = (1 << n) - 1
+            last = min(range(n), key=lambda i: best[(full, i)][0] + leave(i))
+            sequence = []
+            mask = full
+            while last is not None:
+                sequence.append(last)
+                _, previous = best[(mask, last)]
+                mask &= ~(1 << last)
+                last = previous
+            sequence.reverse()
+        else:
+            # Nearest neighbor
+            sequence = [min(range(n), key=lambda i: start[i])]
+            remaining = set(range(n)) - set(sequence)
+            while remaining:
+                tree = trees[sequence[-1]]
+                closest = min(remaining, key=lambda j: (tree[dots[j]][0], j))
+                sequence.append(closest)
+                remaining.discard(closest)
+
+        # Paths are read backwards from the BFS trees of the dots
+        path = [source]
+        for i in sequence:
+            segment = walk(trees[i], path[-1])
+            segment.reverse()
+            path += segment[1:]
+
+        return path
+
+    def eat(self, food, regions, path):
+        """Removes the dots on a path from the remaining food."""
+
+        for cell in path:
+            food[regions.region[cell]].discard(cell)
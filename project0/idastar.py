@@ -0,0 +1,150 @@
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from pacman_module.game import Agent, Directions
+
+from maze import FoodHeuristic
+from searchstats import SearchStats
+
+
+class PacmanAgent(Agent):
+    """Pacman agent based on iterative deepening A* (IDA*).
+
+    Memory is bounded by the depth of the current path plus a
+    transposition table holding at most `table_size` entries.
+
+    Arguments:
+        table_size: The maximum number of transposition table entries.
+        weight: The weight of the heuristic (1 for optimal plans).
+    """
+
+    def __init__(self, table_size=100000, weight=1):
+        super().__init__()
+
+        self.moves = None
+        self.table_size = int(table_size)
+        self.weight = float(weight)
+        self.stats = {}
+
+    def get_action(self, state):
+        """Given a Pacman game state, returns a legal move.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Return:
+            A legal move as defined in `game.Directions`.
+        """
+
+        if self.moves is None:
+            self.moves = self.idastar(state)
+
+            if resource is not None:
+                self.stats["Peak resident memory (kB)"] = resource.getrusage(
+                    resource.RUSAGE_SELF).ru_maxrss
+
+        if self.moves:
+            return self.moves.pop(0)
+        else:
+            return Directions.STOP
+
+    def idastar(self, state):
+        """Given a Pacman game state, returns a list of legal moves to solve
+        the search layout.
+
+        Each iteration is a depth-first search bounded by `g + w * h`. The
+        transposition table records the largest remaining budget with which
+        each state has been searched, across iterations, and prunes states
+        reached again with an equal or smaller budget.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Returns:
+            A list of legal moves.
+        """
+
+        heuristic = FoodHeuristic(state)
+        stats = SearchStats()
+        table = {}
+        iteration = 0
+        bound = self.weight * stats.heuristic(heuristic, state)
+
+        if state.isWin():
+            return []
+
+        while True:
+            iteration += 1
+            next_bound = float('inf')
+
+            # Each frame is [state, key, g, successors, next child index]
+            stack = [[state, heuristic.key(state), 0, None, 0]]
+            path = []
+            on_path = {stack[0][1]}
+            table[stack[0][1]] = bound
+            stats.push()
+
+            while stack:
+                frame = stack[-1]
+                current, current_key, g, successors, index = frame
+
+                if successors is None:
+                    successors = []
+                    for successor, action in stats.successors(current, g):
+                        successor_key = heuristic.key(successor)
+                        h = stats.heuristic(
+                            heuristic.estimate, *successor_key)
+                        successors.append(
+                            (h, successor_key, successor, action))
+                    successors.sort(key=lambda entry: entry[0])
+                    frame[3] = successors
+
+                if index == len(successors):
+                    stack.pop()
+                    stats.pop()
+                    on_path.discard(current_key)
+                    if path:
+                        path.pop()
+                    continue
+
+                frame[4] += 1
+                h, successor_key, successor, action = successors[index]
+
+                if successor.isWin():
+                    self.stats["Iterations"] = iteration
+                    self.stats.update(stats.report(table))
+                    return path + [action]
+
+                f = g + 1 + self.weight * h
+                if f > bound:
+                    next_bound = min(next_bound, f)
+                    continue
+
+                if successor_key in on_path:
+                    stats.prune(g)
+                    continue
+
+                budget = bound - g - 1
+                entry = table.get(successor_key)
+                if entry is not None and entry >= budget:
+                    stats.prune(g)
+                    continue
+
+                if entry is not None or len(table) < self.table_size:
+                    table[successor_key] = budget
+
+                stack.append([successor, successor_key, g + 1, None, 0])
+                on_path.add(successor_key)
+                path.append(action)
+                stats.push()
+                stats.store(len(stack) + len(table))
+
+            # No solution
+            if next_bound == float('inf'):
+                self.stats["Iterations"] = iteration
+                self.stats.update(stats.report(table))
+                return []
+
+            bound = next_bound
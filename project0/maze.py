@@ -0,0 +1,244 @@
+from pacman_module.game import Actions, Directions
+from pacman_module.util import Queue
+
+
+def maze_distances(walls, source):
+    """Computes the maze distance from a cell to every reachable cell.
+
+    Arguments:
+        walls: The W x H grid of walls.
+        source: A free cell as a `(x, y)` pair.
+
+    Returns:
+        A dictionary mapping each reachable cell to its maze distance
+        from `source`.
+    """
+
+    distances = {source: 0}
+    fringe = Queue()
+    fringe.push(source)
+
+    while not fringe.isEmpty():
+        cell = fringe.pop()
+
+        for neighbor in Actions.getLegalNeighbors(cell, walls):
+            if neighbor not in distances:
+                distances[neighbor] = distances[cell] + 1
+                fringe.push(neighbor)
+
+    return distances
+
+
+class FoodHeuristic:
+    """Admissible heuristic for the food collection problem.
+
+    For every pair of remaining food dots, Pacman must at least reach the
+    closest one and then walk to the other. The estimate is the largest
+    such bound (or the distance to the farthest dot if only one is left).
+    Maze distances are computed once per food dot of the initial state.
+
+    Arguments:
+        state: The initial game state. See class `pacman.GameState`.
+    """
+
+    def __init__(self, state):
+        walls = state.getWalls()
+
+        self.food = state.getFood().asList()
+        self.distances = [maze_distances(walls, dot) for dot in self.food]
+        self.between = [
+            [distances.get(dot, 0) for dot in self.food]
+            for distances in self.distances
+        ]
+
+    def mask(self, state):
+        """Returns the bitmask of the initial food dots still present.
+
+        Arguments:
+            state: a game state. See class `pacman.GameState`.
+
+        Returns:
+            An integer whose i-th bit is set if `self.food[i]` remains.
+        """
+
+        food = state.getFood()
+        mask = 0
+        for i, (x, y) in enumerate(self.food):
+            if food[x][y]:
+                mask |= 1 << i
+
+        return mask
+
+    def key(self, state):
+        """Returns a compact key that uniquely identifies a Pacman game
+        state of the food collection problem.
+
+        Arguments:
+            state: a game state. See class `pacman.GameState`.
+
+        Returns:
+            A hashable `(position, food mask)` pair.
+        """
+
+        return state.getPacmanPosition(), self.mask(state)
+
+    def estimate(self, position, mask):
+        """Returns the heuristic value of a compact state.
+
+        Arguments:
+            position: Pacman's position as a `(x, y)` pair.
+            mask: The bitmask of the remaining food dots.
+
+        Returns:
+            A lower bound on the number of moves to eat all the food.
+        """
+
+        remaining = []
+        i = 0
+        while mask:
+            if mask & 1:
+                remaining.append(i)
+            mask >>= 1
+            i += 1
+
+        reach = [self.distances[i].get(position, 0) for i in remaining]
+        h = max(reach, default=0)
+
+        for a in range(len(remaining)):
+            row = self.between[remaining[a]]
+            for b in range(a + 1, len(remaining)):
+                h = max(h, min(reach[a], reach[b]) + row[remaining[b]])
+
+        return h
+
+    def greedy(self, position, mask):
+        """Returns a greedy (inadmissible) estimate of a compact state,
+        ordering states by the number of remaining food dots, then by the
+        maze distance to the closest one.
+
+        From any non-goal state, moving towards the closest dot decreases
+        the estimate, so that greedy searches following it cannot loop.
+
+        Arguments:
+            position: Pacman's position as a `(x, y)` pair.
+            mask: The bitmask of the remaining food dots.
+
+        Returns:
+            A `(remaining dots, distance to the closest dot)` pair.
+        """
+
+        count = 0
+        nearest = 0
+        i = 0
+        while mask:
+            if mask & 1:
+                distance = self.distances[i].get(position, 0)
+                nearest = distance if count == 0 else min(nearest, distance)
+                count += 1
+            mask >>= 1
+            i += 1
+
+        return count, nearest
+
+    def __call__(self, state):
+        """Returns the heuristic value of a game state.
+
+        Arguments:
+            state: a game state. See class `pacman.GameState`.
+
+        Returns:
+            A lower bound on the number of moves to eat all the food.
+        """
+
+        return self.estimate(state.getPacmanPosition(), self.mask(state))
+
+
+class CompactMaze:
+    """Compact integer model of the food collection problem.
+
+    Free cells are numbered and a state is encoded as the single integer
+    `mask * len(cells) + cell`, where `mask` is the bitmask of the remaining
+    initial food dots. Successors are computed from precomputed neighbor
+    lists, without building any game state. The model is picklable so that
+    it can be shipped to worker processes.
+
+    Arguments:
+        state: The initial game state. See class `pacman.GameState`.
+    """
+
+    ACTIONS = [
+        Directions.NORTH,
+        Directions.SOUTH,
+        Directions.EAST,
+        Directions.WEST,
+    ]
+
+    def __init__(self, state):
+        walls = state.getWalls()
+
+        self.cells = [
+            (x, y)
+            for x in range(walls.width)
+            for y in range(walls.height)
+            if not walls[x][y]
+        ]
+        self.index = {cell: i for i, cell in enumerate(self.cells)}
+        self.food = state.getFood().asList()
+
+        self.bits = [0] * len(self.cells)
+        for i, dot in enumerate(self.food):
+            self.bits[self.index[dot]] = 1 << i
+
+        self.neighbors = []
+        for x, y in self.cells:
+            neighbors = []
+            for action, direction in enumerate(self.ACTIONS):
+                dx, dy = Actions.directionToVector(direction)
+                cell = (x + int(dx), y + int(dy))
+                if cell in self.index:
+                    neighbors.append((action, self.index[cell]))
+            self.neighbors.append(neighbors)
+
+        self.start = self.encode(state)
+
+    def encode(self, state):
+        """Returns the integer key of a game state.
+
+        Arguments:
+            state: a game state. See class `pacman.GameState`.
+
+        Returns:
+            The compact key of `state`.
+        """
+
+        food = state.getFood()
+        mask = 0
+        for i, (x, y) in enumerate(self.food):
+            if food[x][y]:
+                mask |= 1 << i
+
+        return mask * len(self.cells) + self.index[state.getPacmanPosition()]
+
+    def successors(self, key):
+        """Returns the successors of a compact state.
+
+        Arguments:
+            key: The compact key of a state.
+
+        Returns:
+            A list of `(action index, successor key)` pairs, where the action
+            index refers to `CompactMaze.ACTIONS`.
+        """
+
+        size = len(self.cells)
+        mask, cell = divmod(key, size)
+
+        return [
+            (action, (mask & ~self.bits[neighbor]) * size + neighbor)
+            for action, neighbor in self.neighbors[cell]
+        ]
+
+    def is_goal(self, key):
+        """Returns whether all the food is eaten in a compact state."""
+
+        return key < len(self.cells)
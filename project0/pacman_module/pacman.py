@@ -158,8 +158,8 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        # Generated states are not recorded in `GameState.explored`: the set
+        # is never read and would keep every state of a search alive.
         return state
 
     def getLegalPacmanActions(self):
@@ -178,6 +178,7 @@ class GameState:
         if (GameState.countExpanded >= GameState.maximumExpanded):
             raise Exception("Too many expanded nodes")
         GameState.countExpanded += 1
+        self._expanded = True
         return [(self.generateSuccessor(0, action),action) for action in self.getLegalPacmanActions() if action != Directions.STOP]
 
     def generateGhostSuccessors(self,index):
@@ -190,8 +191,58 @@ class GameState:
         elif (GameState.countExpanded >= GameState.maximumExpanded):
             raise Exception("Too many expanded nodes")
         GameState.countExpanded += 1
+        self._expanded = True
         return [(self.generateSuccessor(index, action),action) for action in self.getLegalActions(index) if action != Directions.STOP]
 
+    def iterPacmanSuccessors(self):
+        """
+        Yields the pairs of successor states and moves given the current state s for the pacman agent, each
+        successor being generated only when the iteration reaches it. The state counts as one expanded node
+        when its first successor is generated (see expandPacmanSuccessor).
+        """
+        for action in self.getLegalPacmanActions():
+            if action != Directions.STOP:
+                yield self.expandPacmanSuccessor(action), action
+
+    def iterGhostSuccessors(self, index):
+        """
+        Yields the pairs of successor states and moves given the current state s for the ghost agent (>0), each
+        successor being generated only when the iteration reaches it. The state counts as one expanded node
+        when its first successor is generated (see expandGhostSuccessor).
+        """
+        for action in self.getLegalActions(index):
+            if action != Directions.STOP:
+                yield self.expandGhostSuccessor(index, action), action
+
+    def expandPacmanSuccessor(self, action):
+        """
+        Generates the successor state after the specified pacman move. Unlike generatePacmanSuccessor, the
+        current state counts as one expanded node, the first time one of its successors is generated by
+        the expand/iter methods, however many are generated.
+        """
+        self._expand()
+        return self.generateSuccessor(0, action)
+
+    def expandGhostSuccessor(self, index, action):
+        """
+        Generates the successor state after the specified move of the ghost agent (>0), counting the current
+        state as one expanded node like expandPacmanSuccessor.
+        """
+        if index == 0:
+            raise Exception("Invalid index passed to expandGhostSuccessor")
+        self._expand()
+        return self.generateSuccessor(index, action)
+
+    def _expand(self):
+        """
+        Counts the state as expanded, once, within the node expansion budget.
+        """
+        if not self._expanded:
+            if (GameState.countExpanded >= GameState.maximumExpanded):
+                raise Exception("Too many expanded nodes")
+            GameState.countExpanded += 1
+            self._expanded = True
+
     def getPacmanState(self):
         """
         Returns an AgentState object for pacman (in game.py)
@@ -304,6 +355,8 @@ class GameState:
             self.data = GameStateData(prevState.data)
         else:
             self.data = GameStateData()
+        # Whether the successors of the state were already counted
+        self._expanded = False
 
     def deepCopy(self):
         state = GameState(self)
@@ -31,6 +31,7 @@ import inspect
 import heapq
 import random
 import io
+import collections
 
 
 class FixedRandom:
@@ -215,6 +216,106 @@ class PriorityQueue:
             self.push(item, priority)
 
 
+class BucketQueue:
+    """
+      Implements a bucket priority queue (Dial's algorithm) for integer
+      priorities, as a drop-in replacement for PriorityQueue. Items are
+      kept in one FIFO bucket per priority, so that items with equal
+      priorities are popped in insertion order, as with PriorityQueue.
+      A cursor moves up from the lowest priority to the next non-empty
+      bucket, so that push is O(1) and pop is O(1) amortized when pushed
+      priorities are never below the last popped one and span a small
+      range (e.g. f-values of A* with a consistent heuristic). Pushing
+      below the cursor moves it back. Infinite priorities are accepted and
+      popped last.
+      update is a lazy decrease-key: the old entry is only marked as
+      removed and skipped when it reaches the front of its bucket. Only
+      the items of update are tracked, and thus hashed.
+      With push and pop only, this queue is not faster than PriorityQueue
+      (see `benchmark.py queue`); it pays off with many updates.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.infinite = collections.deque()
+        self.cursor = None
+        self.finder = {}
+        self.count = 0
+        # Entries in finite buckets, removed ones included
+        self.stored = 0
+
+    def push(self, item, priority):
+        # Entries are [priority, item, removed, tracked]
+        self._insert([self._integer(priority), item, False, False])
+
+    def pop(self):
+        while self.count > 0:
+            if self.stored > 0:
+                bucket = self.buckets.get(self.cursor)
+                if not bucket:
+                    # Move to the next bucket
+                    self.buckets.pop(self.cursor, None)
+                    self.cursor += 1
+                    continue
+                self.stored -= 1
+            else:
+                bucket = self.infinite
+            entry = bucket.popleft()
+            priority, item, removed, tracked = entry
+            if removed:
+                continue
+            if tracked and self.finder.get(item) is entry:
+                del self.finder[item]
+            self.count -= 1
+            if self.count == 0:
+                # Drop the stale entries left behind by update
+                self.__init__()
+            return (priority, item)
+        raise IndexError('pop from an empty priority queue')
+
+    def isEmpty(self):
+        return self.count == 0
+
+    def update(self, item, priority):
+        # If item already in priority queue with higher priority, update its
+        # priority and lazily remove its previous entry.
+        # If item already in priority queue with equal or lower priority, do
+        # nothing.
+        # If item not in priority queue, do the same thing as self.push.
+        priority = self._integer(priority)
+        entry = self.finder.get(item)
+        if entry is not None and not entry[2]:
+            if entry[0] <= priority:
+                return
+            entry[2] = True
+            self.count -= 1
+        entry = [priority, item, False, True]
+        self.finder[item] = entry
+        self._insert(entry)
+
+    def _insert(self, entry):
+        priority = entry[0]
+        if priority == float('inf'):
+            self.infinite.append(entry)
+        else:
+            bucket = self.buckets.get(priority)
+            if bucket is None:
+                bucket = self.buckets[priority] = collections.deque()
+            bucket.append(entry)
+            self.stored += 1
+            if self.cursor is None or priority < self.cursor:
+                self.cursor = priority
+        self.count += 1
+
+    @staticmethod
+    def _integer(priority):
+        if priority == float('inf'):
+            return priority
+        if priority != int(priority):
+            raise ValueError('BucketQueue priorities must be integers')
+        return int(priority)
+
+
 class PriorityQueueWithFunction(PriorityQueue):
     """
     Implements a priority queue with the same push/pop signature of the
@@ -0,0 +1,264 @@
+import collections
+import hashlib
+import importlib
+import json
+import modulefinder
+import os
+import tempfile
+import time
+
+from pacman_module.game import Agent, Directions
+
+
+def local_sources(module):
+    """Returns the paths of the source files of a module and of the modules
+    it imports, transitively, from its directory (e.g. `maze`,
+    `searchstats` or `pacman_module.util`).
+
+    Arguments:
+        module: A module loaded from a source file.
+
+    Returns:
+        The sorted list of paths.
+    """
+
+    directory = os.path.dirname(os.path.abspath(module.__file__))
+    finder = modulefinder.ModuleFinder(path=[directory])
+    finder.run_script(module.__file__)
+
+    paths = {os.path.abspath(module.__file__)}
+    for found in finder.modules.values():
+        if found.__file__ is not None:
+            path = os.path.abspath(found.__file__)
+            if path.startswith(directory + os.sep):
+                paths.add(path)
+
+    return sorted(paths)
+
+
+def agent_identity(module, agentargs):
+    """Returns a string identifying an agent and its heuristic.
+
+    The identity includes a digest of the sources of the agent module and
+    of the modules it imports from the project (see `local_sources`), so
+    that plans cached before the search, its heuristic or the game changed
+    are not reused. Modules imported at run time are taken from the
+    optional `dependencies(agentargs)` function of the agent module, which
+    returns their names.
+
+    Arguments:
+        module: The module containing the `PacmanAgent` class.
+        agentargs: The dictionary of agent options.
+
+    Returns:
+        The identity string.
+    """
+
+    directory = os.path.dirname(os.path.abspath(module.__file__))
+    modules = [module]
+    if hasattr(module, 'dependencies'):
+        modules += [importlib.import_module(name)
+                    for name in module.dependencies(agentargs)]
+    paths = sorted({path for m in modules for path in local_sources(m)})
+
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.relpath(path, directory).encode() + b'\0')
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    source = digest.hexdigest()
+
+    options = ','.join(f"{k}={v}" for k, v in sorted(agentargs.items()))
+
+    return f"{module.__name__}[{options}]@{source[:16]}"
+
+
+class PlanCache:
+    """Two-level cache of plans (lists of legal moves).
+
+    Plans are kept in an in-memory LRU dictionary and in an on-disk store,
+    one JSON file per plan. When the store exceeds `max_bytes`, the least
+    recently used files (by modification time) are evicted.
+
+    Arguments:
+        directory: The directory of the on-disk store.
+        max_bytes: The maximum size of the on-disk store, in bytes.
+        memory_size: The maximum number of plans kept in memory.
+    """
+
+    def __init__(self, directory, max_bytes=16 * 2 ** 20, memory_size=128):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.memory_size = int(memory_size)
+        self.memory = collections.OrderedDict()
+
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(state, identity):
+        """Returns the cache key of a start state.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+            identity: The agent identity, see `agent_identity`.
+
+        Returns:
+            A hexadecimal digest of the layout text, the start state and
+            the agent identity.
+        """
+
+        start = {
+            'layout': state.data.layout.layoutText,
+            'pacman': state.getPacmanPosition(),
+            'food': sorted(state.getFood().asList()),
+            'capsules': sorted(state.getCapsules()),
+            'agent': identity,
+        }
+        text = json.dumps(start, sort_keys=True)
+
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Looks a plan up, first in memory then on disk.
+
+        Arguments:
+            key: The cache key.
+
+        Returns:
+            A `(plan, level)` pair, where `level` is `'memory'` or `'disk'`,
+            or `(None, None)` if the plan is not cached.
+        """
+
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return list(self.memory[key]), 'memory'
+
+        try:
+            with open(self.path(key)) as f:
+                plan = json.load(f)['plan']
+        except (OSError, ValueError, KeyError):
+            return None, None
+
+        # Mark the file as recently used
+        os.utime(self.path(key))
+        self._remember(key, plan)
+
+        return list(plan), 'disk'
+
+    def put(self, key, plan):
+        """Stores a plan in memory and on disk.
+
+        Arguments:
+            key: The cache key.
+            plan: A list of legal moves.
+        """
+
+        self._remember(key, plan)
+
+        # Write atomically so that concurrent runs never read partial files
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'plan': plan}, f)
+        os.replace(temp, self.path(key))
+
+        self._evict()
+
+    def _remember(self, key, plan):
+        self.memory[key] = list(plan)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            self.memory.pop(name[:-len('.json')], None)
+            total -= size
+
+
+class CachedAgent(Agent):
+    """Pacman agent replaying cached plans of another agent.
+
+    On the first move, the plan of the start state is looked up. On a hit,
+    the search is skipped and the plan is replayed. On a miss, the wrapped
+    agent plans as usual and its plan (its first move followed by its
+    remaining `moves`) is stored.
+
+    Arguments:
+        agent: The wrapped Pacman agent.
+        identity: The agent identity, see `agent_identity`.
+        cache: The `PlanCache` instance.
+    """
+
+    def __init__(self, agent, identity, cache):
+        super().__init__()
+
+        self.agent = agent
+        self.identity = identity
+        self.cache = cache
+        self.moves = None
+        self.delegate = False
+        self.stats = getattr(agent, 'stats', {})
+
+    def get_action(self, state):
+        """Given a Pacman game state, returns a legal move.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Return:
+            A legal move as defined in `game.Directions`.
+        """
+
+        if self.moves is None:
+            start = time.perf_counter()
+            key = self.cache.key(state, self.identity)
+            plan, level = self.cache.get(key)
+            elapsed = time.perf_counter() - start
+
+            self.stats["Plan cache"] = f"hit ({level})" if plan is not None \
+                else "miss"
+            self.stats["Plan cache lookup time"] = elapsed
+
+            if plan is None:
+                self.delegate = True
+                action = self.agent.get_action(state)
+
+                # Only agents planning ahead can be cached
+                remaining = getattr(self.agent, 'moves', None)
+                if isinstance(remaining, list):
+                    self.cache.put(key, [action] + remaining)
+
+                self.moves = []
+                return action
+
+            self.moves = plan
+
+        if self.delegate:
+            return self.agent.get_action(state)
+
+        if self.moves:
+            return self.moves.pop(0)
+        else:
+            return Directions.STOP
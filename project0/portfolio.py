@@ -0,0 +1,264 @@
+import importlib
+import multiprocessing
+import queue
+import time
+
+from pacman_module.game import Agent, Directions
+from pacman_module.pacman import GameState
+
+from maze import FoodHeuristic
+
+
+# Registered planners: name -> (module, constructor options, optimal)
+PLANNERS = {}
+
+
+def register(name, module, optimal=False, **options):
+    """Registers a planner for the portfolio.
+
+    Arguments:
+        name: The name of the planner.
+        module: The name of the module containing the `PacmanAgent` class.
+        optimal: Whether the planner always returns shortest plans.
+        options: The options of the `PacmanAgent` constructor.
+    """
+
+    PLANNERS[name] = (module, options, optimal)
+
+
+register('bfs', 'bfs', optimal=True)
+register('dfs', 'dfs')
+register('astar', 'astar')
+
+
+def dependencies(agentargs):
+    """Returns the names of the modules of the planners of a portfolio,
+    which it imports at run time (see `plancache.agent_identity`).
+
+    Arguments:
+        agentargs: The dictionary of agent options.
+    """
+
+    planners = agentargs.get('planners')
+    names = list(PLANNERS) if planners is None else planners.split('+')
+
+    return [PLANNERS[name][0] if name in PLANNERS else name
+            for name in names]
+
+
+def plan(name, module, options, state, results):
+    """Worker computing the full plan of a planner.
+
+    Sends a `(name, plan, elapsed time, expanded nodes, error)` tuple to
+    the results queue, where `plan` is None if the planner failed.
+
+    Arguments:
+        name: The name of the planner.
+        module: The name of the module containing the `PacmanAgent` class.
+        options: The options of the `PacmanAgent` constructor.
+        state: The initial game state.
+        results: The results queue.
+    """
+
+    start = time.perf_counter()
+    expanded = GameState.countExpanded
+
+    try:
+        agent = importlib.import_module(module).PacmanAgent(**options)
+        moves = [agent.get_action(state)] + list(agent.moves or [])
+    except Exception as e:
+        results.put((
+            name,
+            None,
+            time.perf_counter() - start,
+            GameState.countExpanded - expanded,
+            repr(e),
+        ))
+        return
+
+    results.put((
+        name,
+        moves,
+        time.perf_counter() - start,
+        GameState.countExpanded - expanded,
+        None,
+    ))
+
+
+def outcome(state, moves):
+    """Replays a list of moves and returns the final score if the moves are
+    legal and eat all the food, None otherwise.
+
+    Arguments:
+        state: The initial game state.
+        moves: A list of moves.
+    """
+
+    for action in moves:
+        if state.isWin() or action not in state.getLegalPacmanActions():
+            return None
+        state = state.generateSuccessor(0, action)
+
+    return state.getScore() if state.isWin() else None
+
+
+class PacmanAgent(Agent):
+    """Pacman agent racing a portfolio of planners.
+
+    Every planner searches the initial state in its own process. The first
+    plan meeting the quality bar is taken and the other planners are
+    cancelled. Otherwise, the highest scoring plan found by the deadline
+    (or the first one found after it) is taken.
+
+    The nodes expanded by every planner which reported, winner or not, are
+    added to the count of the game (see `GameState.countExpanded`).
+
+    A plan meets the quality bar if it comes from an optimal planner (one
+    returning shortest plans) or if its length is at most `quality` times
+    an admissible lower bound.
+
+    Arguments:
+        planners: The names of the planners separated by '+', or None for
+            all the registered planners. Unregistered names are taken as
+            module names.
+        quality: The quality bar (inf accepts the first plan).
+        deadline: The deadline, in seconds.
+    """
+
+    def __init__(self, planners=None, quality=float('inf'), deadline=10.0):
+        super().__init__()
+
+        self.moves = None
+        self.planners = list(PLANNERS) if planners is None \
+            else planners.split('+')
+        self.quality = float(quality)
+        self.deadline = float(deadline)
+        self.stats = {}
+
+    def get_action(self, state):
+        """Given a Pacman game state, returns a legal move.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Return:
+            A legal move as defined in `game.Directions`.
+        """
+
+        if self.moves is None:
+            self.moves = self.race(state)
+
+        if self.moves:
+            return self.moves.pop(0)
+        else:
+            return Directions.STOP
+
+    def race(self, state):
+        """Given a Pacman game state, returns the plan selected among those
+        of the portfolio.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Returns:
+            A list of legal moves.
+        """
+
+        start = time.perf_counter()
+
+        if state.isWin():
+            return []
+
+        bound = self.quality * FoodHeuristic(state)(state)
+
+        context = multiprocessing.get_context()
+        results = context.Queue()
+        processes = {}
+
+        for name in self.planners:
+            module, options, _ = PLANNERS.get(name, (name, {}, False))
+            processes[name] = context.Process(
+                target=plan,
+                args=(name, module, options, state, results),
+                daemon=True,
+            )
+            processes[name].start()
+
+        pending = set(processes)
+        reports = {}
+        best = None
+        best_score = None
+        winner = None
+
+        try:
+            while pending:
+                elapsed = time.perf_counter() - start
+                if best is not None and elapsed >= self.deadline:
+                    break
+
+                try:
+                    name, moves, duration, expanded, error = \
+                        results.get(timeout=0.1)
+                except queue.Empty:
+                    # Forget the planners which crashed without reporting
+                    for name in list(pending):
+                        if processes[name].exitcode not in (None, 0):
+                            pending.discard(name)
+                            reports[name] = "crashed"
+                    continue
+
+                pending.discard(name)
+                GameState.countExpanded += expanded
+
+                if moves is None:
+                    reports[name] = f"failed ({error})"
+                    continue
+
+                score = outcome(state, moves)
+                if score is None:
+                    reports[name] = "invalid plan"
+                    continue
+
+                reports[name] = f"{len(moves)} moves, score {score} " \
+                    f"in {duration:.3f}s ({expanded} nodes)"
+
+                if best is None or score > best_score:
+                    best = moves
+                    best_score = score
+                    winner = name
+
+                if PLANNERS.get(name, (None, None, False))[2] \
+                        or len(moves) <= bound:
+                    break
+        finally:
+            # Cancel the planners still running
+            for name, process in processes.items():
+                if process.is_alive():
+                    process.terminate()
+                    if name not in reports:
+                        reports[name] = "cancelled"
+                process.join()
+
+            # Count the planners which reported after the race was decided
+            while True:
+                try:
+                    name, _, _, expanded, _ = results.get(timeout=0.01)
+                except queue.Empty:
+                    break
+                GameState.countExpanded += expanded
+                reports[name] = f"too late ({expanded} nodes)"
+
+            results.close()
+
+        self.stats.update({
+            "Portfolio winner": winner,
+            "Portfolio time to plan": time.perf_counter() - start,
+        })
+        for name in self.planners:
+            self.stats[f"Portfolio {name}"] = reports.get(name, "cancelled")
+
+        # No solution
+        if best is None:
+            return []
+
+        return list(best)
@@ -1,7 +1,9 @@
 import argparse
 import importlib
+import json
 
-from pacman_module.pacman import runGame
+from pacman_module.pacman import runGame, parseAgentArgs
+from plancache import CachedAgent, PlanCache, agent_identity
 
 
 if __name__ == '__main__':
@@ -14,6 +16,13 @@ if __name__ == '__main__':
         help='Python module containing a `PacmanAgent` class.',
     )
 
+    parser.add_argument(
+        '-aa',
+        '--agentargs',
+        default=None,
+        help='Comma separated agent options, e.g. "opt1=val1,opt2=val2".',
+    )
+
     parser.add_argument(
         '-l',
         '--layout',
@@ -29,14 +38,46 @@ if __name__ == '__main__':
         action='store_true',
     )
 
+    parser.add_argument(
+        '-pc',
+        '--plancache',
+        default=None,
+        help='Directory of the plan cache (disabled by default).',
+    )
+
+    parser.add_argument(
+        '--plancache-size',
+        type=int,
+        default=16 * 2 ** 20,
+        help='Maximum size of the on-disk plan cache, in bytes.',
+    )
+
+    parser.add_argument(
+        '--json',
+        default=None,
+        help='Write the results and agent statistics as JSON to this file '
+             '("-" for the standard output).',
+    )
+
     args = parser.parse_args()
 
     if args.agent == 'humanagent' and args.nographics:
         raise ValueError("Human agent cannot play without graphics")
 
+    module = importlib.import_module(args.agent)
+    agentargs = parseAgentArgs(args.agentargs)
+    agent = module.PacmanAgent(**agentargs)
+
+    if args.plancache is not None:
+        agent = CachedAgent(
+            agent,
+            agent_identity(module, agentargs),
+            PlanCache(args.plancache, args.plancache_size),
+        )
+
     score, time, nodes = runGame(
         layout_name=args.layout,
-        pacman=importlib.import_module(args.agent).PacmanAgent(),
+        pacman=agent,
         ghosts=[],
         beliefstateagent=None,
         displayGraphics=not args.nographics,
@@ -47,3 +88,25 @@ if __name__ == '__main__':
     print(f"Score: {score}")
     print(f"Computation time: {time}")
     print(f"Expanded nodes: {nodes}")
+
+    stats = getattr(agent, 'stats', {})
+    for name, value in stats.items():
+        if isinstance(value, list) and len(value) > 10:
+            value = f"{value[:5]} ... {value[-5:]} ({len(value)} values)"
+        print(f"{name}: {value}")
+
+    if args.json is not None:
+        results = {
+            'agent': args.agent,
+            'agentargs': parseAgentArgs(args.agentargs),
+            'layout': args.layout,
+            'score': score,
+            'computation_time': time,
+            'expanded_nodes': nodes,
+            'stats': stats,
+        }
+        if args.json == '-':
+            print(json.dumps(results, indent=2))
+        else:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=2)
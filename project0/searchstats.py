@@ -0,0 +1,168 @@
+import time
+
+from pacman_module.pacman import GameState
+
+
+def count_expanded(nodes=1):
+    """Counts the expansions of a search over another model than game
+    states as expanded nodes of the game, within its node expansion budget
+    (see `GameState._expand`).
+
+    Arguments:
+        nodes: The number of expanded nodes.
+    """
+
+    if GameState.countExpanded + nodes > GameState.maximumExpanded:
+        raise Exception("Too many expanded nodes")
+    GameState.countExpanded += nodes
+
+
+class SearchStats:
+    """Statistics of a single search, shared by the search agents.
+
+    The agent routes its successor generations and heuristic evaluations
+    through `successors` and `heuristic`, and reports fringe insertions,
+    removals and pruned duplicates. `report` then returns the statistics
+    as a dictionary suited to the agents' `stats` (printed by `run.py`
+    and emitted as JSON).
+
+    The effective branching factor at depth d is the number of successors
+    of depth d + 1 kept in the fringe (i.e. not pruned as duplicates) per
+    node expanded at depth d.
+
+    Searches over other models than game states (e.g. compact keys or maze
+    cells) record their expansions with `expand`, and count them in the
+    game with `count_expanded`, and searches keeping
+    more than their fringe and closed set in memory record the number of
+    nodes they store with `store`, so that every agent reports the same
+    statistics.
+    """
+
+    def __init__(self):
+        self.generated = 0
+        self.expanded = 0
+        self.duplicates = 0
+        self.fringe = 0
+        self.peak_fringe = 0
+        self.closed = 0
+        self.stored = 0
+        self.peak_stored = 0
+        self.expanded_by_depth = []
+        self.kept_by_depth = []
+        self.heuristic_time = 0.0
+        self.successor_time = 0.0
+
+    def successors(self, state, depth):
+        """Expands a state, timing the successor generation.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+            depth: The depth of `state` in the search.
+
+        Returns:
+            The list of `(successor, action)` pairs of `state`.
+        """
+
+        start = time.perf_counter()
+        successors = state.generatePacmanSuccessors()
+        self.successor_time += time.perf_counter() - start
+
+        self.expand(depth, len(successors))
+
+        return successors
+
+    def expand(self, depth, successors, nodes=1):
+        """Records node expansions.
+
+        Arguments:
+            depth: The depth of the expanded nodes in the search.
+            successors: The total number of successors generated.
+            nodes: The number of expanded nodes.
+        """
+
+        while len(self.expanded_by_depth) <= depth:
+            self.expanded_by_depth.append(0)
+            self.kept_by_depth.append(0)
+
+        self.expanded += nodes
+        self.generated += successors
+        self.expanded_by_depth[depth] += nodes
+        self.kept_by_depth[depth] += successors
+
+    def heuristic(self, function, *args):
+        """Evaluates a heuristic, timing the evaluation.
+
+        Arguments:
+            function: The heuristic function.
+            args: The arguments of `function`.
+
+        Returns:
+            The heuristic value.
+        """
+
+        start = time.perf_counter()
+        value = function(*args)
+        self.heuristic_time += time.perf_counter() - start
+
+        return value
+
+    def push(self, count=1):
+        """Records `count` insertions in the fringe."""
+
+        self.fringe += count
+        self.peak_fringe = max(self.peak_fringe, self.fringe)
+
+    def pop(self, count=1):
+        """Records `count` removals from the fringe."""
+
+        self.fringe -= count
+
+    def prune(self, depth, count=1):
+        """Records `count` successors of nodes of depth `depth` pruned as
+        duplicates."""
+
+        self.duplicates += count
+        self.kept_by_depth[depth] -= count
+
+    def store(self, count):
+        """Records the number of nodes currently stored by the search."""
+
+        self.stored = count
+        self.peak_stored = max(self.peak_stored, count)
+
+    def report(self, closed=None):
+        """Returns the statistics as a dictionary.
+
+        Unless the search recorded its stored nodes with `store`, the peak
+        number of stored nodes is bounded by the closed set size plus the
+        peak fringe size.
+
+        Arguments:
+            closed: The closed set at the end of the search, or its size,
+                if any.
+
+        Returns:
+            A dictionary mapping statistic names to values.
+        """
+
+        if isinstance(closed, int):
+            self.closed = closed
+        elif closed is not None:
+            self.closed = len(closed)
+
+        return {
+            "Generated nodes": self.generated,
+            "Expanded nodes (search)": self.expanded,
+            "Duplicates pruned": self.duplicates,
+            "Peak fringe size": self.peak_fringe,
+            "Closed set size": self.closed,
+            "Peak stored nodes": (
+                self.peak_stored or self.closed + self.peak_fringe),
+            "Effective branching factor by depth": [
+                round(kept / expanded, 3) if expanded else 0.0
+                for kept, expanded in zip(
+                    self.kept_by_depth, self.expanded_by_depth)
+            ],
+            "Heuristic time": self.heuristic_time,
+            "Successor generation time": self.successor_time,
+        }
@@ -0,0 +1,290 @@
+import heapq
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from pacman_module.game import Agent, Directions
+
+from maze import FoodHeuristic
+from searchstats import SearchStats
+
+
+class Node:
+    """Search tree node kept in memory by SMA*.
+
+    Arguments:
+        state: a game state. See class `pacman.GameState`.
+        key: The compact key of `state`.
+        parent: The parent node, or `None` for the root.
+        action: The move leading from the parent to this node.
+        g: The path cost from the root.
+        f: The (backed-up) estimated cost of the cheapest solution
+            through this node.
+    """
+
+    def __init__(self, state, key, parent, action, g, f):
+        self.state = state
+        self.key = key
+        self.parent = parent
+        self.action = action
+        self.g = g
+        self.f = f
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.children = {}
+        self.forgotten = {}
+        self.version = 0
+
+    def path(self):
+        """Returns the list of moves leading from the root to this node."""
+
+        moves = []
+        node = self
+        while node.parent is not None:
+            moves.append(node.action)
+            node = node.parent
+        moves.reverse()
+
+        return moves
+
+    def size(self):
+        """Returns the number of nodes of the subtree of this node."""
+
+        count = 0
+        fringe = [self]
+        while fringe:
+            node = fringe.pop()
+            count += 1
+            fringe.extend(node.children.values())
+
+        return count
+
+
+class PacmanAgent(Agent):
+    """Pacman agent based on simplified memory-bounded A* (SMA*).
+
+    At most `max_nodes` search nodes are kept in memory. When the cap is
+    reached, the worst leaf is dropped and its f-value is backed up into
+    its parent, which regenerates it later if it becomes promising again.
+    The peak number of nodes of the search tree is reported in `stats`,
+    and checked against the nodes actually left in the tree once the
+    search is over (see `benchmark.py smastar`).
+
+    Arguments:
+        max_nodes: The hard cap on the number of nodes in memory.
+    """
+
+    def __init__(self, max_nodes=50000):
+        super().__init__()
+
+        self.moves = None
+        self.max_nodes = int(max_nodes)
+        self.stats = {}
+
+    def get_action(self, state):
+        """Given a Pacman game state, returns a legal move.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Return:
+            A legal move as defined in `game.Directions`.
+        """
+
+        if self.moves is None:
+            self.moves = self.smastar(state)
+
+            if resource is not None:
+                self.stats["Peak resident memory (kB)"] = resource.getrusage(
+                    resource.RUSAGE_SELF).ru_maxrss
+
+        if self.moves:
+            return self.moves.pop(0)
+        else:
+            return Directions.STOP
+
+    def smastar(self, state):
+        """Given a Pacman game state, returns a list of legal moves to solve
+        the search layout.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Returns:
+            A list of legal moves.
+        """
+
+        heuristic = FoodHeuristic(state)
+        stats = SearchStats()
+        counter = 0
+
+        # Best leaves are popped from `open_heap`, worst from `worst_heap`.
+        # Both are lazy: an entry is stale if the node version changed.
+        open_heap = []
+        worst_heap = []
+        leaves = set()
+        stored = {}
+
+        def compact(heap):
+            # Drop stale entries so that pruned nodes can be freed
+            heap[:] = [
+                entry for entry in heap
+                if entry[4].version == entry[3] and entry[4] in leaves
+            ]
+            heapq.heapify(heap)
+
+        def push(node):
+            nonlocal counter
+            node.version += 1
+            if node not in leaves:
+                stats.push()
+            leaves.add(node)
+            heapq.heappush(
+                open_heap, (node.f, -node.depth, counter, node.version, node))
+            heapq.heappush(
+                worst_heap, (-node.f, node.depth, counter, node.version, node))
+            counter += 1
+
+            if len(open_heap) > 2 * self.max_nodes:
+                compact(open_heap)
+            if len(worst_heap) > 2 * self.max_nodes:
+                compact(worst_heap)
+
+        def backup(node):
+            # Propagate the smallest child f-value towards the root
+            while node is not None:
+                values = [child.f for child in node.children.values()]
+                values.extend(node.forgotten.values())
+                best = min(values, default=float('inf'))
+                if best == node.f:
+                    break
+                node.f = best
+                if node in leaves:
+                    push(node)
+                node = node.parent
+
+        def prune(protected):
+            # Drop the worst leaf which is neither `protected` nor the root
+            while worst_heap:
+                _, _, _, version, node = heapq.heappop(worst_heap)
+                if node.version != version or node not in leaves:
+                    continue
+                if node is protected or node.parent is None:
+                    continue
+
+                leaves.discard(node)
+                stats.pop()
+                node.version += 1
+                if stored.get(node.key) is node:
+                    del stored[node.key]
+
+                parent = node.parent
+                del parent.children[node.action]
+                parent.forgotten[node.action] = node.f
+                if not parent.children:
+                    push(parent)
+                backup(parent)
+                return True
+
+            return False
+
+        root = Node(state, heuristic.key(state), None, None, 0,
+                    stats.heuristic(heuristic, state))
+        stored[root.key] = root
+        size = 1
+        stats.store(size)
+        push(root)
+
+        while open_heap:
+            _, _, _, version, node = heapq.heappop(open_heap)
+            if node.version != version or node not in leaves:
+                continue
+
+            if node.f == float('inf'):
+                break
+
+            if node.state.isWin():
+                self.report(stats, stored, root, size)
+                return node.path()
+
+            # A path as long as the memory cap cannot be extended
+            if node.depth >= self.max_nodes - 1:
+                node.f = float('inf')
+                push(node)
+                backup(node.parent)
+                continue
+
+            leaves.discard(node)
+            stats.pop()
+            node.version += 1
+
+            ancestors = set()
+            ancestor = node
+            while ancestor is not None:
+                ancestors.add(ancestor.key)
+                ancestor = ancestor.parent
+
+            for successor, action in \
+                    stats.successors(node.state, node.depth):
+                successor_key = heuristic.key(successor)
+                other = stored.get(successor_key)
+                if successor_key in ancestors or (
+                        other is not None and other.g <= node.g + 1):
+                    node.forgotten.pop(action, None)
+                    stats.prune(node.depth)
+                    continue
+
+                if action in node.forgotten:
+                    f = node.forgotten.pop(action)
+                else:
+                    f = max(node.f, node.g + 1 + stats.heuristic(
+                        heuristic.estimate, *successor_key))
+
+                while size >= self.max_nodes and prune(node):
+                    size -= 1
+                if size >= self.max_nodes:
+                    node.forgotten[action] = f
+                    continue
+
+                child = Node(
+                    successor, successor_key, node, action, node.g + 1, f)
+                node.children[action] = child
+                stored[successor_key] = child
+                size += 1
+                push(child)
+
+            stats.store(size)
+
+            if node.children:
+                leaves.discard(node)
+                node.version += 1
+            else:
+                # Every successor was a cycle, dominated or forgotten
+                push(node)
+            backup(node)
+
+        # No solution within the memory cap
+        self.report(stats, stored, root, size)
+        return []
+
+    def report(self, stats, stored, root, size):
+        """Reports the statistics of a search, checking that the stored
+        nodes counted by the search are those of the tree and that they
+        never exceeded the memory cap.
+
+        Arguments:
+            stats: The `SearchStats` of the search.
+            stored: The dictionary of the best nodes by key.
+            root: The root node.
+            size: The number of nodes counted by the search.
+        """
+
+        if root.size() != size or stats.peak_stored > self.max_nodes:
+            raise RuntimeError(
+                f"SMA* counted {size} nodes for {root.size()} in its tree, "
+                f"and stored up to {stats.peak_stored} nodes for a cap of "
+                f"{self.max_nodes}")
+
+        self.stats.update(stats.report(stored))
+        self.stats["Memory cap (nodes)"] = self.max_nodes
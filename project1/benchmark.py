@@ -0,0 +1,943 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from pacman_module import layout as layouts
+from pacman_module.ghostAgents import GreedyGhost
+from pacman_module.pacman import ClassicGameRules, GameState, runGame
+from pacman_module.textDisplay import NullGraphics
+from pacman_module.util import manhattanDistance
+
+import expectimax
+import hminimax
+import mcts
+import minimax
+from run import GHOSTS
+
+
+class MoveLimit(Exception):
+    """Raised when a benchmark game lasts too long."""
+
+
+def trajectory(layout, ghost, seed):
+    """Plays a game with the default H-Minimax agent and returns the
+    states in which Pacman had to move."""
+
+    agent = hminimax.PacmanAgent()
+    states = []
+    get_action = agent.get_action
+
+    def record(state):
+        # A copy, not yet counted as expanded by the reference agent
+        states.append(state.deepCopy())
+        return get_action(state)
+
+    agent.get_action = record
+
+    random.seed(seed)
+    np.random.seed(seed)
+
+    runGame(
+        layout_name=layout,
+        pacman=agent,
+        ghosts=[GHOSTS[ghost](1)],
+        beliefstateagent=None,
+        displayGraphics=False,
+        expout=0.0,
+        hiddenGhosts=False,
+    )
+
+    return states
+
+
+def replay(agent, states):
+    """Searches the states of a game in turn with an agent.
+
+    Returns:
+        The mean number of expanded nodes and the list of latencies per
+        move.
+    """
+
+    GameState.resetNodeExpansionCounter()
+    latencies = []
+    for state in states:
+        start = time.perf_counter()
+        agent.get_action(state)
+        latencies.append(time.perf_counter() - start)
+
+    return GameState.countExpanded / len(states), latencies
+
+
+def play(agent, layout, ghost, seed, max_moves):
+    """Plays a quiet game without graphics, timing each move of the agent.
+
+    Returns:
+        The outcome ('win', 'loss' or 'limit' when the game lasts more
+        than `max_moves` moves), the score and the list of per-move
+        latencies.
+    """
+
+    latencies = []
+    get_action = agent.get_action
+
+    def timed(state):
+        if len(latencies) >= max_moves:
+            raise MoveLimit
+        start = time.perf_counter()
+        action = get_action(state)
+        latencies.append(time.perf_counter() - start)
+        return action
+
+    agent.get_action = timed
+
+    random.seed(seed)
+    np.random.seed(seed)
+
+    game = ClassicGameRules(0.0).newGame(
+        layouts.getLayout(layout), agent, [ghost], None, NullGraphics(),
+        quiet=True)
+    try:
+        score, _, _ = game.run()
+    except MoveLimit:
+        return 'limit', game.state.getScore(), latencies
+
+    outcome = 'win' if game.state.isWin() else 'loss'
+
+    return outcome, score, latencies
+
+
+def benchmark_alphabeta(args):
+    """Compares H-Minimax without and with alpha-beta pruning (and move
+    ordering) across layouts, ghosts and depths, on the states of the same
+    reference game."""
+
+    print("H-Minimax vs alpha-beta (nodes per move, ms per move mean/max)")
+    for layout in args.layouts:
+        for ghost in args.ghosts:
+            states = trajectory(layout, ghost, args.seed)[:args.moves]
+            for depth in args.depths:
+                results = []
+                for pruning in (False, True):
+                    agent = hminimax.PacmanAgent(
+                        depth=depth, pruning=pruning, table=0)
+                    nodes, latencies = replay(agent, states)
+                    results.append(
+                        f"{nodes:.1f} nodes, "
+                        f"{np.mean(latencies) * 1e3:.1f}/"
+                        f"{max(latencies) * 1e3:.1f} ms"
+                    )
+
+                print(
+                    f"  {layout:>10} {ghost:>9} depth {depth} "
+                    f"({len(states)} moves): "
+                    f"minimax {results[0]} | alpha-beta {results[1]}"
+                )
+
+
+def benchmark_deepening(args):
+    """Reports the depths reached by iterative deepening and the per-move
+    latency under time budgets, on the states of a reference game."""
+
+    print("Iterative deepening (depth mean/max, ms per move mean/max)")
+    for layout in args.layouts:
+        for ghost in args.ghosts:
+            states = trajectory(layout, ghost, args.seed)[:args.moves]
+            results = []
+            for budget in args.budgets:
+                agent = hminimax.PacmanAgent(budget=budget)
+                _, latencies = replay(agent, states)
+                depths = agent.stats["Depth reached"]
+                results.append(
+                    f"{budget * 1e3:.0f} ms: depth "
+                    f"{np.mean(depths):.1f}/{max(depths)}, "
+                    f"{np.mean(latencies) * 1e3:.1f}/"
+                    f"{max(latencies) * 1e3:.1f} ms"
+                )
+
+            print(
+                f"  {layout:>10} {ghost:>9} ({len(states)} moves): "
+                + " | ".join(results)
+            )
+
+
+def benchmark_table(args):
+    """Compares Minimax and H-Minimax without and with the transposition
+    table, on the states of a reference game."""
+
+    agents = {
+        'minimax': lambda table: minimax.PacmanAgent(table=table),
+        f'hminimax (depth {args.depth})': lambda table: hminimax.PacmanAgent(
+            depth=args.depth, table=table),
+    }
+
+    print("Transposition table (nodes per move, ms per move mean, hit rate)")
+    for layout in args.layouts:
+        states = trajectory(layout, args.ghost, args.seed)[:args.moves]
+        for name, agent in agents.items():
+            if name == 'minimax' and layout not in args.minimax_layouts:
+                continue
+
+            results = []
+            for table in (0, args.size):
+                searcher = agent(table)
+                nodes, latencies = replay(searcher, states)
+                hits = searcher.stats.get("TT hit rate", [0.0])
+                results.append(
+                    f"{nodes:.1f} nodes, {np.mean(latencies) * 1e3:.1f} ms, "
+                    f"hit rate {np.mean(hits):.2f}"
+                )
+
+            print(
+                f"  {layout:>11} {name:>20}: "
+                f"without {results[0]} | with {results[1]}"
+            )
+
+
+def benchmark_minimax(args):
+    """Reports the cost of the exhaustive Minimax search on the states of
+    a reference game."""
+
+    print("Minimax (nodes per move, ms per move mean/max, stack depth)")
+    for layout in args.layouts:
+        states = trajectory(layout, args.ghost, args.seed)[:args.moves]
+        results = []
+        for table in (0, args.size):
+            agent = minimax.PacmanAgent(table=table)
+            nodes, latencies = replay(agent, states)
+            results.append(
+                f"{nodes:.1f} nodes, {np.mean(latencies) * 1e3:.1f}/"
+                f"{max(latencies) * 1e3:.1f} ms, "
+                f"depth {agent.stats['Peak stack depth']}"
+            )
+
+        print(
+            f"  {layout:>11} ({len(states)} moves): "
+            f"without table {results[0]} | with table {results[1]}"
+        )
+
+
+def benchmark_expectimax(args):
+    """Compares H-Minimax and Expectimax against each ghost over several
+    games."""
+
+    ghosts = {
+        name: lambda ghost=ghost: ghost(1) for name, ghost in GHOSTS.items()
+    }
+    ghosts[f'greedy-{args.prob_attack}'] = \
+        lambda: GreedyGhost(1, prob_attack=args.prob_attack)
+
+    modes = {'depth': {'depth': args.depth}}
+    if args.budget is not None:
+        modes['budget'] = {'budget': args.budget}
+
+    print("H-Minimax vs Expectimax "
+          "(win rate, mean score, ms per move mean/max)")
+    for layout in args.layouts:
+        for name, ghost in ghosts.items():
+            model, _, prob_attack = name.partition('-')
+            for mode, options in modes.items():
+                agents = {
+                    'hminimax': lambda: hminimax.PacmanAgent(**options),
+                    'expectimax': lambda: expectimax.PacmanAgent(
+                        ghost=model, prob_attack=prob_attack or 1.0,
+                        **options),
+                }
+
+                results = []
+                for agent in agents.values():
+                    outcomes, scores, latencies = [], [], []
+                    for seed in range(args.games):
+                        outcome, score, moves = play(
+                            agent(), layout, ghost(), seed, args.max_moves)
+                        outcomes.append(outcome)
+                        scores.append(score)
+                        latencies += moves
+
+                    results.append(
+                        f"{outcomes.count('win') / len(outcomes):.0%}, "
+                        f"{np.mean(scores):.0f}, "
+                        f"{np.mean(latencies) * 1e3:.1f}/"
+                        f"{max(latencies) * 1e3:.1f} ms"
+                    )
+
+                print(
+                    f"  {layout:>10} {name:>10} {mode:>6}: "
+                    + " | ".join(
+                        f"{agent} {result}"
+                        for agent, result in zip(agents, results))
+                )
+
+
+def benchmark_parallel(args):
+    """Compares the serial and root-parallel H-Minimax searches without
+    transposition table, on the states of a reference game."""
+
+    print("Root-parallel H-Minimax (ms per move mean, speedup, same moves)")
+    for layout in args.layouts:
+        states = trajectory(layout, args.ghost, args.seed)[:args.moves]
+        serial = hminimax.PacmanAgent(depth=args.depth, table=0)
+        moves = []
+        latencies = []
+        for state in states:
+            start = time.perf_counter()
+            moves.append(serial.get_action(state))
+            latencies.append(time.perf_counter() - start)
+        reference = np.mean(latencies)
+
+        results = []
+        for workers in args.workers:
+            agent = hminimax.PacmanAgent(
+                depth=args.depth, table=0, workers=workers)
+            agent.get_action(states[0])  # Starts the pool
+            agent.visit_count = {}
+            same = 0
+            latencies = []
+            for state, move in zip(states, moves):
+                start = time.perf_counter()
+                same += agent.get_action(state) == move
+                latencies.append(time.perf_counter() - start)
+            agent.close()
+
+            results.append(
+                f"{workers} workers {np.mean(latencies) * 1e3:.1f} ms, "
+                f"x{reference / np.mean(latencies):.2f}, "
+                f"{same / len(states):.0%}"
+            )
+
+        print(
+            f"  {layout:>10} depth {args.depth} ({len(states)} moves): "
+            f"serial {reference * 1e3:.1f} ms | " + " | ".join(results)
+        )
+
+
+def benchmark_ponder(args):
+    """Compares iterative deepening without and with pondering over
+    several games, the ghost taking `ghost_delay` seconds per move."""
+
+    def slow(ghost):
+        get_action = ghost.get_action
+
+        def delayed(state):
+            time.sleep(args.ghost_delay)
+            return get_action(state)
+
+        ghost.get_action = delayed
+        return ghost
+
+    print("Pondering (win rate, depth mean, ms per move mean/max, "
+          "ponder hit rate)")
+    for layout in args.layouts:
+        for ghost in args.ghosts:
+            results = []
+            for ponder in (0, args.ponder):
+                outcomes, depths, latencies, hits = [], [], [], []
+                for seed in range(args.games):
+                    agent = hminimax.PacmanAgent(
+                        budget=args.budget, ponder=ponder)
+                    outcome, _, moves = play(
+                        agent, layout, slow(GHOSTS[ghost](1)), seed,
+                        args.max_moves)
+                    agent.close()
+                    outcomes.append(outcome)
+                    depths += agent.stats["Depth reached"]
+                    latencies += moves
+                    hits.append(agent.stats.get("Ponder hit rate", 0.0))
+
+                results.append(
+                    f"{outcomes.count('win') / len(outcomes):.0%}, "
+                    f"depth {np.mean(depths):.1f}, "
+                    f"{np.mean(latencies) * 1e3:.1f}/"
+                    f"{max(latencies) * 1e3:.1f} ms, "
+                    f"hits {np.mean(hits):.2f}"
+                )
+
+            print(
+                f"  {layout:>10} {ghost:>9}: "
+                f"without {results[0]} | with {results[1]}"
+            )
+
+
+def benchmark_cache(args):
+    """Compares H-Minimax and Expectimax without and with the successor
+    cache, on the states of a reference game."""
+
+    agents = {
+        f'hminimax (depth {args.depth})':
+            lambda: hminimax.PacmanAgent(depth=args.depth),
+        f'hminimax ({args.nodes} nodes)':
+            lambda: hminimax.PacmanAgent(nodes=args.nodes),
+        f'expectimax (depth {args.depth})':
+            lambda: expectimax.PacmanAgent(depth=args.depth),
+    }
+
+    print("Successor cache (ms per move mean, hit rate, entries, memory, "
+          "same moves)")
+    for layout in args.layouts:
+        states = trajectory(layout, args.ghost, args.seed)[:args.moves]
+        for name, agent in agents.items():
+            results = []
+            for cached in (False, True):
+                cache = GameState.enableSuccessorCache(
+                    args.entries, args.max_bytes) if cached else None
+                searcher = agent()
+                moves, latencies = [], []
+                for state in states:
+                    state = state.deepCopy()
+                    start = time.perf_counter()
+                    moves.append(searcher.get_action(state))
+                    latencies.append(time.perf_counter() - start)
+                GameState.disableSuccessorCache()
+                results.append((moves, np.mean(latencies), cache))
+
+            (reference, without, _), (moves, with_, cache) = results
+            same = sum(a == b for a, b in zip(reference, moves))
+            print(
+                f"  {layout:>10} {name:>26}: without {without * 1e3:.1f} ms"
+                f" | with {with_ * 1e3:.1f} ms, hit rate "
+                f"{cache.hitRate():.2f}, {len(cache)} entries, "
+                f"{cache.bytes / 2 ** 20:.1f} MiB, "
+                f"{same / len(states):.0%}"
+            )
+
+
+def manhattan_evaluation(state, visit_count):
+    """The previous evaluation of H-Minimax, with Manhattan distances to
+    all the ghosts and food recomputed and the visit counted at each
+    leaf."""
+    pacman_pos = state.getPacmanPosition()
+    ghost_positions = state.getGhostPositions()
+    food_positions = state.getFood().asList()
+    d = min(manhattanDistance(pacman_pos, ghost_pos)
+            for ghost_pos in ghost_positions)
+    f = min(manhattanDistance(pacman_pos, food_pos)
+            for food_pos in food_positions) if food_positions else 1
+    ghost_penalty = -25 / (d + 1) if d < 3 else -5 / (d + 1)
+    food_reward = 35 / (f + 1) if f < 3 else 30 / (f + 1)
+    visit_count[pacman_pos] = visit_count.get(pacman_pos, 0) + 1
+    if f < 3 and d < 3:
+        ghost_penalty = -5
+
+    return 10 * state.getScore() + ghost_penalty \
+        - visit_count[pacman_pos] + food_reward
+
+
+def benchmark_evaluation(args):
+    """Compares the rates of the previous evaluation of H-Minimax and of
+    the current one, without and with memoization, on the leaves searched
+    in the states of a reference game."""
+
+    print("Leaf evaluations (evaluations per second, speedup)")
+    for layout in args.layouts:
+        states = trajectory(layout, args.ghost, args.seed)[:args.moves]
+        agent = hminimax.PacmanAgent(depth=args.depth)
+        evaluate_state = agent.evaluate_state
+        moves = []
+
+        def record(state, key=None):
+            moves[-1].append((state, key))
+            return evaluate_state(state, key)
+
+        agent.evaluate_state = record
+        for state in states:
+            moves.append([])
+            agent.get_action(state)
+        total = sum(len(leaves) for leaves in moves)
+
+        visit_count = {}
+        start = time.perf_counter()
+        for leaves in moves:
+            for state, _ in leaves:
+                manhattan_evaluation(state, visit_count)
+        reference = total / (time.perf_counter() - start)
+
+        results = []
+        for memoized in (False, True):
+            agent = hminimax.PacmanAgent(depth=args.depth)
+            start = time.perf_counter()
+            for leaves in moves:
+                for state, key in leaves:
+                    agent.evaluate_state(state, key if memoized else None)
+            rate = total / (time.perf_counter() - start)
+            results.append(f"{rate:,.0f}/s, x{rate / reference:.1f}")
+
+        print(
+            f"  {layout:>10} depth {args.depth} ({total} leaves): "
+            f"previous {reference:,.0f}/s | pellet lists {results[0]} "
+            f"| memoized {results[1]}"
+        )
+
+
+def benchmark_mcts(args):
+    """Reports the simulation rate and win rate of MCTS against iteration
+    budgets and numbers of workers."""
+
+    print("MCTS (win rate, mean score, simulations/s, ms per move mean)")
+    for layout in args.layouts:
+        for ghost in args.ghosts:
+            for iterations in args.iterations:
+                results = []
+                for workers in args.workers:
+                    outcomes, scores, rates, latencies = [], [], [], []
+                    for seed in range(args.games):
+                        agent = mcts.PacmanAgent(
+                            ghost=ghost, budget=None, iterations=iterations,
+                            workers=workers)
+                        outcome, score, moves = play(
+                            agent, layout, GHOSTS[ghost](1), seed,
+                            args.max_moves)
+                        agent.close()
+                        outcomes.append(outcome)
+                        scores.append(score)
+                        rates += agent.stats["Simulations per second"]
+                        latencies += moves
+
+                    wins = outcomes.count('win') / len(outcomes)
+                    results.append(
+                        f"{workers} workers {wins:.0%}, "
+                        f"{np.mean(scores):.0f}, {np.mean(rates):.0f}/s, "
+                        f"{np.mean(latencies) * 1e3:.0f} ms"
+                    )
+
+                print(
+                    f"  {layout:>10} {ghost:>9} {iterations:>5} iterations: "
+                    + " | ".join(results)
+                )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    alphabeta = subparsers.add_parser(
+        'alphabeta',
+        help='H-Minimax without vs with alpha-beta pruning.',
+    )
+    alphabeta.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['small_adv', 'medium_adv', 'large_adv'],
+        help='Maze layouts.',
+    )
+    alphabeta.add_argument(
+        '--ghosts',
+        nargs='+',
+        choices=list(GHOSTS.keys()),
+        default=list(GHOSTS.keys()),
+        help='Ghost agents.',
+    )
+    alphabeta.add_argument(
+        '--depths',
+        type=int,
+        nargs='+',
+        default=[3, 5, 7],
+        help='Search depths, in plies.',
+    )
+    alphabeta.add_argument(
+        '--moves',
+        type=int,
+        default=30,
+        help='Maximum number of moves of the reference game searched.',
+    )
+    alphabeta.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed for random number generator.',
+    )
+    alphabeta.set_defaults(run=benchmark_alphabeta)
+
+    deepening = subparsers.add_parser(
+        'deepening',
+        help='Depths reached by iterative deepening under time budgets.',
+    )
+    deepening.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['small_adv', 'medium_adv', 'large_adv'],
+        help='Maze layouts.',
+    )
+    deepening.add_argument(
+        '--ghosts',
+        nargs='+',
+        choices=list(GHOSTS.keys()),
+        default=list(GHOSTS.keys()),
+        help='Ghost agents.',
+    )
+    deepening.add_argument(
+        '--budgets',
+        type=float,
+        nargs='+',
+        default=[0.01, 0.05, 0.2],
+        help='Per-move time budgets, in seconds.',
+    )
+    deepening.add_argument(
+        '--moves',
+        type=int,
+        default=30,
+        help='Maximum number of moves of the reference game searched.',
+    )
+    deepening.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed for random number generator.',
+    )
+    deepening.set_defaults(run=benchmark_deepening)
+
+    table = subparsers.add_parser(
+        'table',
+        help='Minimax and H-Minimax without vs with transposition table.',
+    )
+    table.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['small_adv', 'small_adv-2', 'medium_adv', 'large_adv'],
+        help='Maze layouts.',
+    )
+    table.add_argument(
+        '--minimax-layouts',
+        nargs='+',
+        default=['small_adv', 'small_adv-2'],
+        help='Maze layouts on which Minimax is run.',
+    )
+    table.add_argument(
+        '--ghost',
+        choices=list(GHOSTS.keys()),
+        default='greedy',
+        help='Ghost agent.',
+    )
+    table.add_argument(
+        '--depth',
+        type=int,
+        default=7,
+        help='H-Minimax search depth, in plies.',
+    )
+    table.add_argument(
+        '--size',
+        type=int,
+        default=2 ** 16,
+        help='Transposition table size, in entries.',
+    )
+    table.add_argument(
+        '--moves',
+        type=int,
+        default=30,
+        help='Maximum number of moves of the reference game searched.',
+    )
+    table.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed for random number generator.',
+    )
+    table.set_defaults(run=benchmark_table)
+
+    search = subparsers.add_parser(
+        'minimax',
+        help='Exhaustive Minimax search cost.',
+    )
+    search.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['small_adv', 'small_adv-2', 'small_adv-3'],
+        help='Maze layouts.',
+    )
+    search.add_argument(
+        '--ghost',
+        choices=list(GHOSTS.keys()),
+        default='greedy',
+        help='Ghost agent.',
+    )
+    search.add_argument(
+        '--size',
+        type=int,
+        default=2 ** 16,
+        help='Transposition table size, in entries.',
+    )
+    search.add_argument(
+        '--moves',
+        type=int,
+        default=30,
+        help='Maximum number of moves of the reference game searched.',
+    )
+    search.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed for random number generator.',
+    )
+    search.set_defaults(run=benchmark_minimax)
+
+    stochastic = subparsers.add_parser(
+        'expectimax',
+        help='H-Minimax vs Expectimax win rates against each ghost.',
+    )
+    stochastic.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['medium_adv', 'large_adv'],
+        help='Maze layouts.',
+    )
+    stochastic.add_argument(
+        '--games',
+        type=int,
+        default=10,
+        help='Number of games per layout, ghost and agent.',
+    )
+    stochastic.add_argument(
+        '--depth',
+        type=int,
+        default=5,
+        help='Search depth, in plies.',
+    )
+    stochastic.add_argument(
+        '--budget',
+        type=float,
+        default=0.05,
+        help='Per-move time budget, in seconds.',
+    )
+    stochastic.add_argument(
+        '--prob-attack',
+        type=float,
+        default=0.8,
+        help='Probability of the stochastic greedy ghost to attack.',
+    )
+    stochastic.add_argument(
+        '--max-moves',
+        type=int,
+        default=300,
+        help='Maximum number of moves of a game.',
+    )
+    stochastic.set_defaults(run=benchmark_expectimax)
+
+    parallel = subparsers.add_parser(
+        'parallel',
+        help='Serial vs root-parallel H-Minimax.',
+    )
+    parallel.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['medium_adv', 'large_adv'],
+        help='Maze layouts.',
+    )
+    parallel.add_argument(
+        '--ghost',
+        choices=list(GHOSTS.keys()),
+        default='greedy',
+        help='Ghost agent.',
+    )
+    parallel.add_argument(
+        '--depth',
+        type=int,
+        default=7,
+        help='Search depth, in plies.',
+    )
+    parallel.add_argument(
+        '--workers',
+        type=int,
+        nargs='+',
+        default=[2, 4, 8, 16],
+        help='Numbers of worker processes.',
+    )
+    parallel.add_argument(
+        '--moves',
+        type=int,
+        default=30,
+        help='Maximum number of moves of the reference game searched.',
+    )
+    parallel.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed for random number generator.',
+    )
+    parallel.set_defaults(run=benchmark_parallel)
+
+    ponder = subparsers.add_parser(
+        'ponder',
+        help='Iterative deepening without vs with pondering.',
+    )
+    ponder.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['medium_adv', 'large_adv'],
+        help='Maze layouts.',
+    )
+    ponder.add_argument(
+        '--ghosts',
+        nargs='+',
+        choices=list(GHOSTS.keys()),
+        default=list(GHOSTS.keys()),
+        help='Ghost agents.',
+    )
+    ponder.add_argument(
+        '--budget',
+        type=float,
+        default=0.02,
+        help='Per-move time budget, in seconds.',
+    )
+    ponder.add_argument(
+        '--ponder',
+        type=int,
+        default=2,
+        help='Plies pondered beyond the last search.',
+    )
+    ponder.add_argument(
+        '--ghost-delay',
+        type=float,
+        default=0.02,
+        help='Time taken by the ghost per move, in seconds.',
+    )
+    ponder.add_argument(
+        '--games',
+        type=int,
+        default=5,
+        help='Number of games per layout, ghost and agent.',
+    )
+    ponder.add_argument(
+        '--max-moves',
+        type=int,
+        default=300,
+        help='Maximum number of moves of a game.',
+    )
+    ponder.set_defaults(run=benchmark_ponder)
+
+    cache = subparsers.add_parser(
+        'cache',
+        help='H-Minimax and Expectimax without vs with successor cache.',
+    )
+    cache.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['medium_adv', 'large_adv'],
+        help='Maze layouts.',
+    )
+    cache.add_argument(
+        '--ghost',
+        choices=list(GHOSTS.keys()),
+        default='greedy',
+        help='Ghost agent.',
+    )
+    cache.add_argument(
+        '--depth',
+        type=int,
+        default=7,
+        help='Search depth, in plies.',
+    )
+    cache.add_argument(
+        '--nodes',
+        type=int,
+        default=2000,
+        help='Per-move node budget of iterative deepening.',
+    )
+    cache.add_argument(
+        '--entries',
+        type=int,
+        default=2 ** 16,
+        help='Maximum number of entries of the cache.',
+    )
+    cache.add_argument(
+        '--max-bytes',
+        type=int,
+        default=None,
+        help='Maximum memory of the cache, in bytes.',
+    )
+    cache.add_argument(
+        '--moves',
+        type=int,
+        default=30,
+        help='Maximum number of moves of the reference game searched.',
+    )
+    cache.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed for random number generator.',
+    )
+    cache.set_defaults(run=benchmark_cache)
+
+    evaluation = subparsers.add_parser(
+        'evaluation',
+        help='Previous vs current and memoized H-Minimax evaluation.',
+    )
+    evaluation.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['medium_adv', 'large_adv'],
+        help='Maze layouts.',
+    )
+    evaluation.add_argument(
+        '--ghost',
+        choices=list(GHOSTS.keys()),
+        default='greedy',
+        help='Ghost agent.',
+    )
+    evaluation.add_argument(
+        '--depth',
+        type=int,
+        default=7,
+        help='Search depth, in plies.',
+    )
+    evaluation.add_argument(
+        '--moves',
+        type=int,
+        default=30,
+        help='Maximum number of moves of the reference game searched.',
+    )
+    evaluation.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed for random number generator.',
+    )
+    evaluation.set_defaults(run=benchmark_evaluation)
+
+    tree = subparsers.add_parser(
+        'mcts',
+        help='MCTS win rate and simulation rate vs iterations and workers.',
+    )
+    tree.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['large_adv'],
+        help='Maze layouts.',
+    )
+    tree.add_argument(
+        '--ghosts',
+        nargs='+',
+        choices=list(GHOSTS.keys()),
+        default=['greedy', 'smarty'],
+        help='Ghost agents, also used as models.',
+    )
+    tree.add_argument(
+        '--iterations',
+        type=int,
+        nargs='+',
+        default=[50, 200, 800],
+        help='Simulations per move.',
+    )
+    tree.add_argument(
+        '--workers',
+        type=int,
+        nargs='+',
+        default=[1, 2, 4],
+        help='Numbers of worker processes.',
+    )
+    tree.add_argument(
+        '--games',
+        type=int,
+        default=5,
+        help='Number of games per configuration.',
+    )
+    tree.add_argument(
+        '--max-moves',
+        type=int,
+        default=300,
+        help='Maximum number of moves of a game.',
+    )
+    tree.set_defaults(run=benchmark_mcts)
+
+    args = parser.parse_args()
+    args.run(args)
@@ -0,0 +1,127 @@
+from pacman_module.ghostAgents import (
+    DumbyGhost,
+    GreedyGhost,
+    SmartyGhost,
+    EastRandyGhost,
+)
+
+import hminimax
+from hminimax import BudgetExhausted
+
+
+# Built with the default options, as the ghosts of `run.py`
+MODELS = {
+    'dumby': DumbyGhost,
+    'greedy': GreedyGhost,
+    'smarty': SmartyGhost,
+    'eastrandy': EastRandyGhost,
+}
+
+
+class PacmanAgent(hminimax.PacmanAgent):
+    """Pacman agent using Expectimax against a model of the ghost.
+
+    Ghost nodes are chance nodes weighting their children by the
+    distribution over moves of the `ghost` model (the `run.py` ghosts,
+    `prob_attack` setting the greediness of the greedy ghost). Moves the
+    ghost never plays are neither generated nor searched. Distributions
+    only depend on the cell and direction of the ghost and on the cell of
+    Pacman, by which they are cached.
+
+    The search has a fixed depth or is iteratively deepened under a time
+    or node budget, as in `hminimax.PacmanAgent`, with the same
+    evaluation.
+
+    Arguments:
+        ghost: The name of the ghost model.
+        prob_attack: The probability of the greedy ghost to attack.
+        depth, budget, nodes: See `hminimax.PacmanAgent`.
+    """
+
+    def __init__(self, ghost='greedy', prob_attack=1.0, depth=None,
+                 budget=None, nodes=None):
+        super().__init__(depth=depth, budget=budget, nodes=nodes, table=0)
+        if ghost == 'greedy':
+            self.model = GreedyGhost(1, prob_attack=float(prob_attack))
+        else:
+            self.model = MODELS[ghost](1)
+        self.distributions = {}
+        self.probes = 0
+        self.hits = 0
+        self.stats["Distribution cache hit rate"] = 0.0
+
+    def search(self, state, key, depth, pv):
+        """Searches the state to a fixed depth and returns its best move as
+        a line."""
+        self.iteration = depth
+        self.cut_off = False
+
+        _, action = self.expectimax(state, depth, is_pacman_turn=True)
+
+        self.stats["Distribution cache hit rate"] = round(
+            self.hits / self.probes, 3) if self.probes else 0.0
+
+        return [action] if action else []
+
+    def expectimax(self, state, depth, is_pacman_turn):
+        """Performs Expectimax. Returns the value of the state and, on
+        Pacman's turn, the best move."""
+
+        if self.isCutOff(state, depth):
+            if depth == 0:
+                self.cut_off = True
+            return self.evaluate_state(state), None
+
+        # The first iteration always completes, to have a move
+        if self.deepening and self.iteration > 1 and self.exhausted():
+            raise BudgetExhausted
+        self.expanded += 1
+
+        if is_pacman_turn:
+            v = float('-inf')
+            best_action = None
+            for successor_state, action in state.generatePacmanSuccessors():
+                value, _ = self.expectimax(
+                    successor_state, depth - 1, is_pacman_turn=False)
+                if value > v:
+                    v = value
+                    best_action = action
+
+            return v, best_action
+
+        # Only the moves the ghost may play are generated
+        v = 0.0
+        for action, probability in self.distribution(state).items():
+            successor_state = state.expandGhostSuccessor(1, action)
+            value, _ = self.expectimax(
+                successor_state, depth - 1, is_pacman_turn=True)
+            v += probability * value
+
+        return v, None
+
+    def distribution(self, state):
+        """Returns the distribution over the moves of the ghost, as a
+        dictionary, cached by cells and direction."""
+        ghost = state.getGhostState(1)
+        key = (
+            ghost.getPosition(),
+            ghost.getDirection(),
+            state.getPacmanPosition(),
+            ghost.scaredTimer > 0,
+        )
+
+        self.probes += 1
+        distribution = self.distributions.get(key)
+        if distribution is None:
+            counter = self.model.getDistribution(state)
+            total = sum(counter.values())
+            distribution = {
+                action: probability / total
+                for action, probability in counter.items()
+                if probability > 0
+            }
+            self.distributions[key] = distribution
+        else:
+            self.hits += 1
+
+        return distribution
@@ -1,63 +1,600 @@
+import concurrent.futures
+import math
+import multiprocessing
+import queue
+import threading
+import time
+
 from pacman_module.game import Agent, Directions
+from pacman_module.pacman import GameState
 from pacman_module.util import manhattanDistance
 
+from transposition import EXACT, LOWER, UPPER, TranspositionTable, Zobrist
+
+
+EVALUATIONS = 2 ** 16  # Maximum number of memoized evaluations
+
+
+class BudgetExhausted(Exception):
+    """Raised when the per-move budget of the search is used up."""
+
+
+worker = None
+
+
+def initialize(options, alpha, lock):
+    """Creates the agent of a pool process, sharing the alpha bound of the
+    root."""
+    global worker
+    worker = PacmanAgent(**options)
+    worker.shared = alpha
+    worker.lock = lock
+
+
+def search_child(state, key, depth, generation, iteration, deadline, nodes,
+                 pv, visit_count):
+    """Searches a successor of the root in a pool process.
+
+    Returns:
+        The value of the successor (an upper bound below the shared alpha
+        bound, None if the budget was used up), its principal variation,
+        the number of nodes expanded by the search and by the game (see
+        `GameState.countExpanded`), the updated visit counts and whether
+        the search was cut off.
+    """
+    agent = worker
+    GameState.resetNodeExpansionCounter()
+    if agent.zobrist is None:
+        walls = state.getWalls()
+        agent.zobrist = Zobrist(walls.width, walls.height)
+    if agent.table.generation != generation:
+        agent.table.generation = generation - 1
+        agent.table.new_move()
+
+    agent.killers = [[] for _ in range(depth + 2)]
+    agent.iteration = iteration
+    agent.deadline = deadline
+    agent.nodes = nodes
+    agent.expanded = 0
+    agent.cut_off = False
+    agent.visit_count = visit_count
+
+    try:
+        value, line = agent.hMinimax(
+            state, depth, is_pacman_turn=False, alpha=float('-inf'),
+            beta=float('inf'), ply=1, pv=pv, key=key)
+    except BudgetExhausted:
+        return None, [], agent.expanded, GameState.countExpanded, \
+            agent.visit_count, True
+
+    if agent.pruning:
+        with agent.lock:
+            if value > agent.shared.value:
+                agent.shared.value = value
+
+    return value, line, agent.expanded, GameState.countExpanded, \
+        agent.visit_count, agent.cut_off
+
 
 class PacmanAgent(Agent):
-    """Pacman agent using H-Minimax."""
+    """Pacman agent using H-Minimax with alpha-beta pruning.
+
+    States are evaluated by their score, the distances from Pacman to the
+    closest food and to the ghost, and the number of times Pacman's cell
+    was evaluated (see `evaluate_state`).
+
+    Children are searched in the order of the principal variation of the
+    previous move, then of the killer moves of their ply (the last moves
+    that caused a cutoff at that ply), then of a cheap evaluation (score
+    and distance between Pacman and the ghost), so that cutoffs happen
+    early.
+
+    Without budget, the search has a fixed depth. With a per-move time
+    (`budget`, in seconds) or node (`nodes`, in expansions) budget, the
+    search is iteratively deepened from depth 1 up to `depth` (unbounded
+    by default) until the budget is used up, each iteration being ordered
+    by the principal variation and killer moves of the previous one. The
+    move of the last completed iteration is played and the depths reached
+    are reported in `stats`.
+
+    Searched states are stored in a transposition table of `table` entries
+    (see `transposition.TranspositionTable`), kept across moves. Their
+    values are stored relative to their score, which depends on the path
+    to them, and their best moves are tried first. As values also depend
+    on the visit counts, only the entries of the current move cut the
+    search off, those of older moves only ordering it. Hit rates are
+    reported in `stats`.
+
+    With several `workers`, the subtrees of the successors of the root are
+    searched in parallel in a pool of processes, kept across moves. The
+    processes share the alpha bound of the root to prune their subtrees,
+    only pruning the subtrees strictly worse than the bound, so that the
+    first best move in the order of the serial search is found. The
+    transposition table is then disabled, as each process would fill its
+    own. The move is that of the serial search without table as long as
+    the visit counts agree, but each process only counts the visits of its
+    own subtree, merged after the search, while the serial search also
+    counts those of the subtrees searched before (about 60 to 80% of the
+    same moves on medium and large layouts, see `benchmark.py parallel`).
+    Nodes expanded by the pool processes are added to the count of the
+    game, and node budgets apply to each process.
+
+    With `ponder` set, the agent keeps searching in a background thread
+    after returning its move, while the ghost moves: the states after each
+    ghost reply, the one of the principal variation first, are searched
+    by iterative deepening up to `ponder` plies deeper than the last
+    search, filling the transposition table. When the actual reply was
+    pondered, the next search reuses its entries, reaching deeper within
+    the same budget (or, without budget, taking less time). Pondering is
+    stopped as soon as the next move is asked for, and its expansions are
+    not counted by the game. Ponder hit rates are reported in `stats`.
 
-    def __init__(self):
+    Pondering only pays off when the ghost takes time to move: with ghosts
+    delayed by 20 ms (see `benchmark.py ponder`), about 80% of the replies
+    are pondered and the search reaches 1.5 to 2 plies deeper. In games
+    run by `run.py`, the ghosts move in microseconds and next to no reply
+    is pondered (hit rates of 0 to 0.03), hence pondering is off by
+    default.
+    """
+
+    def __init__(self, depth=None, pruning=True, budget=None, nodes=None,
+                 table=2 ** 16, workers=1, ponder=0):
         super().__init__()
-        self.depth = 3
+        self.workers = int(workers)
+        # The processes would each fill their own table, in another order
+        # than the serial search
+        if self.workers > 1:
+            table = 0
+        self.options = {
+            'depth': depth, 'pruning': pruning, 'budget': budget,
+            'nodes': nodes, 'table': table,
+        }
+        self.budget = None if budget is None else float(budget)
+        self.nodes = None if nodes is None else int(nodes)
+        self.deepening = self.budget is not None or self.nodes is not None
+        if depth is not None:
+            self.depth = int(depth)
+        else:
+            self.depth = float('inf') if self.deepening else 3
+        self.pruning = bool(int(pruning))
         self.visit_count = {}
+        self.pellets = {}
+        self.evaluations = {}
+        self.killers = []
+        self.pv = []
+        self.deadline = None
+        self.expanded = 0
+        self.iteration = 0
+        self.cut_off = False
+        self.table = TranspositionTable(int(table))
+        self.zobrist = None
+        self.pool = None
+        self.shared = None
+        self.lock = None
+        self.ponder = int(ponder)
+        if self.ponder and (self.table.size <= 0 or self.workers > 1):
+            raise ValueError(
+                'Pondering needs a transposition table and a single worker')
+        self.ponderer = None
+        self.requests = queue.Queue()
+        self.pondering = False
+        self.advanced = False
+        self.pondered = {}
+        self.stop = threading.Event()
+        self.moves = 0
+        self.ponder_hits = 0
+        self.stats = {}
+        if self.deepening:
+            self.stats["Depth reached"] = []
+        if self.table.size > 0:
+            self.stats["TT hit rate"] = []
+            self.stats["TT entries"] = 0
+        if self.ponder:
+            self.stats["Ponder hit rate"] = 0.0
+            self.stats["Ponder depth"] = []
 
     def get_action(self, state):
         """Given a Pacman game state, returns a legal move."""
-        _, action = self.hMinimax(state, self.depth, is_pacman_turn=True)
+        self.stop_pondering()
+
+        # The previous line, after Pacman's move and the ghost's reply
+        pv = self.pv[2:]
+        self.killers = []
+
+        if self.zobrist is None:
+            walls = state.getWalls()
+            self.zobrist = Zobrist(walls.width, walls.height)
+        key = self.zobrist.key(state)
+        # Pondering already started the move, its entries cutting it off
+        self.table.new_move(advance=not self.advanced)
+        self.advanced = False
+
+        if self.ponder:
+            if self.moves > 0:
+                self.ponder_hits += key in self.pondered
+                self.stats["Ponder hit rate"] = round(
+                    self.ponder_hits / self.moves, 3)
+            self.stats["Ponder depth"].append(self.pondered.get(key, 0))
+            self.pondered = {}
+        self.moves += 1
+
+        if not self.deepening:
+            depth = self.depth
+            line = self.search(state, key, self.depth, pv)
+        else:
+            if self.budget is not None:
+                self.deadline = time.perf_counter() + self.budget
+            self.expanded = 0
+
+            line = []
+            depth = 0
+            while depth < self.depth:
+                try:
+                    pv = line = self.search(state, key, depth + 1, pv)
+                except BudgetExhausted:
+                    break
+                depth += 1
+                # Deeper iterations cannot change a fully terminal tree
+                if not self.cut_off:
+                    break
+
+            self.stats["Depth reached"].append(depth)
+
+        if self.table.size > 0:
+            self.stats["TT hit rate"].append(round(self.table.hit_rate(), 3))
+            self.stats["TT entries"] = len(self.table)
+
+        self.pv = line
+
+        if self.ponder and line:
+            # A thread kept across moves, as starting one waits for it
+            if self.ponderer is None:
+                self.ponderer = threading.Thread(
+                    target=self.serve, daemon=True)
+                self.ponderer.start()
+            self.requests.put((state, line, depth + self.ponder))
+
+        return line[0] if line else Directions.STOP
+
+    def serve(self):
+        """Ponders the requests of the background thread, until None. A
+        failed request is reported in `stats` and does not stop the
+        thread, which always marks it done so that `stop_pondering` does
+        not wait forever."""
+        while True:
+            request = self.requests.get()
+            try:
+                if request is not None:
+                    self.ponder_replies(*request)
+            except Exception as e:
+                self.stats["Ponder error"] = repr(e)
+            finally:
+                self.requests.task_done()
+            if request is None:
+                return
+
+    def ponder_replies(self, state, line, depth):
+        """Searches the states after each ghost reply to the move of `line`,
+        up to `depth`, until stopped. The states being those of the next
+        move, the transposition table starts it."""
+        self.table.new_move()
+        self.advanced = True
+        self.pondering = True
+        try:
+            successor = state.generatePacmanSuccessor(line[0])
+            if self.isTerminal(successor):
+                return
+            # Generated without being counted, like the pondering search
+            replies = sorted(
+                [(successor.generateSuccessor(1, action), action)
+                 for action in successor.getLegalActions(1)
+                 if action != Directions.STOP],
+                key=lambda sa: (line[1:2] != [sa[1]],
+                                self.cheap_evaluation(sa[0])),
+            )
+
+            for reply_state, action in replies:
+                if self.isTerminal(reply_state):
+                    continue
+                key = self.zobrist.key(reply_state)
+                pv = line[2:] if line[1:2] == [action] else []
+                self.killers = []
+                reached = 0
+                while reached < depth:
+                    try:
+                        pv = self.search(reply_state, key, reached + 1, pv)
+                    except BudgetExhausted:
+                        return
+                    reached += 1
+                    self.pondered[key] = reached
+                    if not self.cut_off:
+                        break
+        finally:
+            self.pondering = False
+
+    def stop_pondering(self):
+        """Stops the background search, if any."""
+        if self.ponderer is not None:
+            self.stop.set()
+            self.requests.join()
+            self.stop.clear()
+
+    def search(self, state, key, depth, pv):
+        """Searches the state to a fixed depth and returns its principal
+        variation."""
+        while len(self.killers) < depth:
+            self.killers.append([])
+        self.iteration = depth
+        self.cut_off = False
+
+        if self.workers > 1:
+            return self.split(state, key, depth, pv)
+
+        _, line = self.hMinimax(
+            state, depth, is_pacman_turn=True,
+            alpha=float('-inf'), beta=float('inf'), ply=0, pv=pv, key=key,
+        )
+
+        return line
 
-        return action if action else Directions.STOP
+    def split(self, state, key, depth, pv):
+        """Searches the subtrees of the successors of the root in the pool
+        of processes and returns the principal variation."""
+        if self.pool is None:
+            self.shared = multiprocessing.RawValue('d', float('-inf'))
+            self.lock = multiprocessing.Lock()
+            self.pool = concurrent.futures.ProcessPoolExecutor(
+                self.workers, initializer=initialize,
+                initargs=(self.options, self.shared, self.lock))
+        self.shared.value = float('-inf')
+        self.expanded += 1
 
-    def hMinimax(self, state, depth, is_pacman_turn):
-        """Performs H-Minimax without alpha-beta pruning."""
+        hash_move = None
+        if self.table.size > 0:
+            entry = self.table.lookup(key)
+            if entry is not None:
+                hash_move = entry.move
+
+        successors = list(self.order(state, True, 0, pv, hash_move))
+        nodes = None if self.nodes is None else self.nodes - self.expanded
+        visit_count = dict(self.visit_count)
+        futures = [
+            self.pool.submit(
+                search_child, successor_state,
+                self.zobrist.pacman_move(key, state, successor_state),
+                depth - 1, self.table.generation, self.iteration,
+                self.deadline, nodes,
+                pv[1:] if pv and pv[0] == action else [], visit_count)
+            for successor_state, action in successors
+        ]
+
+        # Wait for all the subtrees, so that none outlives the search
+        concurrent.futures.wait(futures)
+
+        v = float('-inf')
+        best_line = []
+        exhausted = False
+        for (_, action), future in zip(successors, futures):
+            value, line, expanded, counted, visits, cut_off = \
+                future.result()
+            self.expanded += expanded
+            GameState.countExpanded += counted
+            for position, count in visits.items():
+                self.visit_count[position] = self.visit_count.get(
+                    position, 0) + count - visit_count.get(position, 0)
+            if value is None:
+                exhausted = True
+                continue
+
+            self.cut_off = self.cut_off or cut_off
+            if value > v:
+                v = value
+                best_line = [action] + line
+
+        if exhausted:
+            raise BudgetExhausted
+
+        if self.table.size > 0:
+            self.table.store(
+                key, depth, v - 10 * state.getScore(), EXACT,
+                best_line[0] if best_line else None)
+
+        return best_line
+
+    def final(self, state):
+        """Called at the end of the game, stops pondering and shuts the
+        pool down."""
+        self.close()
+
+    def close(self):
+        """Stops pondering and shuts the pool of processes down."""
+        self.stop_pondering()
+        if self.ponderer is not None:
+            self.requests.put(None)
+            self.ponderer.join()
+            self.ponderer = None
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def exhausted(self):
+        """Checks if the per-move budget is used up, or if pondering is to
+        stop."""
+        if self.pondering:
+            return self.stop.is_set()
+        if self.nodes is not None and self.expanded >= self.nodes:
+            return True
+        return self.deadline is not None \
+            and time.perf_counter() > self.deadline
+
+    def hMinimax(self, state, depth, is_pacman_turn, alpha, beta, ply, pv,
+                 key):
+        """Performs H-Minimax with alpha-beta pruning. Returns the value of
+        the state and its principal variation, `pv` being the expected
+        one (empty when off the previous principal variation) and `key` the
+        Zobrist key of the state."""
 
         # If cutoff, return the evaluation value
         if self.isCutOff(state, depth):
-            eval_value = self.evaluate_state(state)
-            return eval_value, None
+            if depth == 0:
+                self.cut_off = True
+            eval_value = self.evaluate_state(state, key)
+            return eval_value, []
+
+        # The first iteration always completes, to have a move
+        if (self.pondering or self.deepening and self.iteration > 1) \
+                and self.exhausted():
+            raise BudgetExhausted
+        self.expanded += 1
+
+        # Alpha bound of the root shared by the pool processes, only
+        # pruning the subtrees strictly worse than the best one
+        if self.shared is not None and self.pruning:
+            alpha = max(alpha, math.nextafter(
+                self.shared.value, float('-inf')))
+
+        # Transposition table, the root being always searched
+        offset = 10 * state.getScore()
+        hash_move = None
+        if self.table.size > 0:
+            entry = self.table.lookup(key)
+            if entry is not None:
+                hash_move = entry.move
+                value = entry.value + offset
+                # Values depend on the visit counts, which change between
+                # moves: entries of older moves only order the moves
+                current = entry.generation == self.table.generation
+                if ply > 0 and current and entry.depth >= depth and (
+                    entry.bound == EXACT
+                    or entry.bound == LOWER and value >= beta
+                    or entry.bound == UPPER and value <= alpha
+                ):
+                    # The stored subtree may have been cut off
+                    self.cut_off = True
+                    return value, [entry.move] if entry.move else []
 
         if is_pacman_turn:
-            return self.max_value(state, depth)
+            v, line = self.max_value(
+                state, depth, alpha, beta, ply, pv, key, hash_move)
         else:
-            return self.min_value(state, depth)
+            v, line = self.min_value(
+                state, depth, alpha, beta, ply, pv, key, hash_move)
+
+        if self.table.size > 0:
+            # The shared alpha bound may have been raised while searching
+            # the subtree, its nodes then failing low against it
+            if self.shared is not None and self.pruning:
+                alpha = max(alpha, math.nextafter(
+                    self.shared.value, float('-inf')))
+            bound = EXACT
+            if self.pruning and v <= alpha:
+                bound = UPPER
+            elif self.pruning and v >= beta:
+                bound = LOWER
+            self.table.store(
+                key, depth, v - offset, bound, line[0] if line else None)
+
+        return v, line
 
-    def max_value(self, state, depth):
+    def max_value(self, state, depth, alpha, beta, ply, pv, key, hash_move):
         """Fonction max pour Pacman (survivre et ramasser la nourriture)."""
         v = float('-inf')
-        best_action = None
+        best_line = []
 
-        for successor_state, action in state.generatePacmanSuccessors():
-            min_val, _ = self.hMinimax(
-                successor_state, depth - 1, is_pacman_turn=False
+        successors = self.order(
+            state, True, ply, pv, hash_move)
+        for successor_state, action in successors:
+            min_val, line = self.hMinimax(
+                successor_state, depth - 1, is_pacman_turn=False,
+                alpha=alpha, beta=beta, ply=ply + 1,
+                pv=pv[1:] if pv and pv[0] == action else [],
+                key=self.zobrist.pacman_move(key, state, successor_state),
             )
             if min_val > v:
                 v = min_val
-                best_action = action
+                best_line = [action] + line
+            if self.pruning:
+                if v >= beta:
+                    self.killer(ply, action)
+                    break
+                alpha = max(alpha, v)
 
-        return v, best_action
+        return v, best_line
 
-    def min_value(self, state, depth):
+    def min_value(self, state, depth, alpha, beta, ply, pv, key, hash_move):
         """Fonction min pour les fantômes (réduire le score de Pacman)."""
         v = float('inf')
-        best_action = None
+        best_line = []
 
-        for successor_state, action in state.generateGhostSuccessors(1):
-            max_val, _ = self.hMinimax(
-                successor_state, depth - 1, is_pacman_turn=True
+        successors = self.order(
+            state, False, ply, pv, hash_move)
+        for successor_state, action in successors:
+            max_val, line = self.hMinimax(
+                successor_state, depth - 1, is_pacman_turn=True,
+                alpha=alpha, beta=beta, ply=ply + 1,
+                pv=pv[1:] if pv and pv[0] == action else [],
+                key=self.zobrist.ghost_move(key, state, successor_state),
             )
             if max_val < v:
                 v = max_val
-                best_action = action
+                best_line = [action] + line
+            if self.pruning:
+                if v <= alpha:
+                    self.killer(ply, action)
+                    break
+                beta = min(beta, v)
+
+        return v, best_line
+
+    def order(self, state, is_pacman_turn, ply, pv, hash_move):
+        """Yields the successors of a state: principal variation move,
+        transposition table move, killer moves, then best cheap evaluation
+        first. Successors are generated lazily, the moves tried first
+        alone, so that a cutoff spares the generation of the others."""
+        # Pondering runs while other agents play, its expansions are not
+        # counted by the game
+        agent = 0 if is_pacman_turn else 1
+        if self.pondering:
+            def expand(action):
+                return state.generateSuccessor(agent, action)
+        elif is_pacman_turn:
+            expand = state.expandPacmanSuccessor
+        else:
+            def expand(action):
+                return state.expandGhostSuccessor(1, action)
+
+        legal = state.getLegalActions(agent)
+
+        legal = [action for action in legal if action != Directions.STOP]
 
-        return v, best_action
+        first = []
+        for action in pv[:1] + [hash_move] + self.killers[ply]:
+            if action in legal and action not in first:
+                first.append(action)
+                yield expand(action), action
+
+        rest = [(expand(action), action)
+                for action in legal if action not in first]
+        rest.sort(
+            key=lambda successor_action: self.cheap_evaluation(
+                successor_action[0]),
+            reverse=is_pacman_turn)
+        yield from rest
+
+    def killer(self, ply, action):
+        """Records a move that caused a cutoff, keeping two per ply."""
+        killers = self.killers[ply]
+        if action in killers:
+            killers.remove(action)
+        killers.insert(0, action)
+        del killers[2:]
+
+    def cheap_evaluation(self, state):
+        """Score and distance between Pacman and the ghost, for ordering."""
+        if state.isLose():
+            return float('-inf')
+        return state.getScore() + manhattanDistance(
+            state.getPacmanPosition(), state.getGhostPosition(1))
 
     def isTerminal(self, state):
         """Checks if the state is terminal (win or lose)."""
@@ -67,12 +604,41 @@ class PacmanAgent(Agent):
         """Checks if the search should be cut off."""
         return depth == 0 or self.isTerminal(state)
 
-    def evaluate_state(self, state):
+    def evaluate_state(self, state, key=None):
         """Evaluate the state by considering both
-        food and ghost."""
+        food and ghost.
+
+        The distances only depend on the cells of Pacman and of the food
+        and on the positions of the ghosts, and are memoized by the
+        Zobrist `key` of the state, when given, across moves."""
         pacman_pos = state.getPacmanPosition()
         ghost_positions = state.getGhostPositions()
-        food_positions = state.getFood().asList()
+
+        # Zobrist keys ignore the fractions of the positions of scared
+        # ghosts, which are thus checked
+        memo = self.evaluations.get(key) if key is not None else None
+        if memo is not None and memo[0] == ghost_positions:
+            _, ghost_penalty, food_reward = memo
+        else:
+            ghost_penalty, food_reward = self.features(
+                state, pacman_pos, ghost_positions)
+            if key is not None:
+                if len(self.evaluations) >= EVALUATIONS:
+                    self.evaluations = {}
+                self.evaluations[key] = (
+                    ghost_positions, ghost_penalty, food_reward)
+
+        # Incremental revisit penalty based on visit count
+        self.visit_count[pacman_pos] = self.visit_count.get(pacman_pos, 0) + 1
+        visit_penalty = -self.visit_count[pacman_pos]
+
+        dynamic_penalty = ghost_penalty + visit_penalty
+
+        return 10 * state.getScore() + dynamic_penalty + food_reward
+
+    def features(self, state, pacman_pos, ghost_positions):
+        """Ghost penalty and food reward of a state. The food is listed once
+        per food grid."""
 
         # Calculate minimum distance to ghosts
         min_ghost_distance = min(
@@ -80,11 +646,22 @@ class PacmanAgent(Agent):
             for ghost_pos in ghost_positions
         ) if ghost_positions else float('inf')
 
-        # Calculate minimum distance to food
+        # Calculate minimum distance to food, food grids being shared by
+        # the states until food is eaten
+        food = state.getFood().data
+        pellets = self.pellets.get(id(food))
+        if pellets is None or pellets[0] is not food:
+            if len(self.pellets) >= EVALUATIONS:
+                self.pellets = {}
+            pellets = (food, [
+                (x, y) for x, column in enumerate(food)
+                for y, pellet in enumerate(column) if pellet
+            ])
+            self.pellets[id(food)] = pellets
+        x, y = pacman_pos
         min_food_distance = min(
-            manhattanDistance(pacman_pos, food_pos)
-            for food_pos in food_positions
-        ) if food_positions else 1
+            abs(x - food_x) + abs(y - food_y) for food_x, food_y in pellets[1]
+        ) if pellets[1] else 1
 
         # Higher penalty for being close to ghosts
         ghost_penalty = -25 / (
@@ -97,15 +674,9 @@ class PacmanAgent(Agent):
         else:
             food_reward = 30 / (min_food_distance + 1)
 
-        # Incremental revisit penalty based on visit count
-        self.visit_count[pacman_pos] = self.visit_count.get(pacman_pos, 0) + 1
-        visit_penalty = -self.visit_count[pacman_pos]
-
         # If Pacman is close to both food and ghosts, prioritize food
         # I think that that is a good idea to prioritize food
         if min_food_distance < 3 and min_ghost_distance < 3:
             ghost_penalty = -5
 
-        dynamic_penalty = ghost_penalty + visit_penalty
-
-        return 10 * state.getScore() + dynamic_penalty + food_reward
+        return ghost_penalty, food_reward
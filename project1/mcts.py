@@ -0,0 +1,315 @@
+import concurrent.futures
+import math
+import random
+import time
+
+from pacman_module.game import Actions, Agent, Directions
+from pacman_module.ghostAgents import GreedyGhost
+from pacman_module.pacman import GameState
+from pacman_module.util import manhattanDistance
+
+from expectimax import MODELS
+from hminimax import BudgetExhausted
+
+
+SCALE = 500  # Rewards are score differences in units of a win or loss
+
+
+class Node:
+    """Node of the search tree, reached by a sequence of moves from the
+    root. Pacman nodes have a child per Pacman move and chance nodes a child
+    per sampled ghost move. States are not stored, but simulated again from
+    the root, so that trees are cheap to send between processes."""
+
+    __slots__ = ('visits', 'value', 'children')
+
+    def __init__(self):
+        self.visits = 0
+        self.value = 0.0
+        self.children = {}
+
+    def __len__(self):
+        return 1 + sum(len(child) for child in self.children.values())
+
+    def merge(self, other):
+        """Adds the statistics of another tree into this one."""
+        self.visits += other.visits
+        self.value += other.value
+        for action, child in other.children.items():
+            if action in self.children:
+                self.children[action].merge(child)
+            else:
+                self.children[action] = child
+
+
+class Expansions:
+    """Counts the states expanded by the simulations, a state being
+    expanded when a successor of it is generated, within a node budget
+    (None for no budget)."""
+
+    __slots__ = ('count', 'limit')
+
+    def __init__(self, limit=None):
+        self.count = 0
+        self.limit = limit
+
+    def successor(self, state, index, action):
+        """Returns the successor of a state after the move of an agent,
+        raising BudgetExhausted if the budget is used up."""
+        if self.limit is not None and self.count >= self.limit:
+            raise BudgetExhausted
+        self.count += 1
+        return state.generateSuccessor(index, action)
+
+
+def model(ghost, prob_attack):
+    """Returns the ghost agent used to sample the moves of the ghost."""
+    if ghost == 'greedy':
+        return GreedyGhost(1, prob_attack=float(prob_attack))
+    return MODELS[ghost](1)
+
+
+def search(state, ghost, prob_attack, exploration, horizon, epsilon,
+           deadline, iterations, seed=None, nodes=None):
+    """Runs UCT simulations from a state until the deadline (in the
+    `time.monotonic` clock, None for no deadline), the number of
+    iterations or the node budget (None for no budget) is reached, and
+    returns the tree and the number of expanded states. The simulation
+    using up the node budget is dropped. With a `seed`, the process-wide
+    random generator is seeded first, as in pool workers."""
+
+    if seed is not None:
+        random.seed(seed)
+
+    root = Node()
+    ghost = model(ghost, prob_attack)
+    origin = state.getScore()
+    expansions = Expansions(nodes)
+    done = 0
+    while (iterations is None or done < iterations) \
+            and (deadline is None or time.monotonic() < deadline):
+        try:
+            simulate(root, state, ghost, origin, exploration, horizon,
+                     epsilon, expansions)
+        except BudgetExhausted:
+            break
+        done += 1
+
+    return root, expansions.count
+
+
+def simulate(root, state, ghost, origin, exploration, horizon, epsilon,
+             expansions):
+    """Runs one simulation: selects a path down the tree by UCT on Pacman
+    moves and by sampling the ghost model on ghost moves, expands one
+    Pacman move, plays out the rest of the game and backs the reward up
+    the path. States are generated through `expansions`."""
+
+    node = root
+    path = [root]
+    while not state.isWin() and not state.isLose():
+        untried = [move for move in safe(state)
+                   if move[0] not in node.children]
+        if untried:
+            action, _ = random.choice(untried)
+            node.children[action] = Node()
+        else:
+            action = select(node, exploration)
+
+        node = node.children[action]
+        path.append(node)
+        state = expansions.successor(state, 0, action)
+        if state.isWin() or state.isLose():
+            break
+
+        move = ghost.get_action(state)
+        if move not in node.children:
+            node.children[move] = Node()
+        node = node.children[move]
+        path.append(node)
+        state = expansions.successor(state, 1, move)
+
+        if untried:
+            break
+
+    reward = (playout(state, ghost, horizon, epsilon, expansions)
+              - origin) / SCALE
+    for node in path:
+        node.visits += 1
+        node.value += reward
+
+
+def select(node, exploration):
+    """Returns the expanded Pacman move maximizing the UCT bound."""
+    log_visits = math.log(node.visits)
+
+    def bound(action):
+        child = node.children[action]
+        if child.visits == 0:
+            return float('inf')  # Left by a dropped simulation
+        return child.value / child.visits \
+            + exploration * math.sqrt(log_visits / child.visits)
+
+    return max(node.children, key=bound)
+
+
+def safe(state):
+    """Returns the Pacman moves, with the cells they lead to, which do not
+    lead next to the ghost, or all of them when none is safe."""
+    x, y = state.getPacmanPosition()
+    ghost_position = state.getGhostPosition(1)
+    moves = []
+    for action in state.getLegalPacmanActions():
+        if action != Directions.STOP:
+            dx, dy = Actions.directionToVector(action)
+            moves.append((action, (x + int(dx), y + int(dy))))
+
+    return [
+        (action, cell) for action, cell in moves
+        if manhattanDistance(cell, ghost_position) > 1
+    ] or moves
+
+
+def playout(state, ghost, horizon, epsilon, expansions):
+    """Plays at most `horizon` Pacman moves from a state and returns the
+    final score.
+
+    Pacman avoids the cells next to the ghost and moves towards the
+    closest food, or randomly with probability `epsilon`. Moves are chosen
+    from the cells they lead to, only the played one being generated
+    (through `expansions`). The ghost plays its model."""
+
+    for _ in range(horizon):
+        if state.isWin() or state.isLose():
+            break
+
+        moves = safe(state)
+        if random.random() < epsilon:
+            action, _ = random.choice(moves)
+        else:
+            food = state.getFood().asList()
+            action, _ = min(moves, key=lambda move: min(
+                manhattanDistance(move[1], cell) for cell in food))
+
+        state = expansions.successor(state, 0, action)
+        if state.isWin() or state.isLose():
+            break
+        state = expansions.successor(state, 1, ghost.get_action(state))
+
+    return state.getScore()
+
+
+class PacmanAgent(Agent):
+    """Pacman agent using Monte Carlo Tree Search (UCT).
+
+    Each simulation selects Pacman moves by the UCT bound (`exploration`
+    weighting the exploration term) and ghost moves by sampling the
+    `ghost` model (see `expectimax.MODELS`), expands one Pacman move, then
+    plays out at most `horizon` Pacman moves with a fast policy (see
+    `playout`). Rewards are score differences with the root, in units of
+    `SCALE`.
+
+    Simulations run until the per-move time `budget` (in seconds) is used
+    up, or `iterations` simulations are done. With several `workers`,
+    they run in a pool of processes, each growing its own tree from the
+    root (root parallelism), the trees being merged before the most
+    visited move is played. Simulations and their rate are reported in
+    `stats`.
+
+    Every state of which a simulation generates a successor counts as an
+    expanded node, in this process or in the pool processes, and is added
+    to the count of the game once per move. The simulations stop before
+    the node budget of the game is exceeded, the budget being split
+    between the pool processes. The pool is shut down at the end of the
+    game (see `final`).
+
+    Arguments:
+        ghost: The name of the ghost model.
+        prob_attack: The probability of the greedy ghost to attack.
+        budget: The per-move time budget, in seconds (0 or None for no
+            time budget).
+        iterations: The maximum number of simulations per move.
+        workers: The number of processes.
+        exploration: The weight of the exploration term of UCT.
+        horizon: The maximum number of Pacman moves of a playout.
+        epsilon: The probability of a random move in playouts.
+    """
+
+    def __init__(self, ghost='greedy', prob_attack=1.0, budget=0.1,
+                 iterations=None, workers=1, exploration=0.4, horizon=20,
+                 epsilon=0.2):
+        super().__init__()
+        self.pool = None
+        self.ghost = ghost
+        self.prob_attack = float(prob_attack)
+        self.budget = float(budget or 0) or None
+        self.iterations = None if iterations is None else int(iterations)
+        if self.budget is None and self.iterations is None:
+            raise ValueError('MCTS needs a time budget or iterations')
+        self.workers = int(workers)
+        self.exploration = float(exploration)
+        self.horizon = int(horizon)
+        self.epsilon = float(epsilon)
+        self.stats = {
+            "Simulations": [],
+            "Simulations per second": [],
+        }
+
+    def get_action(self, state):
+        """Given a Pacman game state, returns a legal move."""
+        start = time.monotonic()
+        deadline = None if self.budget is None else start + self.budget
+        options = (self.ghost, self.prob_attack, self.exploration,
+                   self.horizon, self.epsilon, deadline)
+
+        nodes = None
+        if GameState.maximumExpanded != float('inf'):
+            nodes = int(GameState.maximumExpanded - GameState.countExpanded)
+
+        if self.workers <= 1:
+            root, expanded = search(
+                state, *options, self.iterations, nodes=nodes)
+        else:
+            if self.pool is None:
+                self.pool = concurrent.futures.ProcessPoolExecutor(
+                    self.workers)
+            iterations = None if self.iterations is None \
+                else -(-self.iterations // self.workers)
+            share = None if nodes is None else nodes // self.workers
+            futures = [
+                self.pool.submit(
+                    search, state, *options, iterations,
+                    random.getrandbits(32), share)
+                for _ in range(self.workers)
+            ]
+            root = Node()
+            expanded = 0
+            for future in futures:
+                tree, count = future.result()
+                root.merge(tree)
+                expanded += count
+
+        GameState.countExpanded += expanded
+
+        elapsed = time.monotonic() - start
+        self.stats["Simulations"].append(root.visits)
+        self.stats["Simulations per second"].append(
+            round(root.visits / elapsed))
+
+        if not root.children:
+            return Directions.STOP
+
+        return max(root.children, key=lambda a: root.children[a].visits)
+
+    def final(self, state):
+        """Called at the end of the game, shuts the pool down."""
+        self.close()
+
+    def close(self):
+        """Shuts the pool of processes down."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __del__(self):
+        self.close()
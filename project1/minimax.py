@@ -1,18 +1,70 @@
 from pacman_module.game import Agent, Directions
 from pacman_module.util import manhattanDistance
-import sys
-sys.setrecursionlimit(10**6)
+from transposition import EXACT, TranspositionTable, Zobrist
+
+
+class Frame:
+    """Record of a state being searched by Minimax."""
+
+    __slots__ = (
+        'state', 'is_pacman_turn', 'zobrist_key', 'index', 'successors',
+        'next', 'v', 'best_action', 'reach', 'pending',
+    )
+
+    def reset(self, state, is_pacman_turn, zobrist_key, index, successors):
+        """Reuses the record for a newly expanded state."""
+        self.state = state
+        self.is_pacman_turn = is_pacman_turn
+        self.zobrist_key = zobrist_key
+        self.index = index
+        self.successors = successors
+        self.next = 0
+        self.v = float('-inf') if is_pacman_turn else float('inf')
+        self.best_action = None
+        self.reach = float('inf')
+        self.pending = None
+
+    def update(self, value, reach, action):
+        """Backs up the value of a child reached by `action`."""
+        self.reach = min(self.reach, reach)
+        if self.is_pacman_turn and value > self.v \
+                or not self.is_pacman_turn and value < self.v:
+            self.v = value
+            self.best_action = action
 
 
 class PacmanAgent(Agent):
-    """Pacman agent using Minimax with a transposition table."""
-
-    def __init__(self):
+    """Pacman agent using Minimax with a transposition table.
+
+    States already on the current path are not searched again (cycles).
+    The value of a state thus depends on the path to it when a cycle in
+    its subtree reaches above it. The other values are stored in a
+    transposition table of `table` entries (see
+    `transposition.TranspositionTable`), kept across moves, relative to
+    the score of their state, and reused whatever the path. Hit rates are
+    reported in `stats`.
+    """
+
+    def __init__(self, table=2 ** 16):
         super().__init__()
+        self.table = TranspositionTable(int(table))
+        self.zobrist = None
+        self.frames = []
+        self.stats = {
+            "TT hit rate": [],
+            "TT entries": 0,
+            "Peak stack depth": 0,
+        }
 
     def get_action(self, state):
         """Get the best action for Pacman using Minimax."""
-        closed_states = set()
+        closed_states = {}
+
+        if self.zobrist is None:
+            walls = state.getWalls()
+            self.zobrist = Zobrist(walls.width, walls.height)
+        key = self.zobrist.key(state)
+        self.table.new_move()
 
         successors = list(state.generatePacmanSuccessors())
 
@@ -21,54 +73,124 @@ class PacmanAgent(Agent):
 
         best_action = max(
             successors,
-            key=lambda sa: self.evaluate_successor(sa, closed_states)
+            key=lambda sa: self.evaluate_successor(
+                sa, closed_states,
+                self.zobrist.pacman_move(key, state, sa[0]))
         )[1]
 
+        self.stats["TT hit rate"].append(round(self.table.hit_rate(), 3))
+        self.stats["TT entries"] = len(self.table)
+
         return best_action
 
-    def evaluate_successor(self, state_action, closed_states):
+    def evaluate_successor(self, state_action, closed_states, zobrist_key):
         """Evaluate the successor state using Minimax."""
         state, _ = state_action
         key = self.key(state)
-        closed_states.add(key)
-        score = self.minimax(state, False, closed_states)
-        closed_states.remove(key)
+        closed_states[key] = 1
+        score, _ = self.minimax(state, False, closed_states, zobrist_key, 1)
+        del closed_states[key]
         return score
 
-    def minimax(self, state, is_pacman_turn, closed_states):
-        """Minimax algorithm implementation."""
-        # Check if the state is terminal
+    def minimax(self, state, is_pacman_turn, closed_states, zobrist_key,
+                index):
+        """Minimax algorithm implementation. Returns the value of the state,
+        at position `index` in the path, and the lowest position in the
+        path of the states closing a cycle in its subtree.
+
+        The search is a depth-first traversal with an explicit stack of
+        `Frame` records, reused across searches, instead of recursion."""
+        value = self.leaf(state, zobrist_key)
+        if value is not None:
+            return value, float('inf')
+
+        frames = self.frames
+        top = 0
+        self.push(0, state, is_pacman_turn, zobrist_key, index)
+
+        while True:
+            frame = frames[top]
+            successors = frame.successors
+
+            # Descend into the next child that is neither closed nor a leaf
+            child = None
+            while frame.next < len(successors):
+                successor_state, action = successors[frame.next]
+                frame.next += 1
+                key = self.key(successor_state)
+                if key in closed_states:
+                    frame.reach = min(frame.reach, closed_states[key])
+                    continue
+
+                if frame.is_pacman_turn:
+                    successor_key = self.zobrist.pacman_move(
+                        frame.zobrist_key, frame.state, successor_state)
+                else:
+                    successor_key = self.zobrist.ghost_move(
+                        frame.zobrist_key, frame.state, successor_state)
+
+                value = self.leaf(successor_state, successor_key)
+                if value is not None:
+                    frame.update(value, float('inf'), action)
+                    continue
+
+                closed_states[key] = frame.index + 1
+                frame.pending = (key, action)
+                child = (successor_state, successor_key)
+                break
+
+            if child is not None:
+                top += 1
+                self.push(
+                    top, child[0], not frame.is_pacman_turn, child[1],
+                    frame.index + 1)
+                continue
+
+            # All children searched
+            v, reach = frame.v, frame.reach
+
+            # The value does not depend on the path above the state
+            if reach >= frame.index:
+                self.table.store(
+                    frame.zobrist_key, float('inf'),
+                    v - frame.state.getScore(), EXACT, frame.best_action)
+
+            frame.state = frame.successors = None
+            if top == 0:
+                return v, reach
+
+            top -= 1
+            parent = frames[top]
+            key, action = parent.pending
+            del closed_states[key]
+            parent.update(v, reach, action)
+
+    def leaf(self, state, zobrist_key):
+        """Returns the value of a terminal state or of a state in the
+        transposition table, None otherwise."""
         if self.isTerminal(state):
             return state.getScore()
-        return (
-            self.max_value(state, closed_states)
-            if is_pacman_turn else
-            self.min_value(state, closed_states)
-        )
-
-    def max_value(self, state, closed_states):
-        """Maximizing function for Pacman's turn."""
-        v = float('-inf')
-        for successor_state, action in state.generatePacmanSuccessors():
-            key = self.key(successor_state)
-            if key not in closed_states:
-                closed_states.add(key)
-                v = max(v, self.minimax(successor_state, False, closed_states))
-                closed_states.remove(key)
-
-        return v
-
-    def min_value(self, state, closed_states):
-        """Minimizing function for ghost's turn."""
-        v = float('inf')
-        for successor_state, action in state.generateGhostSuccessors(1):
-            key = self.key(successor_state)
-            if key not in closed_states:
-                closed_states.add(key)
-                v = min(v, self.minimax(successor_state, True, closed_states))
-                closed_states.remove(key)
-
-        return v
+
+        entry = self.table.lookup(zobrist_key)
+        if entry is not None:
+            return entry.value + state.getScore()
+
+        return None
+
+    def push(self, top, state, is_pacman_turn, zobrist_key, index):
+        """Expands a state into the frame at position `top` of the stack,
+        allocating it on first use."""
+        if top == len(self.frames):
+            self.frames.append(Frame())
+            self.stats["Peak stack depth"] = len(self.frames)
+
+        if is_pacman_turn:
+            successors = state.generatePacmanSuccessors()
+        else:
+            successors = state.generateGhostSuccessors(1)
+
+        self.frames[top].reset(
+            state, is_pacman_turn, zobrist_key, index, successors)
 
     def isTerminal(self, state):
         """Checks if the state is terminal (win or lose)."""
@@ -750,5 +750,10 @@ class Game:
 
         totalScore = self.state.getScore()
 
+        # Let the agents release their resources (e.g. process pools)
+        for agent in self.agents:
+            if hasattr(agent, 'final'):
+                agent.final(self.state)
+
         self.display.finish()
         return totalScore,totalComputationTime,totalExpandedNodes
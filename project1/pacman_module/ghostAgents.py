@@ -18,10 +18,18 @@ from .game import Actions
 from .game import Directions
 from .util import manhattanDistance
 from .util import PriorityQueue
+from .util import BucketQueue
+from .router import MazeRouter
 from . import util
 import numpy as np
 
 
+QUEUES = {
+    'heap': PriorityQueue,
+    'bucket': BucketQueue,
+}
+
+
 class GhostAgent(Agent):
     def __init__(self, index):
         self.index = index
@@ -146,10 +154,22 @@ class GreedyGhost(GhostAgent):
 
 
 class SmartyGhost(GhostAgent):
-    """A smart ghost"""
+    """A smart ghost
 
-    def __init__(self, index):
+    The open list of the path search is either a binary heap (`'heap'`)
+    or a bucket queue (`'bucket'`), f-scores being integers. If `router`
+    is set, the path search is replaced by a bidirectional search on the
+    maze graph (see `router.MazeRouter`). If `nexthops` is set, it is
+    replaced by a lookup in the next-hop table of the layout (see
+    `layout.NextHopTable`).
+    """
+
+    def __init__(self, index, queue='heap', router=False, nexthops=False):
         super().__init__(index)
+        self.queue = queue
+        self.router = router
+        self.nexthops = nexthops
+        self.maze = None
         self.fscore = None
         self.gscore = None
         self.wasScared = False
@@ -157,7 +177,7 @@ class SmartyGhost(GhostAgent):
         self.gghost = GreedyGhost(index)
 
     def _pathsearch(self, state, fscore_in, gscore_in, goal):
-        fringe = PriorityQueue()
+        fringe = QUEUES[self.queue]()
         closed = np.full(
             (state.data.layout.width,
              state.data.layout.height),
@@ -224,6 +244,30 @@ class SmartyGhost(GhostAgent):
                     fscore[succghostpos])
         return actions[0], fscore, gscore
 
+    def _route(self, state, goal):
+        if self.maze is None:
+            self.maze = MazeRouter(state.getWalls())
+        legal = state.getLegalActions(self.index)
+        action, _ = self.maze.route(
+            state.getGhostPosition(self.index), goal, legal)
+        return action if action in legal else legal[0]
+
+    def _nextHop(self, state, goal):
+        table = state.data.layout.getNextHops()
+        legal = state.getLegalActions(self.index)
+        pos = state.getGhostPosition(self.index)
+        action = table.getAction(pos, goal)
+        if action in legal:
+            return action
+        # Ghosts cannot turn back: prefer a move which is not immediately
+        # routed back to the current cell
+        for action in legal:
+            succ = Actions.getSuccessor(pos, action)
+            if table.getAction(succ, goal) != \
+                    Actions.reverseDirection(action):
+                return action
+        return legal[0]
+
     def getDistribution(self, state):
         if self.corners is None:
             self.corners = [
@@ -249,7 +293,11 @@ class SmartyGhost(GhostAgent):
                                                  ghostpos),
                                self.corners)))
         ]
-        if not isScared:
+        if not isScared and self.nexthops:
+            dist[self._nextHop(state, goal)] = 1
+        elif not isScared and self.router:
+            dist[self._route(state, goal)] = 1
+        elif not isScared:
             a, self.fscore, self.gscore = self._pathsearch(
                 state, self.fscore, self.gscore, goal)
             dist[a] = 1
@@ -13,12 +13,18 @@
 
 
 from .util import manhattanDistance
-from .game import Grid
+from .game import Actions, Directions, Grid
+import collections
+import hashlib
+import numpy as np
 import os
 import random
+import tempfile
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
+NEXT_HOP_CACHE = {}
+NEXT_HOP_DIRECTORY = os.path.join(tempfile.gettempdir(), 'pacman_next_hops')
 
 
 class Layout:
@@ -75,6 +81,14 @@ class Layout:
             self.visibility = VISIBILITY_MATRIX_CACHE[reduce(
                 str.__add__, self.layoutText)]
 
+    def getNextHops(self):
+        """
+        Returns the all-pairs next-hop table of the maze (see NextHopTable).
+        """
+        if getattr(self, 'nextHops', None) is None:
+            self.nextHops = getNextHops(self.walls)
+        return self.nextHops
+
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
@@ -158,6 +172,152 @@ class Layout:
             self.numGhosts += 1
 
 
+class NextHopTable:
+    """
+    All-pairs next-hop table of a maze.
+
+    Free cells are numbered column by column and hops[source, target] is
+    the index in NextHopTable.ACTIONS of the first move of a shortest path
+    from source to target, STAY if both are the same cell and NONE if
+    target cannot be reached. The table is a uint8 array, usually memory
+    mapped from the disk cache (see getNextHops).
+
+    Mazes of more than LAZY free cells would need a table of more than
+    LAZY ** 2 bytes (16 MiB): the column of a target is then only computed
+    by a breadth-first search when first looked up, and the last COLUMNS
+    columns looked up are kept (least recently used first evicted), hops
+    being None.
+    """
+    ACTIONS = [
+        Directions.NORTH,
+        Directions.SOUTH,
+        Directions.EAST,
+        Directions.WEST,
+        Directions.STOP,
+    ]
+    STAY = 4
+    NONE = 255
+    LAZY = 4096
+    COLUMNS = 256
+
+    def __init__(self, walls, hops=None):
+        self.index = np.full((walls.width, walls.height), -1, dtype=np.int32)
+        cells = walls.asList(False)
+        for i, (x, y) in enumerate(cells):
+            self.index[x, y] = i
+        self.neighbors = self.link(walls, cells)
+        self.columns = collections.OrderedDict()
+        if hops is not None:
+            self.hops = hops
+        elif len(cells) > self.LAZY:
+            self.hops = None
+        else:
+            self.hops = self.build()
+
+    def link(self, walls, cells):
+        """
+        Returns the (action index, neighbor) pairs of each free cell.
+        """
+        neighbors = []
+        for x, y in cells:
+            row = []
+            for k, action in enumerate(self.ACTIONS[:4]):
+                dx, dy = Actions.directionToVector(action)
+                nx, ny = x + int(dx), y + int(dy)
+                if 0 <= nx < walls.width and 0 <= ny < walls.height \
+                        and self.index[nx, ny] >= 0:
+                    row.append((k, int(self.index[nx, ny])))
+            neighbors.append(row)
+        return neighbors
+
+    def column(self, target):
+        """
+        Returns the first moves from every cell towards a target cell, by a
+        breadth-first search from the target.
+        """
+        # Index of the reverse of each action
+        reverse = [1, 0, 3, 2]
+
+        column = bytearray([self.NONE]) * len(self.neighbors)
+        column[target] = self.STAY
+        fringe = [target]
+        for cell in fringe:
+            for k, neighbor in self.neighbors[cell]:
+                if column[neighbor] == self.NONE:
+                    # From the neighbor, move back towards the cell
+                    column[neighbor] = reverse[k]
+                    fringe.append(neighbor)
+        return column
+
+    def build(self):
+        """
+        Fills the table with one breadth-first search per target cell.
+        """
+        size = len(self.neighbors)
+        hops = np.full((size, size), self.NONE, dtype=np.uint8)
+        for target in range(size):
+            hops[:, target] = np.frombuffer(
+                self.column(target), dtype=np.uint8)
+        return hops
+
+    def getAction(self, source, target):
+        """
+        Returns the first move of a shortest path between two (x, y)
+        positions, Directions.STOP if they are the same cell, or None if
+        there is no such path.
+        """
+        s = self.index[int(source[0]), int(source[1])]
+        t = self.index[int(target[0]), int(target[1])]
+        if s < 0 or t < 0:
+            return None
+        if self.hops is not None:
+            hop = self.hops[s, t]
+        else:
+            column = self.columns.get(t)
+            if column is None:
+                if len(self.columns) >= self.COLUMNS:
+                    self.columns.popitem(last=False)
+                column = self.columns[t] = self.column(t)
+            else:
+                self.columns.move_to_end(t)
+            hop = column[s]
+        return None if hop == self.NONE else self.ACTIONS[hop]
+
+
+def getNextHops(walls):
+    """
+    Returns the next-hop table of a wall grid.
+
+    Tables are kept in memory and cached on disk in NEXT_HOP_DIRECTORY,
+    keyed by a hash of the walls, and memory mapped when loaded again.
+    Tables of large mazes, computed on demand, are only kept in memory.
+    """
+    digest = hashlib.sha256(str(walls).encode()).hexdigest()
+    if digest in NEXT_HOP_CACHE:
+        return NEXT_HOP_CACHE[digest]
+
+    path = os.path.join(NEXT_HOP_DIRECTORY, digest + '.npy')
+    try:
+        table = NextHopTable(walls, np.load(path, mmap_mode='r'))
+    except (OSError, ValueError):
+        table = NextHopTable(walls)
+        try:
+            if table.hops is not None:
+                os.makedirs(NEXT_HOP_DIRECTORY, exist_ok=True)
+                # Write atomically so that concurrent games never read a
+                # partial file
+                fd, temp = tempfile.mkstemp(
+                    dir=NEXT_HOP_DIRECTORY, suffix='.npy')
+                with os.fdopen(fd, 'wb') as f:
+                    np.save(f, table.hops)
+                os.replace(temp, path)
+        except OSError:
+            pass  # The disk cache is optional
+
+    NEXT_HOP_CACHE[digest] = table
+    return table
+
+
 def getLayout(name, back=2):
     if name.endswith('.lay'):
         layout = tryToLoad('pacman_module/layouts/' + name)
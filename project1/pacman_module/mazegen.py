@@ -0,0 +1,358 @@
+"""
+Seeded generator of connected maze layouts, with a command line interface.
+
+Free cells are either room cells, which belong to a 2x2 square of free
+cells, or corridor cells (see `rooms`). A maze is built in three steps,
+none of which can disconnect the free cells:
+
+ 1. a perfect maze (a spanning tree of corridors) is carved by a
+    randomized depth-first search on the cells of odd coordinates;
+ 2. rectangular rooms are opened until the room cells reach
+    `1 - corridors` of the free cells the maze will have, both targets
+    being fixed from `walls` and `corridors` beforehand;
+ 3. walls adjacent to free cells are knocked down until the interior wall
+    density drops to `walls`, skipping the walls that would open a 2x2
+    square and so turn corridor cells into room cells.
+
+Pacman, ghosts, capsules and pellets are then placed on distinct free
+cells. The measured wall density and corridor ratio are checked against
+the requested ones (see `generate`), so that both can be set
+independently within the reachable range. The perfect maze is only
+carved in part for dense mazes, and corridors alone cannot leave less
+than about 0.25 of walls (the corners of the cells of odd coordinates),
+so that sparse mazes need rooms.
+
+Usage (from a project directory):
+
+    python -m pacman_module.mazegen --sizes 10x10 100x100 500x500 \\
+        --seeds 0 1 2 --output pacman_module/layouts/generated
+
+Layouts are then played with e.g. `--layout generated/maze_100x100_s0`.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+
+
+def generate(width, height, walls=0.35, corridors=0.8, pellets=10,
+             ghosts=1, capsules=0, seed=0, tolerance=0.05):
+    """
+    Returns a connected maze layout as a list of text rows, the first row
+    being the top of the maze.
+
+    Arguments:
+        width, height: The dimensions of the maze, walls included.
+        walls: The target density of walls inside the border.
+        corridors: The target fraction of free cells in corridors rather
+            than rooms.
+        pellets, ghosts, capsules: The numbers of pellets, ghosts and
+            capsules.
+        seed: The seed of the random number generator.
+        tolerance: The maximum difference between the measured wall
+            density and corridor ratio (see `describe`) and the targets.
+
+    Raises:
+        ValueError: If the maze is too small for its items, or the targets
+            cannot be reached within `tolerance`.
+    """
+    if width < 5 or height < 5:
+        raise ValueError('Mazes must be at least 5x5')
+
+    rng = random.Random(seed)
+    grid = [['%'] * width for _ in range(height)]
+
+    def inside(x, y):
+        return 0 < x < width - 1 and 0 < y < height - 1
+
+    # Targets, fixed from the size of the maze
+    interior = (width - 2) * (height - 2)
+    target_free = round((1 - walls) * interior)
+    target_rooms = round((1 - corridors) * target_free)
+    slack = tolerance * target_free / 2
+
+    # 1. Perfect maze on the odd cells, leaving the free cells that rooms
+    # open (about half of their cells) to them
+    start = (1, 1)
+    grid[1][1] = ' '
+    carved = 1
+    stack = [start]
+    while stack and carved < target_free - target_rooms / 2:
+        x, y = stack[-1]
+        moves = [
+            (dx, dy) for dx, dy in ((0, 2), (0, -2), (2, 0), (-2, 0))
+            if inside(x + dx, y + dy) and grid[y + dy][x + dx] == '%'
+        ]
+        if not moves:
+            stack.pop()
+            continue
+        dx, dy = rng.choice(moves)
+        grid[y + dy // 2][x + dx // 2] = ' '
+        grid[y + dy][x + dx] = ' '
+        carved += 2
+        stack.append((x + dx, y + dy))
+
+    free = {
+        (x, y) for y in range(height) for x in range(width)
+        if grid[y][x] == ' '
+    }
+
+    def squares(cells):
+        """Yields the lower left corners of the 2x2 squares containing
+        some of the cells."""
+        for x, y in cells:
+            for cx in (x - 1, x):
+                for cy in (y - 1, y):
+                    yield cx, cy
+
+    def opened(corner):
+        """Whether the 2x2 square of a lower left corner is free."""
+        cx, cy = corner
+        return all((cx + dx, cy + dy) in free
+                   for dx in (0, 1) for dy in (0, 1))
+
+    # 2. Rooms overlapping the maze, which they cannot disconnect. Rooms
+    # overshooting the targets are not opened.
+    room = set()
+    attempts = 0
+    while len(room) < target_rooms and attempts < interior:
+        attempts += 1
+        w = rng.randint(2, max(2, min(8, (width - 2) // 3)))
+        h = rng.randint(2, max(2, min(8, (height - 2) // 3)))
+        x0 = rng.randint(1, max(1, width - 1 - w))
+        y0 = rng.randint(1, max(1, height - 1 - h))
+        rect = [
+            (x, y) for y in range(y0, min(y0 + h, height - 1))
+            for x in range(x0, min(x0 + w, width - 1))
+        ]
+        cells = [cell for cell in rect if cell not in free]
+        if len(cells) == len(rect) \
+                or len(free) + len(cells) > target_free:
+            continue
+
+        free.update(cells)
+        new = {
+            (cx + dx, cy + dy)
+            for cx, cy in set(squares(cells)) if opened((cx, cy))
+            for dx in (0, 1) for dy in (0, 1)
+        } - room
+        if len(room) + len(new) > target_rooms + slack:
+            free.difference_update(cells)
+            continue
+
+        room |= new
+        for x, y in cells:
+            grid[y][x] = ' '
+
+    # 3. Knock down walls next to free cells, as long as no room cell is
+    # made
+    candidates = [
+        (x, y) for y in range(1, height - 1) for x in range(1, width - 1)
+        if grid[y][x] == '%'
+    ]
+    rng.shuffle(candidates)
+    knocked = True
+    while knocked and len(free) < target_free:
+        knocked = False
+        walled = []
+        for x, y in candidates:
+            if len(free) >= target_free:
+                break
+            if not any((x + dx, y + dy) in free
+                       for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0))):
+                walled.append((x, y))
+                continue
+            free.add((x, y))
+            if any(opened(corner) for corner in squares([(x, y)])):
+                free.discard((x, y))
+            else:
+                grid[y][x] = ' '
+                knocked = True
+        # Walls away from free cells may be next to knocked ones by now
+        candidates = walled
+
+    # Agents and items on distinct free cells
+    cells = sorted(free)
+    total = 1 + ghosts + capsules + pellets
+    if total > len(cells):
+        raise ValueError(f'{total} items do not fit in {len(cells)} cells')
+    chosen = rng.sample(cells, total)
+    symbols = ['P'] + ['G'] * ghosts + ['o'] * capsules + ['.'] * pellets
+    for (x, y), symbol in zip(chosen, symbols):
+        grid[y][x] = symbol
+
+    # Rows are listed from the top of the maze
+    rows = [''.join(row) for row in reversed(grid)]
+
+    stats = describe(rows)
+    if abs(stats['wall_density'] - walls) > tolerance \
+            or abs(stats['corridor_ratio'] - corridors) > tolerance:
+        raise ValueError(
+            f"Wall density {stats['wall_density']} and corridor ratio "
+            f"{stats['corridor_ratio']} are not within {tolerance} of "
+            f"the targets {walls} and {corridors}"
+        )
+
+    return rows
+
+
+def rooms(rows):
+    """
+    Returns the set of the (column, row) room cells of a layout given as
+    text rows, i.e. the free cells belonging to a 2x2 square of free cells.
+    The other free cells are corridor cells.
+    """
+    room = set()
+    for y in range(len(rows) - 1):
+        for x in range(len(rows[0]) - 1):
+            square = [(x, y), (x + 1, y), (x, y + 1), (x + 1, y + 1)]
+            if all(rows[cy][cx] != '%' for cx, cy in square):
+                room.update(square)
+    return room
+
+
+def describe(rows):
+    """
+    Returns the statistics of a layout given as text rows. Corridor cells
+    are the free cells which are not room cells (see `rooms`).
+    """
+    height, width = len(rows), len(rows[0])
+    text = ''.join(row[1:-1] for row in rows[1:-1])
+    interior = (width - 2) * (height - 2)
+    free = interior - text.count('%')
+    corridor = free - len(rooms(rows))
+    return {
+        'width': width,
+        'height': height,
+        'free_cells': free,
+        'wall_density': round(text.count('%') / interior, 4),
+        'corridor_ratio': round(corridor / free, 4),
+        'pellets': text.count('.'),
+        'ghosts': text.count('G'),
+        'capsules': text.count('o'),
+        'sha256': hashlib.sha256('\n'.join(rows).encode()).hexdigest(),
+    }
+
+
+def write(directory, name, rows, parameters):
+    """
+    Writes a layout and records it in the manifest of the directory.
+
+    Arguments:
+        directory: The output directory.
+        name: The layout name, without extension.
+        rows: The text rows of the layout.
+        parameters: The generation parameters.
+
+    Returns:
+        The manifest entry of the layout.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name + '.lay'), 'w') as f:
+        f.write('\n'.join(rows) + '\n')
+
+    path = os.path.join(directory, 'manifest.json')
+    manifest = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+
+    entry = dict(describe(rows), file=name + '.lay', parameters=parameters)
+    manifest[name] = entry
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    return entry
+
+
+def size(text):
+    """
+    Parses a `WxH` size.
+    """
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Generate connected maze layouts.')
+
+    parser.add_argument(
+        '--sizes',
+        type=size,
+        nargs='+',
+        default=[(10, 10), (50, 50), (100, 100), (250, 250), (500, 500)],
+        help='Maze sizes as WxH, walls included.',
+    )
+    parser.add_argument(
+        '--seeds',
+        type=int,
+        nargs='+',
+        default=[0],
+        help='Seeds, one layout per size and seed.',
+    )
+    parser.add_argument(
+        '--walls',
+        type=float,
+        default=0.35,
+        help='Target density of walls inside the border.',
+    )
+    parser.add_argument(
+        '--corridors',
+        type=float,
+        default=0.8,
+        help='Target fraction of free cells in corridors (vs rooms).',
+    )
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=0.05,
+        help='Maximum difference between the measured and target wall '
+             'density and corridor ratio.',
+    )
+    parser.add_argument(
+        '--pellets',
+        type=int,
+        default=10,
+        help='Number of pellets.',
+    )
+    parser.add_argument(
+        '--ghosts',
+        type=int,
+        default=1,
+        help='Number of ghosts.',
+    )
+    parser.add_argument(
+        '--capsules',
+        type=int,
+        default=0,
+        help='Number of capsules.',
+    )
+    parser.add_argument(
+        '--output',
+        default=os.path.join('pacman_module', 'layouts', 'generated'),
+        help='Output directory of the layouts and their manifest.',
+    )
+
+    args = parser.parse_args()
+
+    for width, height in args.sizes:
+        for seed in args.seeds:
+            parameters = {
+                'walls': args.walls,
+                'corridors': args.corridors,
+                'pellets': args.pellets,
+                'ghosts': args.ghosts,
+                'capsules': args.capsules,
+                'seed': seed,
+                'tolerance': args.tolerance,
+            }
+            rows = generate(width, height, **parameters)
+            name = f'maze_{width}x{height}_s{seed}'
+            entry = write(args.output, name, rows, parameters)
+            print(f"{os.path.join(args.output, entry['file'])}: "
+                  f"{entry['free_cells']} free cells, "
+                  f"wall density {entry['wall_density']}, "
+                  f"corridor ratio {entry['corridor_ratio']}")
@@ -47,7 +47,9 @@ from .util import nearestPoint
 from .util import manhattanDistance
 from . import textDisplay, graphicsDisplay
 from . import util, layout
+import collections
 import sys
+import threading
 import types
 import time
 import random
@@ -85,12 +87,27 @@ class GameState:
     # /!\ Otherwise, your project won't be graded
     countExpanded=0
     maximumExpanded = np.inf
+    # Number of successors served by the successor cache, and the cache
+    countCached = 0
+    successorCache = None
     def resetNodeExpansionCounter():
         GameState.countExpanded=0
+        GameState.countCached=0
 
     def setMaximumExpanded(m):
         GameState.maximumExpanded = m
 
+    def enableSuccessorCache(maxEntries=2 ** 16, maxBytes=None):
+        """
+        Shares the successors of equal states through a new SuccessorCache of at most maxEntries entries
+        and maxBytes bytes (None for no bound), and returns it.
+        """
+        GameState.successorCache = SuccessorCache(maxEntries, maxBytes)
+        return GameState.successorCache
+
+    def disableSuccessorCache():
+        GameState.successorCache = None
+
     def getAndResetExplored():
         tmp = GameState.explored.copy()
         GameState.explored = set()
@@ -134,6 +151,22 @@ class GameState:
         if self.isWin() or self.isLose():
             raise Exception('Can\'t generate a successor of a terminal state.')
 
+        # Successors of equal states are shared through the cache, if any
+        cache = GameState.successorCache
+        key = None
+        if cache is not None and (agentIndex == 0 or self.data.agentStates[agentIndex].agtType > 0):
+            key = (self._stateKey(), agentIndex, action)
+            entry = cache.get(key)
+            if entry is not None:
+                GameState.countCached += 1
+                state = GameState.__new__(GameState)
+                state.data, state._key = entry
+                state._expanded = False
+                state.fromCache = True
+                GameState.explored.add(self)
+                GameState.explored.add(state)
+                return state
+
         # Copy current state
         state = GameState(self)
 
@@ -158,6 +191,9 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
+        if key is not None:
+            state._key = state._successorKey(self._key)
+            cache.put(key, state.data, state._key)
         GameState.explored.add(self)
         GameState.explored.add(state)
         return state
@@ -178,6 +214,7 @@ class GameState:
         if (GameState.countExpanded >= GameState.maximumExpanded):
             raise Exception("Too many expanded nodes")
         GameState.countExpanded += 1
+        self._expanded = True
         return [(self.generateSuccessor(0, action),action) for action in self.getLegalPacmanActions() if action != Directions.STOP]
 
     def generateGhostSuccessors(self,index):
@@ -190,8 +227,58 @@ class GameState:
         elif (GameState.countExpanded >= GameState.maximumExpanded):
             raise Exception("Too many expanded nodes")
         GameState.countExpanded += 1
+        self._expanded = True
         return [(self.generateSuccessor(index, action),action) for action in self.getLegalActions(index) if action != Directions.STOP]
 
+    def iterPacmanSuccessors(self):
+        """
+        Yields the pairs of successor states and moves given the current state s for the pacman agent, each
+        successor being generated only when the iteration reaches it. The state counts as one expanded node
+        when its first successor is generated (see expandPacmanSuccessor).
+        """
+        for action in self.getLegalPacmanActions():
+            if action != Directions.STOP:
+                yield self.expandPacmanSuccessor(action), action
+
+    def iterGhostSuccessors(self, index):
+        """
+        Yields the pairs of successor states and moves given the current state s for the ghost agent (>0), each
+        successor being generated only when the iteration reaches it. The state counts as one expanded node
+        when its first successor is generated (see expandGhostSuccessor).
+        """
+        for action in self.getLegalActions(index):
+            if action != Directions.STOP:
+                yield self.expandGhostSuccessor(index, action), action
+
+    def expandPacmanSuccessor(self, action):
+        """
+        Generates the successor state after the specified pacman move. Unlike generatePacmanSuccessor, the
+        current state counts as one expanded node, the first time one of its successors is generated by
+        the expand/iter methods, however many are generated.
+        """
+        self._expand()
+        return self.generateSuccessor(0, action)
+
+    def expandGhostSuccessor(self, index, action):
+        """
+        Generates the successor state after the specified move of the ghost agent (>0), counting the current
+        state as one expanded node like expandPacmanSuccessor.
+        """
+        if index == 0:
+            raise Exception("Invalid index passed to expandGhostSuccessor")
+        self._expand()
+        return self.generateSuccessor(index, action)
+
+    def _expand(self):
+        """
+        Counts the state as expanded, once, within the node expansion budget.
+        """
+        if not self._expanded:
+            if (GameState.countExpanded >= GameState.maximumExpanded):
+                raise Exception("Too many expanded nodes")
+            GameState.countExpanded += 1
+            self._expanded = True
+
     def getPacmanState(self):
         """
         Returns an AgentState object for pacman (in game.py)
@@ -304,6 +391,40 @@ class GameState:
             self.data = GameStateData(prevState.data)
         else:
             self.data = GameStateData()
+        # Whether the successors of the state were already counted
+        self._expanded = False
+        # Key of the state in the successor cache, and whether the state was
+        # served by the cache (sharing its data with other states)
+        self._key = None
+        self.fromCache = False
+
+    def _stateKey(self):
+        """
+        Returns the key of the state in the successor cache: the configurations and scared timers of the
+        agents, the food left, the capsules, the score and the text of the layout (layouts being copied with
+        the states), computed once per state.
+        """
+        if self._key is None:
+            data = self.data
+            self._key = (self._agentsKey(), frozenset(data.food.asList()), tuple(data.capsules), data.score,
+                         tuple(data.layout.layoutText))
+        return self._key
+
+    def _successorKey(self, parentKey):
+        """
+        Returns the key of a successor, the food left being derived from the key of its parent.
+        """
+        data = self.data
+        food = parentKey[1]
+        if data._foodEaten is not None:
+            food = food - {data._foodEaten}
+        return (self._agentsKey(), food, tuple(data.capsules), data.score, parentKey[4])
+
+    def _agentsKey(self):
+        return tuple(
+            None if agentState.configuration is None
+            else (agentState.configuration.pos, agentState.configuration.direction, agentState.scaredTimer)
+            for agentState in self.data.agentStates)
 
     def deepCopy(self):
         state = GameState(self)
@@ -344,6 +465,82 @@ COLLISION_TOLERANCE = 0.7  # How close ghosts must be to Pacman to kill
 TIME_PENALTY = 1  # Number of points lost each round
 
 
+class SuccessorCache:
+    """
+    Successor states shared between equal states (see GameState.enableSuccessorCache).
+
+    Entries are keyed by the key of the parent state (see GameState._stateKey), the agent index and the
+    action, and hold the GameStateData of the successor, which a hit shares instead of copying. The cache
+    is bounded by a number of entries and an approximate number of bytes (the food grids shared between
+    states are only counted when they were copied), the least recently used entries being evicted first.
+
+    The cache is shared by all the states, thus by the agents and their threads (e.g. the ghost agents or a
+    pondering search), and is guarded by a lock.
+    """
+
+    def __init__(self, maxEntries=2 ** 16, maxBytes=None):
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Returns the data and key of the cached successor, or None.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def put(self, key, data, stateKey):
+        """
+        Stores a successor, evicting the least recently used ones beyond the bounds.
+        """
+        size = self.sizeOf(data)
+        with self.lock:
+            # Another thread may have stored the same successor since its lookup
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            self.entries[key] = (data, stateKey, size)
+            self.bytes += size
+            while self.entries and (
+                    self.maxEntries is not None and len(self.entries) > self.maxEntries
+                    or self.maxBytes is not None and self.bytes > self.maxBytes):
+                _, (_, _, size) = self.entries.popitem(last=False)
+                self.bytes -= size
+                self.evictions += 1
+
+    def hitRate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def sizeOf(data):
+        """
+        Returns the approximate size of the data of a successor, in bytes.
+        """
+        size = sys.getsizeof(data) + sys.getsizeof(data.__dict__) + sys.getsizeof(data.agentStates) \
+            + sys.getsizeof(data.capsules)
+        for agentState in data.agentStates:
+            size += sys.getsizeof(agentState) + sys.getsizeof(agentState.__dict__)
+        if data._foodEaten is not None:
+            size += sys.getsizeof(data.food.data) + sum(sys.getsizeof(column) for column in data.food.data)
+        return size
+    sizeOf = staticmethod(sizeOf)
+
+
 class ClassicGameRules:
     """
     These game rules manage the control flow of a game, deciding when
@@ -0,0 +1,180 @@
+"""
+Point-to-point routing on the maze graph.
+
+Free cells are numbered with integer ids and the adjacency of the maze is
+stored in NumPy arrays, as well as the per-query search state, so that a
+query neither builds game states nor allocates memory proportional to the
+maze size.
+"""
+
+import numpy as np
+
+from .game import Actions, Directions
+
+
+class MazeRouter:
+    """
+      Bidirectional breadth-first search between two cells of a maze.
+
+      The forward search from the source and the backward search from the
+      target are expanded one whole level at a time, the smaller frontier
+      first, until they meet. The forward search propagates the first
+      action of each path, so that no path is ever rebuilt.
+    """
+
+    ACTIONS = [
+        Directions.NORTH,
+        Directions.SOUTH,
+        Directions.EAST,
+        Directions.WEST,
+    ]
+
+    # Index of the reverse of each action
+    REVERSE = [1, 0, 3, 2]
+
+    def __init__(self, walls):
+        self.walls = walls
+
+        self.index = np.full((walls.width, walls.height), -1, dtype=np.int32)
+        cells = [
+            (x, y)
+            for x in range(walls.width)
+            for y in range(walls.height)
+            if not walls[x][y]
+        ]
+        for i, (x, y) in enumerate(cells):
+            self.index[x, y] = i
+        self.cells = np.array(cells, dtype=np.int32).reshape(-1, 2)
+
+        size = len(cells)
+        self.neighbors = np.full((size, len(self.ACTIONS)), -1, np.int32)
+        for i, (x, y) in enumerate(cells):
+            for k, action in enumerate(self.ACTIONS):
+                dx, dy = Actions.directionToVector(action)
+                nx, ny = x + int(dx), y + int(dy)
+                if 0 <= nx < walls.width and 0 <= ny < walls.height:
+                    self.neighbors[i, k] = self.index[nx, ny]
+
+        # Search state, reset in O(1) by bumping the generation
+        self.generation = 0
+        self.seen_forward = np.zeros(size, dtype=np.int32)
+        self.seen_backward = np.zeros(size, dtype=np.int32)
+        self.dist_forward = np.zeros(size, dtype=np.int32)
+        self.dist_backward = np.zeros(size, dtype=np.int32)
+        self.first = np.zeros(size, dtype=np.int8)
+
+        # Element access through memoryviews and lists is much faster than
+        # through NumPy scalars in the search loops
+        self.adjacency = self.neighbors.tolist()
+        self.views = [
+            memoryview(array) for array in (
+                self.seen_forward, self.seen_backward,
+                self.dist_forward, self.dist_backward, self.first,
+            )
+        ]
+
+    def cell(self, position):
+        """
+          Returns the id of the cell at `position`, or -1 for a wall.
+        """
+        x, y = position
+        return int(self.index[int(x), int(y)])
+
+    def route(self, source, target, actions=None):
+        """
+          Returns a (first action, distance) pair of a shortest path from
+          `source` to `target`, two (x, y) positions, or (None, None) if
+          there is no such path. The first action is Directions.STOP if
+          both positions are the same cell.
+
+          If `actions` is given, only paths starting with one of these
+          actions are considered (e.g. a ghost cannot turn back). Such
+          paths never go through the source again.
+        """
+        s = self.cell(source)
+        t = self.cell(target)
+        if s < 0 or t < 0:
+            return None, None
+        if s == t:
+            return Directions.STOP, 0
+
+        allowed = None
+        if actions is not None:
+            allowed = {
+                k for k, action in enumerate(self.ACTIONS)
+                if action in actions
+            }
+
+        self.generation += 1
+        if self.generation == np.iinfo(np.int32).max:
+            self.seen_forward.fill(0)
+            self.seen_backward.fill(0)
+            self.generation = 1
+        g = self.generation
+
+        adjacency = self.adjacency
+        seen_forward, seen_backward, dist_forward, dist_backward, first = \
+            self.views
+
+        seen_forward[s] = g
+        dist_forward[s] = 0
+        seen_backward[t] = g
+        dist_backward[t] = 0
+        forward = [s]
+        backward = [t]
+
+        best = None
+        best_action = None
+
+        while forward and backward and best is None:
+            frontier = []
+
+            if len(forward) <= len(backward):
+                for c in forward:
+                    d = dist_forward[c] + 1
+                    for k, n in enumerate(adjacency[c]):
+                        if n < 0 or seen_forward[n] == g:
+                            continue
+                        if c == s:
+                            if allowed is not None and k not in allowed:
+                                continue
+                            a = k
+                        else:
+                            a = first[c]
+                        seen_forward[n] = g
+                        dist_forward[n] = d
+                        first[n] = a
+                        if seen_backward[n] == g:
+                            total = d + dist_backward[n]
+                            if best is None or total < best:
+                                best, best_action = total, a
+                        frontier.append(n)
+                forward = frontier
+            else:
+                for c in backward:
+                    d = dist_backward[c] + 1
+                    for k, n in enumerate(adjacency[c]):
+                        if n < 0:
+                            continue
+                        if n == s:
+                            # The path starts with the move from s to c
+                            a = self.REVERSE[k]
+                            if allowed is None or a in allowed:
+                                if best is None or d < best:
+                                    best, best_action = d, a
+                            continue
+                        if seen_backward[n] == g:
+                            continue
+                        seen_backward[n] = g
+                        dist_backward[n] = d
+                        if seen_forward[n] == g:
+                            total = d + dist_forward[n]
+                            if best is None or total < best:
+                                best, best_action = total, first[n]
+                        frontier.append(n)
+                backward = frontier
+
+        if best is None:
+            return None, None
+
+        return self.ACTIONS[best_action], int(best)
@@ -3,7 +3,7 @@ import importlib
 import numpy as np
 import random
 
-from pacman_module.pacman import runGame
+from pacman_module.pacman import GameState, runGame, parseAgentArgs
 from pacman_module.ghostAgents import (
     DumbyGhost,
     GreedyGhost,
@@ -30,6 +30,13 @@ if __name__ == '__main__':
         help='Python module containing a `PacmanAgent` class.',
     )
 
+    parser.add_argument(
+        '-aa',
+        '--agentargs',
+        default=None,
+        help='Comma separated agent options, e.g. "opt1=val1,opt2=val2".',
+    )
+
     parser.add_argument(
         '-g',
         '--ghost',
@@ -59,6 +66,13 @@ if __name__ == '__main__':
         help='Seed for random number generator.',
     )
 
+    parser.add_argument(
+        '--cache',
+        type=int,
+        default=0,
+        help='Entries of the successor cache (0 to disable it).',
+    )
+
     args = parser.parse_args()
 
     if args.agent == 'humanagent' and args.nographics:
@@ -67,9 +81,15 @@ if __name__ == '__main__':
     random.seed(args.seed)
     np.random.seed(args.seed)
 
+    cache = GameState.enableSuccessorCache(args.cache) \
+        if args.cache > 0 else None
+
+    agent = importlib.import_module(args.agent).PacmanAgent(
+        **parseAgentArgs(args.agentargs))
+
     score, time, nodes = runGame(
         layout_name=args.layout,
-        pacman=importlib.import_module(args.agent).PacmanAgent(),
+        pacman=agent,
         ghosts=[GHOSTS[args.ghost](1)],
         beliefstateagent=None,
         displayGraphics=not args.nographics,
@@ -80,3 +100,13 @@ if __name__ == '__main__':
     print(f"Score: {score}")
     print(f"Computation time: {time}")
     print(f"Expanded nodes: {nodes}")
+
+    if cache is not None:
+        print(f"Successor cache hit rate: {cache.hitRate():.3f}")
+        print(f"Successor cache entries: {len(cache)}")
+        print(f"Successor cache memory: {cache.bytes / 2 ** 20:.1f} MiB")
+
+    for name, value in getattr(agent, 'stats', {}).items():
+        if isinstance(value, list) and len(value) > 10:
+            value = f"{value[:5]} ... {value[-5:]} ({len(value)} values)"
+        print(f"{name}: {value}")
@@ -0,0 +1,369 @@
+import argparse
+import collections
+import hashlib
+import heapq
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from pacman_module import layout as layouts
+from pacman_module.game import Agent, Actions, Directions
+
+import minimax
+
+
+DIRECTORY = os.path.join(tempfile.gettempdir(), 'pacman_tablebases')
+MOVES = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+HEADINGS = MOVES + [Directions.STOP]
+NONE = 255
+UNKNOWN = np.iinfo(np.int32).min
+ENTRY = np.dtype([('value', '<i4'), ('move', 'u1')])
+
+
+class UnsupportedLayout(ValueError):
+    """Raised when a layout cannot be solved into a tablebase."""
+
+
+class Tablebase:
+    """Exact values and best moves of all the positions of a layout where
+    Pacman is to move.
+
+    A position is Pacman's cell, the ghost's cell and direction (the ghost
+    cannot turn around) and the subset of the initial food left. Entries
+    are stored in a dense array indexed by these four components, the
+    value being the score still to be made under optimal play (UNKNOWN
+    when the ghost can keep the game from ever ending, or for unreachable
+    positions).
+
+    Arguments:
+        layout: The `Layout` of the game.
+        entries: The array of entries (with `ENTRY` dtype).
+    """
+
+    def __init__(self, layout, entries):
+        self.cells = {cell: i for i, cell in enumerate(free_cells(layout))}
+        self.food = {cell: i for i, cell in enumerate(layout.food.asList())}
+        self.entries = entries
+
+    def index(self, state):
+        """Returns the index of the entry of a game state."""
+        cells = len(self.cells)
+        mask = 0
+        for cell in state.getFood().asList():
+            mask |= 1 << self.food[cell]
+        gx, gy = state.getGhostPosition(1)
+        heading = HEADINGS.index(state.getGhostDirection(1))
+
+        return ((mask * cells + self.cells[state.getPacmanPosition()])
+                * cells + self.cells[(int(gx), int(gy))]) * 5 + heading
+
+    def lookup(self, state):
+        """Returns the value and best move of a game state, the value being
+        None when unknown and the move None when there is none."""
+        value, move = self.entries[self.index(state)]
+        return (
+            None if value == UNKNOWN else int(value),
+            None if move == NONE else MOVES[move],
+        )
+
+
+def free_cells(layout):
+    """Returns the free cells of a layout, in a fixed order."""
+    return sorted(layout.walls.asList(False))
+
+
+def layout_hash(layout):
+    """Returns the hash of the text of a layout."""
+    return hashlib.sha256('\n'.join(layout.layoutText).encode()).hexdigest()
+
+
+def solve(layout, max_entries=2 ** 23):
+    """Solves a layout by retrograde analysis.
+
+    The positions reachable from the initial one are enumerated, with
+    Pacman or the ghost to move. Eating food only leads to positions with
+    less food, so that the positions are solved layer by layer, by
+    increasing amount of food. Within a layer, each Pacman move costs one
+    point and the values are settled from the best down, as in Dijkstra's
+    algorithm: a Pacman position is settled by its best successor, a ghost
+    position once all its successors are settled (at their worst). The
+    positions never settled are those where the ghost can keep the game
+    from ever ending.
+
+    Moves follow the game rules, except that Pacman never stops, as in the
+    Minimax agents.
+
+    Arguments:
+        layout: The `Layout` to solve, with a single ghost and no capsule.
+        max_entries: The maximum size of the table.
+
+    Returns:
+        The array of entries of the `Tablebase`.
+    """
+
+    if layout.getNumGhosts() != 1 or layout.capsules:
+        raise UnsupportedLayout('Tablebases need one ghost and no capsule')
+
+    cells = free_cells(layout)
+    index = {cell: i for i, cell in enumerate(cells)}
+    food = {cell: i for i, cell in enumerate(layout.food.asList())}
+    size = (1 << len(food)) * len(cells) ** 2 * 5
+    if size > max_entries:
+        raise UnsupportedLayout(f'{size} entries exceed {max_entries}')
+
+    walls = layout.walls
+    neighbors = {}
+    for x, y in cells:
+        neighbors[(x, y)] = []
+        for move in MOVES:
+            dx, dy = Actions.directionToVector(move)
+            target = (x + int(dx), y + int(dy))
+            if not walls[target[0]][target[1]]:
+                neighbors[(x, y)].append((move, target))
+
+    def ghost_moves(cell, heading):
+        moves = neighbors[cell]
+        reverse = Directions.REVERSE[heading]
+        if len(moves) > 1:
+            moves = [(move, target) for move, target in moves
+                     if move != reverse]
+        return moves
+
+    (_, pacman), (_, ghost) = layout.agentPositions
+
+    # Enumerate the positions as (pacman_turn, pacman, ghost, heading, mask)
+    # with edges (move, reward, successor or None when terminal)
+    start = (True, pacman, ghost, Directions.STOP, (1 << len(food)) - 1)
+    ids = {start: 0}
+    positions = [start]
+    edges = []
+    fringe = collections.deque([0])
+    while fringe:
+        turn, p, g, heading, mask = positions[fringe.popleft()]
+        out = []
+        if turn:
+            for move, target in neighbors[p]:
+                reward, rest = -1, mask
+                bit = food.get(target)
+                if bit is not None and mask >> bit & 1:
+                    reward, rest = 9, mask & ~(1 << bit)
+                if rest == 0:
+                    out.append((move, reward + 500, None))
+                elif target == g:
+                    out.append((move, reward - 500, None))
+                else:
+                    out.append((move, reward, (False, target, g, heading,
+                                               rest)))
+        else:
+            for move, target in ghost_moves(g, heading):
+                if target == p:
+                    out.append((move, -500, None))
+                else:
+                    out.append((move, 0, (True, p, target, move, mask)))
+
+        resolved = []
+        for move, reward, successor in out:
+            if successor is not None and successor not in ids:
+                ids[successor] = len(positions)
+                positions.append(successor)
+                fringe.append(ids[successor])
+            resolved.append((
+                move, reward, None if successor is None else ids[successor]))
+        edges.append(resolved)
+
+    # Retrograde analysis, layer by layer
+    value = [None] * len(positions)
+    best = [None] * len(positions)
+    predecessors = [[] for _ in positions]
+    layers = collections.defaultdict(list)
+    for i, (_, _, _, _, mask) in enumerate(positions):
+        layers[mask].append(i)
+        for move, reward, j in edges[i]:
+            if j is not None and positions[j][4] == mask:
+                predecessors[j].append((i, reward))
+
+    for mask in sorted(layers, key=lambda mask: bin(mask).count('1')):
+        tentative = {}
+        pending = {}
+        heap = []
+        for i in layers[mask]:
+            turn = positions[i][0]
+            bound = float('-inf') if turn else float('inf')
+            for move, reward, j in edges[i]:
+                if j is None or positions[j][4] != mask:
+                    candidate = reward + (0 if j is None else value[j])
+                    if turn and candidate > bound \
+                            or not turn and candidate < bound:
+                        bound, best[i] = candidate, move
+                elif not turn:
+                    pending[i] = pending.get(i, 0) + 1
+            tentative[i] = bound
+            if (turn or not pending.get(i)) and bound > float('-inf'):
+                heapq.heappush(heap, (-bound, i))
+
+        while heap:
+            bound, i = heapq.heappop(heap)
+            if value[i] is not None:
+                continue
+            value[i] = -bound
+
+            for j, reward in predecessors[i]:
+                if value[j] is not None:
+                    continue
+                candidate = value[i] + reward
+                if positions[j][0]:
+                    if candidate > tentative[j]:
+                        tentative[j] = candidate
+                        best[j] = next(
+                            move for move, _, k in edges[j] if k == i)
+                        heapq.heappush(heap, (-candidate, j))
+                else:
+                    if candidate < tentative[j]:
+                        tentative[j] = candidate
+                        best[j] = next(
+                            move for move, _, k in edges[j] if k == i)
+                    pending[j] -= 1
+                    if pending[j] == 0 and tentative[j] > float('-inf'):
+                        heapq.heappush(heap, (-tentative[j], j))
+
+        # Never settled: the ghost keeps the game going forever
+        for i in layers[mask]:
+            if value[i] is None:
+                value[i] = float('-inf')
+
+    entries = np.zeros(size, dtype=ENTRY)
+    entries['value'] = UNKNOWN
+    entries['move'] = NONE
+    for i, (turn, p, g, heading, mask) in enumerate(positions):
+        if not turn:
+            continue
+        k = ((mask * len(cells) + index[p]) * len(cells) + index[g]) * 5 \
+            + HEADINGS.index(heading)
+        if value[i] > float('-inf'):
+            entries[k] = (value[i], MOVES.index(best[i]))
+        elif edges[i]:
+            entries[k] = (UNKNOWN, MOVES.index(edges[i][0][0]))
+
+    return entries
+
+
+def getTablebase(layout, directory=DIRECTORY, max_entries=2 ** 23):
+    """Returns the tablebase of a layout, solved or memory mapped from
+    `directory`, where tablebases are stored keyed by the hash of their
+    layout."""
+
+    path = os.path.join(directory, layout_hash(layout) + '.npy')
+    try:
+        entries = np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        entries = solve(layout, max_entries)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # Write atomically so that concurrent games never read a
+            # partial file
+            fd, temp = tempfile.mkstemp(dir=directory, suffix='.npy')
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, entries)
+            os.replace(temp, path)
+        except OSError:
+            pass  # The disk cache is optional
+
+    return Tablebase(layout, entries)
+
+
+class PacmanAgent(Agent):
+    """Pacman agent playing perfectly from a tablebase.
+
+    The tablebase of the layout (see `solve`) is loaded or solved before
+    the first move, then each move is a single lookup. Layouts that cannot
+    be solved (more than one ghost, capsules or too many positions) are
+    played by the Minimax agent instead.
+
+    Arguments:
+        directory: The directory of the stored tablebases.
+        max_entries: The maximum size of a tablebase.
+    """
+
+    def __init__(self, directory=DIRECTORY, max_entries=2 ** 23):
+        super().__init__()
+
+        self.directory = directory
+        self.max_entries = int(max_entries)
+        self.tablebase = None
+        self.fallback = None
+        self.stats = {}
+
+    def get_action(self, state):
+        """Given a Pacman game state, returns a legal move.
+
+        Arguments:
+            state: a game state. See API or class `pacman.GameState`.
+
+        Return:
+            A legal move as defined in `game.Directions`.
+        """
+
+        if self.tablebase is None and self.fallback is None:
+            start = time.perf_counter()
+            try:
+                self.tablebase = getTablebase(
+                    state.data.layout, self.directory, self.max_entries)
+            except UnsupportedLayout as e:
+                self.fallback = minimax.PacmanAgent()
+                self.stats["Tablebase"] = f"unsupported ({e})"
+            else:
+                value, _ = self.tablebase.lookup(state)
+                self.stats.update({
+                    "Tablebase entries": len(self.tablebase.entries),
+                    "Tablebase load time": time.perf_counter() - start,
+                    "Tablebase value": value,
+                })
+
+        if self.fallback is not None:
+            return self.fallback.get_action(state)
+
+        _, move = self.tablebase.lookup(state)
+
+        return move if move is not None else Directions.STOP
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Solve layouts into tablebases.')
+
+    parser.add_argument(
+        'layouts',
+        nargs='+',
+        help='Maze layouts from the `layouts` directory.',
+    )
+    parser.add_argument(
+        '--directory',
+        default=DIRECTORY,
+        help='Directory of the stored tablebases.',
+    )
+    parser.add_argument(
+        '--max-entries',
+        type=int,
+        default=2 ** 23,
+        help='Maximum size of a tablebase.',
+    )
+
+    args = parser.parse_args()
+
+    for name in args.layouts:
+        layout = layouts.getLayout(name)
+        start = time.perf_counter()
+        try:
+            tablebase = getTablebase(layout, args.directory, args.max_entries)
+        except UnsupportedLayout as e:
+            print(f"{name}: {e}")
+            continue
+
+        values = tablebase.entries['value']
+        print(
+            f"{name}: {len(values)} entries, "
+            f"{np.count_nonzero(values != UNKNOWN)} solved, "
+            f"{time.perf_counter() - start:.2f} s"
+        )
@@ -0,0 +1,143 @@
+import collections
+import random
+
+from pacman_module.game import Directions
+
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+Entry = collections.namedtuple(
+    'Entry', ['depth', 'value', 'bound', 'move', 'generation'])
+
+
+class Zobrist:
+    """Zobrist hashing of Pacman game states.
+
+    The key of a state is the XOR of a random 64-bit code for the cell of
+    Pacman, for the cell and direction of the ghost (which cannot turn
+    around), for each cell holding food and for the turn (set when the
+    ghost is to move). Keys of successors are
+    derived incrementally from the keys of their parents. Scores, capsules
+    and scared timers are not hashed.
+
+    Arguments:
+        width, height: The dimensions of the maze.
+        seed: The seed of the random codes.
+    """
+
+    def __init__(self, width, height, seed=0):
+        rng = random.Random(seed)
+
+        def codes():
+            return [
+                [rng.getrandbits(64) for _ in range(height)]
+                for _ in range(width)
+            ]
+
+        self.pacman = codes()
+        self.ghost = {
+            direction: codes()
+            for direction in (Directions.NORTH, Directions.SOUTH,
+                              Directions.EAST, Directions.WEST,
+                              Directions.STOP)
+        }
+        self.food = codes()
+        self.turn = rng.getrandbits(64)
+
+    def key(self, state, is_pacman_turn=True):
+        """Returns the key of a state, computed from scratch."""
+        x, y = state.getPacmanPosition()
+        key = self.pacman[x][y] ^ self.ghost_code(state)
+        for fx, fy in state.getFood().asList():
+            key ^= self.food[fx][fy]
+        if not is_pacman_turn:
+            key ^= self.turn
+
+        return key
+
+    def pacman_move(self, key, state, successor):
+        """Returns the key of the successor of a state by a Pacman move."""
+        x, y = state.getPacmanPosition()
+        nx, ny = successor.getPacmanPosition()
+        key ^= self.pacman[x][y] ^ self.pacman[nx][ny] ^ self.turn
+        if state.hasFood(nx, ny):
+            key ^= self.food[nx][ny]
+
+        return key
+
+    def ghost_move(self, key, state, successor):
+        """Returns the key of the successor of a state by a ghost move."""
+        return key ^ self.ghost_code(state) ^ self.ghost_code(successor) \
+            ^ self.turn
+
+    def ghost_code(self, state):
+        """Returns the code of the cell and direction of the ghost."""
+        x, y = state.getGhostPosition(1)
+        return self.ghost[state.getGhostDirection(1)][int(x)][int(y)]
+
+
+class TranspositionTable:
+    """Bounded transposition table, persisting across moves.
+
+    Each entry stores the depth searched below its state, its value, the
+    type of bound of the value (`EXACT`, `LOWER` or `UPPER`) and the best
+    move. An entry is only replaced by a search at least as deep
+    (depth-preferred), unless it dates from a previous move. When the table
+    is full, the least recently used entry is evicted. Each entry takes
+    about 200 bytes.
+
+    Arguments:
+        size: The maximum number of entries.
+    """
+
+    def __init__(self, size=2 ** 16):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def new_move(self, advance=True):
+        """Starts a new move, entries of older moves becoming replaceable
+        by shallower searches, and resets the hit statistics. Without
+        `advance`, the move was already started and only the statistics
+        are reset."""
+        if advance:
+            self.generation += 1
+        self.probes = 0
+        self.hits = 0
+
+    def lookup(self, key):
+        """Returns the entry of a key, or None."""
+        self.probes += 1
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+        return entry
+
+    def store(self, key, depth, value, bound, move):
+        """Stores an entry, following the replacement policy."""
+        if self.size <= 0:
+            return
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            if depth < entry.depth and entry.generation == self.generation:
+                return
+            self.entries.move_to_end(key)
+        elif len(self.entries) >= self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+        self.entries[key] = Entry(depth, value, bound, move, self.generation)
+
+    def hit_rate(self):
+        """Returns the proportion of lookups of the current move that found
+        an entry."""
+        return self.hits / self.probes if self.probes else 0.0
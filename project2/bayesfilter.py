@@ -2,7 +2,9 @@ import numpy as np
 import math
 
 from pacman_module.game import Agent, Directions, manhattanDistance
-from pacman_module.util import PriorityQueue
+from pacman_module.layout import getNextHops
+from pacman_module.router import MazeRouter
+from pacman_module.util import BucketQueue, PriorityQueue
 
 
 DIRECTION_MAPPING = {
@@ -12,6 +14,11 @@ DIRECTION_MAPPING = {
                 (-1, 0): Directions.WEST,
                 }
 
+QUEUES = {
+    'heap': PriorityQueue,
+    'bucket': BucketQueue,
+}
+
 
 class BeliefStateAgent(Agent):
     """Belief state agent.
@@ -250,11 +257,27 @@ class BeliefStateAgent(Agent):
 
 
 class PacmanAgent(Agent):
-    """Pacman agent that tries to eat ghosts given belief states."""
+    """Pacman agent that tries to eat ghosts given belief states.
+
+    Arguments:
+        queue: The open list of the chase A*, either a binary heap
+            (`'heap'`) or a bucket queue (`'bucket'`).
+        router: Whether to replace the chase A* by a bidirectional search
+            on the maze graph (see `router.MazeRouter`).
+        nexthops: Whether to replace the chase A* by a lookup in the
+            next-hop table of the maze (see `layout.NextHopTable`).
+    """
 
-    def __init__(self):
+    def __init__(self, queue='heap', router=False, nexthops=False):
         super().__init__()
 
+        self.queue = queue
+        self.router = router
+        self.nexthops = nexthops
+        self.maze = None
+        self.table = None
+        self.walls = None
+
     def get_legal_moves(self, position, walls):
         """
         Compute the legal moves for Pacman given the walls.
@@ -314,7 +337,7 @@ class PacmanAgent(Agent):
                 return successors
 
             # A* algorithm
-            fringe = PriorityQueue()
+            fringe = QUEUES[self.queue]()
             closed = set()
             path = []
             g = f = 0
@@ -356,6 +379,21 @@ class PacmanAgent(Agent):
             likely_positions.append(ghost_position)
 
         sorted_likely_positions = sorted(likely_positions, key=ghost_sorting)
+
+        if self.nexthops:
+            if self.table is None or self.walls is not walls:
+                self.table = getNextHops(walls)
+                self.walls = walls
+            action = self.table.getAction(
+                position, sorted_likely_positions[0])
+            return action if action is not None else Directions.STOP
+
+        if self.router:
+            if self.maze is None or self.maze.walls is not walls:
+                self.maze = MazeRouter(walls)
+            action, _ = self.maze.route(position, sorted_likely_positions[0])
+            return action if action is not None else Directions.STOP
+
         return astar(walls, position, sorted_likely_positions[0])
 
     def get_action(self, state):
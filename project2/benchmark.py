@@ -0,0 +1,93 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from pacman_module import layout
+
+import bayesfilter
+
+
+MODES = {
+    'astar (heap)': {'queue': 'heap'},
+    'astar (bucket)': {'queue': 'bucket'},
+    'router': {'router': True},
+    'next-hop table': {'nexthops': True},
+}
+
+
+def benchmark_router(args):
+    """Compares the chase routing latency of A*, of the bidirectional
+    router and of the next-hop table."""
+
+    rng = random.Random(args.seed)
+
+    print("Chase routing latency (microseconds per query)")
+    for name in args.layouts:
+        walls = layout.getLayout(name).walls
+        cells = walls.asList(False)
+        queries = [
+            (rng.choice(cells), rng.choice(cells))
+            for _ in range(args.queries)
+        ]
+
+        beliefs = []
+        for _, ghost in queries:
+            belief = np.zeros((walls.width, walls.height))
+            belief[ghost] = 1
+            beliefs.append(belief)
+
+        layout.NEXT_HOP_CACHE.clear()
+        start = time.perf_counter()
+        layout.getNextHops(walls)
+        build = time.perf_counter() - start
+
+        latencies = {}
+        for mode, options in MODES.items():
+            agent = bayesfilter.PacmanAgent(**options)
+
+            start = time.perf_counter()
+            for (pacman, _), belief in zip(queries, beliefs):
+                agent._get_action(walls, [belief], [False], pacman)
+            elapsed = time.perf_counter() - start
+
+            latencies[mode] = elapsed / len(queries) * 1e6
+
+        print(
+            f"  {name:>18}: "
+            + ", ".join(f"{mode} {t:.1f}" for mode, t in latencies.items())
+            + f" (table load/build {build * 1e6:.0f})"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    router = subparsers.add_parser(
+        'router',
+        help='Chase A* vs bidirectional router vs next-hop table.',
+    )
+    router.add_argument(
+        '--queries',
+        type=int,
+        default=1000,
+        help='Number of random routing queries.',
+    )
+    router.add_argument(
+        '--layouts',
+        nargs='+',
+        default=['large_filter', 'large_filter_walls'],
+        help='Maze layouts.',
+    )
+    router.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed for random number generator.',
+    )
+    router.set_defaults(run=benchmark_router)
+
+    args = parser.parse_args()
+    args.run(args)